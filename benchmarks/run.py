@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark hot paths of parsing, loading, traversal and rendering on
+synthetic dumps. Results are written as JSON, two result files can then be
+compared to measure the impact of a change.
+
+Usage:
+    run.py [options]
+    run.py compare <before> <after>
+    run.py -h | --help
+
+Options:
+    --pages=<n>         Number of pages of synthetic dumps [default: 20000].
+    --templates=<n>     Number of templates per etymology [default: 4].
+    --noise=<ratio>     Ratio of templates which are not references [default: 0.5].
+    --repeat=<n>        Number of runs of each benchmark [default: 5].
+    --output=<path>     Where to write results [default: bench_output.json].
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import docopt
+
+from benchmarks.synthetic import iter_dump
+from wgraph import graph as wgraph
+from wgraph.parse import iter_pages
+from wgraph.parsing import en, fr
+from wgraph.parsing.structs import Ref
+from wgraph.parsing.utils import iter_templates
+from wgraph.summary import go
+
+
+def measure(function: Callable[[], Optional[int]], repeat: int) -> Dict[str, float]:
+    """Run `function` `repeat` times, it returns the number of items processed."""
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        # Parsers are very chatty, do not measure the cost of printing
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            items = function() or 0
+            timings.append(time.perf_counter() - t0)
+
+    seconds = statistics.median(timings)
+    return {
+        "seconds": seconds,
+        "min": min(timings),
+        "items": items,
+        "items_per_second": items / seconds if seconds else 0.0,
+    }
+
+
+def count(iterable: Iterable) -> int:
+    return sum(1 for _ in iterable)
+
+
+def commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pages: int, templates: int, noise: float, repeat: int) -> Dict:
+    # Benchmarked functions are run by `measure` before loop variables change
+    # pylint: disable=cell-var-from-loop
+    results = {}
+    dumps = {
+        lang: list(iter_dump(lang, pages=pages, templates=templates, noise=noise))
+        for lang in ("en", "fr")
+    }
+    parsers = {"en": en.iter_references, "fr": fr.iter_references}
+
+    graph: Dict[str, Set[Ref]] = defaultdict(set)
+    for lang, lines in dumps.items():
+        results[f"iter_pages.{lang}"] = measure(
+            lambda: count(iter_pages(lines)), repeat
+        )
+        results[f"iter_templates.{lang}"] = measure(
+            lambda: sum(count(iter_templates(line)) for line in lines), repeat
+        )
+        results[f"iter_references.{lang}"] = measure(
+            lambda: count(parsers[lang](iter_pages(lines))), repeat
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            for (word, language), reference in parsers[lang](iter_pages(lines)):
+                graph[wgraph.node_key(word, language)].add(reference)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "graph.tsv")
+        wgraph.dump(graph.items(), path)
+        frames_path = os.path.join(directory, "graph.frames")
+        wgraph.dump(graph.items(), frames_path)
+
+        # Both formats are loaded with the same number of workers, sequentially
+        # then in parallel (one worker per CPU, at least two). Synthetic graphs
+        # are smaller than MIN_CHUNK_SIZE, plain-text ones are split anyway.
+        parallel = max(2, os.cpu_count() or 1)
+        chunk_size = os.path.getsize(path) // parallel or 1
+        for suffix, workers in (("", 1), (".parallel", parallel)):
+            results[f"load{suffix}"] = measure(
+                lambda: len(wgraph.load(path, workers=workers, chunk_size=chunk_size)),
+                repeat,
+            )
+            results[f"load.frames{suffix}"] = measure(
+                lambda: len(wgraph.load(frames_path, workers=workers)), repeat
+            )
+
+        loaded = wgraph.load(path)
+
+    words: List[str] = random.Random(0).sample(sorted(loaded), min(100, len(loaded)))
+    for depth in (1, 2, 3):
+        results[f"dfs.depth{depth}"] = measure(
+            lambda: sum(
+                count(wgraph.dfs(loaded, wgraph.Word(word), max_depth=depth))
+                for word in words
+            ),
+            repeat,
+        )
+        results[f"search.depth{depth}"] = measure(
+            lambda: sum(
+                len(
+                    wgraph.search(
+                        loaded,
+                        wgraph.Word(word),
+                        stop_condition=lambda ref: ref.origin == "ine-pro",
+                        max_depth=depth,
+                    )
+                )
+                for word in words
+            ),
+            repeat,
+        )
+
+    results["summary.go"] = measure(
+        lambda: sum(len(go(loaded, word, max_depth=3).body) for word in words[:20]),
+        repeat,
+    )
+    if shutil.which("dot") is not None:
+        results["summary.render"] = measure(
+            lambda: sum(
+                len(go(loaded, word, max_depth=3).pipe(format="svg"))
+                for word in words[:20]
+            ),
+            repeat,
+        )
+
+    return {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": {
+            "pages": pages,
+            "templates": templates,
+            "noise": noise,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(before: str, after: str) -> None:
+    with open(before, encoding="utf-8") as inputs:
+        old = json.load(inputs)["results"]
+    with open(after, encoding="utf-8") as inputs:
+        new = json.load(inputs)["results"]
+
+    for name in sorted(set(old) & set(new)):
+        if new[name]["seconds"]:
+            speedup = old[name]["seconds"] / new[name]["seconds"]
+        else:
+            speedup = float("inf")
+        print(
+            f"{name:30} {old[name]['seconds']:10.4f}s {new[name]['seconds']:10.4f}s {speedup:6.2f}x"
+        )
+
+
+def main() -> None:
+    args = docopt.docopt(__doc__)
+    if args["compare"]:
+        compare(args["<before>"], args["<after>"])
+        return
+
+    report = run(
+        pages=int(args["--pages"]),
+        templates=int(args["--templates"]),
+        noise=float(args["--noise"]),
+        repeat=int(args["--repeat"]),
+    )
+    with open(args["--output"], mode="wt", encoding="utf-8") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+
+    for name, result in sorted(report["results"].items()):
+        print(
+            f"{name:30} {result['seconds']:10.4f}s {result['items_per_second']:12.0f}/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Generate synthetic Wiktionary dumps.
+
+Usage:
+    synthetic.py [options] <lang> <output>
+    synthetic.py -h | --help
+
+Options:
+    --pages=<n>         Number of pages to generate [default: 10000].
+    --templates=<n>     Number of templates per etymology [default: 4].
+    --noise=<ratio>     Ratio of templates which are not references [default: 0.5].
+    --seed=<n>          Seed of random generator [default: 42].
+"""
+
+from typing import Callable, Iterator, List
+import random
+
+import docopt
+
+ORIGINS = ["la", "grc", "fro", "enm", "ang", "de", "it", "es", "ine-pro", "gem-pro"]
+
+# Templates which do not yield references
+NOISE_EN = ["IPA|en|/wɜːd/", "lb|en|archaic", "q|dated", "gloss|a word", "nb|note"]
+NOISE_FR = ["date|1130", "R|TLFi", "w|Mot", "polytonique|λόγος", "siècle|XII"]
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(
+        rng.choice("abcdefghijklmnopqrstuvwxyzéè") for _ in range(rng.randint(3, 10))
+    )
+
+
+def en_template(rng: random.Random, words: List[str]) -> str:
+    origin = rng.choice(ORIGINS)
+    word, other = rng.choice(words), rng.choice(words)
+    return rng.choice(
+        [
+            f"inh|en|{origin}|{word}",
+            f"der|en|{origin}|{word}|t=gloss",
+            f"bor|en|{origin}|{word}",
+            f"af|en|{word}|-{other}",
+            f"prefix|en|{word}|{other}",
+            f"suffix|en|{word}|{other}",
+            f"compound|en|{word}|{other}",
+            f"m|{origin}|{word}",
+            f"cog|{origin}|{word}",
+            f"calque|en|{origin}|{word}",
+        ]
+    )
+
+
+def fr_template(rng: random.Random, words: List[str]) -> str:
+    origin = rng.choice(ORIGINS)
+    word, other = rng.choice(words), rng.choice(words)
+    return rng.choice(
+        [
+            f"étyl|{origin}|fr|{word}",
+            f"étyl|{origin}|fr|mot={word}|sens=sens",
+            f"composé de|{word}|{other}|lang=fr|m=1",
+            f"cf|{word}|lang=fr",
+            f"lien|{word}|{origin}",
+        ]
+    )
+
+
+def iter_dump(
+    lang: str, pages: int, templates: int = 4, noise: float = 0.5, seed: int = 42
+) -> Iterator[str]:
+    """Yield lines of a synthetic dump in the flavor of `lang` (en or fr)."""
+    rng = random.Random(seed)
+    words = [random_word(rng) for _ in range(max(pages, 1))]
+    template: Callable[[random.Random, List[str]], str]
+    if lang == "en":
+        template, noisy = en_template, NOISE_EN
+        language_header, etymology_header = "==English==", "===Etymology==="
+    else:
+        template, noisy = fr_template, NOISE_FR
+        language_header = "== {{langue|fr}} =="
+        etymology_header = "=== {{S|étymologie}} ==="
+
+    yield "<mediawiki>\n"
+    for title in words[:pages]:
+        parts = []
+        for _ in range(templates):
+            if rng.random() < noise:
+                parts.append(f"{{{{{rng.choice(noisy)}}}}}")
+            else:
+                parts.append(f"{{{{{template(rng, words)}}}}}")
+            if lang == "fr" and rng.random() < 0.3:
+                parts.append(f"[[{rng.choice(words)}]]")
+
+        yield "  <page>\n"
+        yield f"    <title>{title}</title>\n"
+        yield '    <text xml:space="preserve">\n'
+        yield f"{language_header}\n"
+        yield f"{etymology_header}\n"
+        yield f"From {', from '.join(parts)}.\n"
+        yield "\n"
+        yield "</text>\n"
+        yield "  </page>\n"
+    yield "</mediawiki>\n"
+
+
+def main() -> None:
+    args = docopt.docopt(__doc__)
+    with open(args["<output>"], mode="wt", encoding="utf-8") as output:
+        output.writelines(
+            iter_dump(
+                lang=args["<lang>"],
+                pages=int(args["--pages"]),
+                templates=int(args["--templates"]),
+                noise=float(args["--noise"]),
+                seed=int(args["--seed"]),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -19,15 +19,22 @@ setup(
     url="https://github.com/remusao/wgraph",
     author="Rémi",
     license="MIT",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     install_requires=["docopt", "tqdm", "iso-639", "graphviz"],
     extras_require={"dev": ["black", "mypy", "profiling", "pylint", "pre-commit"]},
     entry_points={
         "console_scripts": [
             "parse = wgraph.parse:main",
+            "analytics = wgraph.analytics:main",
+            "ancestry = wgraph.ancestry:main",
+            "batch = wgraph.batch:main",
             "closest = wgraph.closest:main",
+            "components = wgraph.components:main",
             "distance = wgraph.distance:main",
             "easiest = wgraph.easiest:main",
+            "index = wgraph.index:main",
+            "lookup = wgraph.lookup:main",
+            "oracle = wgraph.oracle:main",
             "summary = wgraph.summary:main",
         ]
     },
@@ -0,0 +1,35 @@
+"""Small graph keyed by language, shared by tests of derived files."""
+
+import pytest
+
+from wgraph.graph import dump
+from wgraph.parsing.structs import Ref
+
+
+def ref(word, origin=None, kind="inherit", destination=None):
+    return Ref(origin=origin, destination=destination, word=word, kind=kind)
+
+
+# Chain English -> Middle English -> Old English -> Proto-Germanic, a French
+# borrowing from Latin, and a separate pair of words.
+REFERENCES = {
+    "happy|en": {ref("happy", "enm"), ref("luck", "fr", kind="borrowed")},
+    "happy|enm": {ref("happ", "ang")},
+    "happ|ang": {ref("*hampą", "gem-pro")},
+    "luck|fr": {ref("lucrum", "la")},
+    "sad|en": {ref("sæd", "ang")},
+}
+
+
+@pytest.fixture
+def graph_path(tmp_path):
+    path = str(tmp_path / "graph.tsv")
+    dump(REFERENCES.items(), path)
+    return path
+
+
+@pytest.fixture
+def frames_path(tmp_path):
+    path = str(tmp_path / "graph.frames")
+    dump(REFERENCES.items(), path)
+    return path
@@ -0,0 +1,41 @@
+"""Scores of words, and their storage next to the graph."""
+
+import os
+
+import pytest
+
+from wgraph import adjacency, analytics
+from wgraph.graph import load
+
+
+@pytest.fixture
+def attributes(graph_path):
+    graph = load(graph_path, workers=1)
+    attributes = analytics.analyze(graph, adjacency.build(graph))
+    analytics.dump(attributes, graph_path)
+    return attributes
+
+
+def test_ranks_are_read_from_attributes(graph_path, attributes):
+    ranks = analytics.open_ranks(graph_path)
+    assert sorted(ranks) == sorted(node.word for node in attributes)
+    for node in attributes:
+        assert ranks[node.word] == pytest.approx(node.pagerank, rel=1e-5)
+    assert ranks.get("unknown|en") is None
+    assert ranks.get("") is None
+
+
+def test_sources_rank_higher(graph_path, attributes):
+    ranks = analytics.open_ranks(graph_path)
+    assert ranks["happ|ang"] > ranks["happy|en"]
+
+
+def test_outdated_attributes_are_ignored(graph_path, attributes):
+    stat = os.stat(graph_path)
+    os.utime(graph_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert analytics.open_ranks(graph_path) == {}
+    assert analytics.load_hubs(graph_path) == frozenset()
+
+
+def test_missing_attributes(graph_path):
+    assert analytics.open_ranks(graph_path) == {}
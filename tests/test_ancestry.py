@@ -0,0 +1,56 @@
+"""Streaming the complete ancestry of a word."""
+
+import json
+
+import pytest
+
+from wgraph.ancestry import SpillQueue, edge, iter_ancestry, ndjson
+from wgraph.graph import dfs, load
+
+
+@pytest.fixture
+def graph(graph_path):
+    return load(graph_path, workers=1)
+
+
+def test_spill_queue_keeps_order():
+    queue = SpillQueue(max_items=2)
+    for i in range(5):
+        queue.push(str(i))
+    assert len(queue) == 5
+    popped = [queue.pop() for _ in range(3)]
+    queue.push("5")
+    popped.extend(queue.pop() for _ in range(len(queue)))
+    queue.close()
+    assert popped == ["0", "1", "2", "3", "4", "5"]
+
+
+@pytest.mark.parametrize("max_frontier", [1, 100])
+def test_ancestry_matches_dfs(graph, max_frontier):
+    ancestry = [
+        (level, ref)
+        for _, level, ref in iter_ancestry(
+            graph, "happy", language="en", max_frontier=max_frontier
+        )
+    ]
+    assert ancestry == [
+        (level, ref) for _, level, ref in dfs(graph, "happy", 10, language="en")
+    ]
+
+
+def test_max_depth(graph):
+    words = {ref.word for _, _, ref in iter_ancestry(graph, "happy", "en", 1)}
+    assert words == {"happy", "luck"}
+
+
+def test_formats(graph):
+    parent, level, ref = next(iter_ancestry(graph, "sad", "en"))
+    assert json.loads(ndjson(parent, level, ref)) == {
+        "word": "sæd",
+        "origin": "ang",
+        "destination": None,
+        "kind": "inherit",
+        "depth": 1,
+        "parent": "sad|en",
+    }
+    assert edge(parent, level, ref) == "sad|en\tsæd\tinherit\tang\t1"
@@ -0,0 +1,47 @@
+"""Distance queries sharing traversals."""
+
+from wgraph.batch import batch_distances, distances, group_queries
+from wgraph.graph import load
+
+
+def test_distances_to_words(graph_path):
+    graph = load(graph_path, workers=1)
+    assert distances(
+        graph, "happy", ["happy", "happ", "*hampą", "sad"], language="en"
+    ) == {
+        "happy": 1,
+        "happ": 2,
+        "*hampą": 3,
+        "sad": -1,
+    }
+
+
+def test_distances_to_closest_language(graph_path):
+    graph = load(graph_path, workers=1)
+    assert distances(
+        graph, "happy", ["fr", "la", "ang", "ja"], closest=True, language="en"
+    ) == {"fr": 1, "la": 2, "ang": 2, "ja": -1}
+
+
+def test_distances_are_bounded_by_depth(graph_path):
+    graph = load(graph_path, workers=1)
+    assert distances(graph, "happy", ["*hampą"], max_depth=2, language="en") == {
+        "*hampą": -1
+    }
+
+
+def test_queries_are_grouped_by_source():
+    assert group_queries([("a", "x"), ("b", "y"), ("a", "z"), ("a", "x")]) == {
+        "a": ["x", "z"],
+        "b": ["y"],
+    }
+
+
+def test_batch_distances(graph_path):
+    graph = load(graph_path, workers=1)
+    queries = [("happy", "happ"), ("sad", "sæd"), ("happy", "lucrum")]
+    assert sorted(batch_distances(graph, queries, language="en")) == [
+        ("happy", "happ", 2),
+        ("happy", "lucrum", 2),
+        ("sad", "sæd", 1),
+    ]
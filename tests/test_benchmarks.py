@@ -0,0 +1,22 @@
+"""Benchmarks on synthetic dumps."""
+
+import json
+
+from benchmarks import run
+
+
+def test_run_measures_all_paths():
+    results = run.run(pages=50, templates=2, noise=0.5, repeat=1)["results"]
+    for name in ("iter_pages.en", "load", "load.parallel", "load.frames.parallel"):
+        assert results[name]["items"] > 0
+    assert results["load.parallel"]["items"] == results["load"]["items"]
+
+
+def test_compare_instant_results(tmp_path, capsys):
+    paths = []
+    for name, seconds in (("before", 1.0), ("after", 0.0)):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({"results": {"load": {"seconds": seconds}}}))
+        paths.append(str(path))
+    run.compare(*paths)
+    assert "inf" in capsys.readouterr().out
@@ -0,0 +1,42 @@
+"""Cache of rendered graphs, in memory and on disk."""
+
+import os
+
+from wgraph.cache import SVGCache, cache_key
+
+
+def test_cache_key():
+    assert cache_key("happy", 2) == cache_key("happy", 2)
+    assert cache_key("happy", 2) != cache_key("happy", 3)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SVGCache(max_bytes=8)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.put("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"1234"
+
+
+def test_entries_are_shared_on_disk(tmp_path):
+    SVGCache(directory=str(tmp_path)).put("a", b"<svg/>")
+    assert SVGCache(directory=str(tmp_path)).get("a") == b"<svg/>"
+
+
+def test_overwritten_entries_are_counted_once(tmp_path):
+    cache = SVGCache(directory=str(tmp_path), max_disk_bytes=100)
+    for _ in range(5):
+        cache.put("a", b"12345678")
+    assert cache._disk_size == 8
+    assert os.listdir(tmp_path) == ["a.svg"]
+
+
+def test_disk_entries_are_evicted(tmp_path):
+    cache = SVGCache(directory=str(tmp_path), max_disk_bytes=10)
+    cache.put("a", b"123456")
+    cache.put("b", b"123456")
+    assert os.listdir(tmp_path) == ["b.svg"]
+    assert cache._disk_size == 6
@@ -0,0 +1,75 @@
+"""Connected components, pruning searches of unreachable words."""
+
+import itertools
+
+import pytest
+
+from wgraph import adjacency, components
+from wgraph.adjacency import UNREACHABLE, bfs
+from wgraph.graph import dfs, load
+
+
+@pytest.fixture
+def graph(graph_path):
+    return load(graph_path, workers=1)
+
+
+@pytest.fixture
+def labels(graph_path, graph):
+    components.save(components.build(graph, adjacency.build(graph)), graph_path)
+    labels = components.open_components(graph_path)
+    yield labels
+    labels.close()
+
+
+def test_components_never_reject_reachable_words(graph, labels):
+    # Components may fail to prune, but must never reject a path found by BFS
+    graph_adjacency = adjacency.build(graph)
+    for source, target in itertools.product(range(len(graph_adjacency)), repeat=2):
+        reached = bfs(graph_adjacency, [source])[target] != UNREACHABLE
+        source_word, target_word = (
+            graph_adjacency.nodes[source],
+            graph_adjacency.nodes[target],
+        )
+        if reached:
+            assert labels.may_reach(
+                [labels.get(source_word)], [labels.get(target_word)]
+            ), (source_word, target_word)
+
+
+def test_reachable(labels):
+    assert labels.reachable("happy", "*hampą", "en")
+    assert labels.reachable("happy", "lucrum", "en")
+    assert not labels.reachable("happy", "sæd", "en")
+    assert not labels.reachable("happ", "happy", "ang")
+
+
+def test_reaches_languages(labels):
+    assert labels.reaches_languages("happy", ["la"], "en")
+    assert not labels.reaches_languages("sad", ["la"], "en")
+
+
+def test_ref_filter_prunes_traversals(graph, labels):
+    def reached(target):
+        is_valid = labels.ref_filter(graph, target)
+        return {
+            ref.word
+            for _, _, ref in dfs(graph, "happy", 4, language="en", is_valid=is_valid)
+        }
+
+    # Order of components only prunes some words, but paths to target are kept
+    assert {"happy", "happ", "*hampą"} <= reached("*hampą")
+    # Words of other weakly connected components are never reached
+    assert reached("sæd") == set()
+
+
+def test_report(labels):
+    report = labels.report()
+    assert report["words"] == len(labels)
+    assert report["weak"]["count"] == 2
+
+
+def test_outdated_components_are_ignored(graph_path, labels):
+    with open(graph_path, mode="at", encoding="utf-8") as output:
+        output.write("new|en\tword|inherit|enm|\n")
+    assert components.open_components(graph_path) is None
@@ -0,0 +1,51 @@
+"""Framed graphs, looked-up without being loaded in memory."""
+
+import pytest
+
+from wgraph import frames
+from wgraph.graph import load, serialize_ref
+from wgraph.index import FrameGraph, open_graph
+
+from conftest import REFERENCES
+
+
+@pytest.fixture
+def path(tmp_path):
+    # Frames of a few lines, so that words are spread over several of them
+    path = str(tmp_path / "graph.frames")
+    frames.write(
+        sorted(
+            (word, "\t".join(sorted(serialize_ref(r) for r in refs)))
+            for word, refs in REFERENCES.items()
+        ),
+        path,
+        frame_size=40,
+    )
+    return path
+
+
+def test_words_are_spread_over_frames(path):
+    assert len(frames.read_index(path)) > 2
+
+
+def test_frame_graph_matches_loaded_graph(path):
+    graph = open_graph(path)
+    assert isinstance(graph, FrameGraph)
+    assert dict(graph) == load(path, workers=1)
+    assert len(graph) == len(REFERENCES)
+    assert list(graph) == sorted(REFERENCES)
+
+
+def test_missing_words(path):
+    graph = FrameGraph(path)
+    for word in ("", "aaa", "happy", "happy|fr", "zzz|en"):
+        assert word not in graph
+        with pytest.raises(KeyError):
+            graph[word]
+
+
+def test_keys_of_span_frames(path):
+    graph = FrameGraph(path)
+    assert graph.keys_of("happy") == ["happy|en", "happy|enm"]
+    assert graph.keys_of("sad") == ["sad|en"]
+    assert graph.keys_of("unknown") == []
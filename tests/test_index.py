@@ -0,0 +1,64 @@
+"""Point look-ups of plain-text graphs through their index."""
+
+import gzip
+import os
+
+import pytest
+
+from wgraph import index
+from wgraph.graph import load
+
+
+@pytest.fixture
+def disk_graph(graph_path):
+    index.build(graph_path)
+    graph = index.open_graph(graph_path)
+    yield graph
+    graph.close()
+
+
+def test_disk_graph_matches_loaded_graph(graph_path, disk_graph):
+    assert isinstance(disk_graph, index.DiskGraph)
+    graph = load(graph_path, workers=1)
+    assert dict(disk_graph) == graph
+    assert len(disk_graph) == len(graph)
+    assert list(disk_graph) == sorted(graph)
+
+
+def test_missing_words(disk_graph):
+    for word in ("", "happy", "happy|fr", "zzz|en"):
+        assert word not in disk_graph
+        with pytest.raises(KeyError):
+            disk_graph[word]
+
+
+def test_keys_of(disk_graph):
+    assert disk_graph.keys_of("happy") == ["happy|en", "happy|enm"]
+    assert disk_graph.keys_of("unknown") == []
+
+
+def test_outdated_index_is_not_used(graph_path):
+    index.build(graph_path)
+    assert index.is_valid(graph_path)
+    with open(graph_path, mode="at", encoding="utf-8") as output:
+        output.write("new|en\tword|inherit|enm|\n")
+    assert not index.is_valid(graph_path)
+    assert "new|en" in index.open_graph(graph_path)
+
+
+def test_empty_graph(tmp_path):
+    path = str(tmp_path / "graph.tsv")
+    open(path, mode="wb").close()
+    index.build(path)
+    graph = index.DiskGraph(path)
+    assert len(graph) == 0 and "happy" not in graph
+    graph.close()
+
+
+def test_compressed_graphs_are_not_indexed(tmp_path):
+    path = str(tmp_path / "graph.tsv.gz")
+    with gzip.open(path, mode="wt", encoding="utf-8") as output:
+        output.write("happy|en\thappy|inherit|enm|\n")
+    with pytest.raises(ValueError):
+        index.build(path)
+    assert not os.path.exists(index.index_path(path))
@@ -0,0 +1,85 @@
+"""Traversals of graphs keyed by language (`word|language`)."""
+
+from collections import defaultdict
+
+import pytest
+
+from wgraph import index
+from wgraph.graph import dfs, dump, load, node_key
+from wgraph.parse import iter_pages
+from wgraph.parsing.en import iter_references
+
+DUMP = """
+<title>unhappy</title>
+==English==
+===Etymology===
+From {{prefix|un|happy}}.
+<title>happy</title>
+==English==
+===Etymology===
+From {{inh|en|enm|happy}}.
+<title>happy</title>
+==Middle English==
+===Etymology===
+From {{der|enm|non|happ}}.
+<title>un</title>
+==English==
+===Etymology===
+From {{inh|en|enm|un}}.
+<title>un</title>
+==Middle English==
+===Etymology===
+From {{inh|enm|ang|un}}.
+"""
+
+
+@pytest.fixture(params=["memory", "index", "frames"])
+def graph(request, tmp_path):
+    references = defaultdict(set)
+    for (word, language), reference in iter_references(
+        iter_pages(DUMP.splitlines(keepends=True))
+    ):
+        references[node_key(word, language)].add(reference)
+
+    path = str(tmp_path / "graph.tsv")
+    if request.param == "frames":
+        path = str(tmp_path / "graph.frames")
+    dump(references.items(), path)
+    if request.param == "frames":
+        return index.open_graph(path)
+    if request.param == "index":
+        index.build(path)
+        return index.open_graph(path)
+    return load(path, workers=1)
+
+
+def words(graph, word, language=None):
+    return {
+        ref.word
+        for _, _, ref in dfs(graph=graph, word=word, max_depth=3, language=language)
+    }
+
+
+def test_graph_is_keyed_by_language(graph):
+    assert "unhappy|en" in graph
+    assert "unhappy" not in graph
+
+
+def test_references_without_origin_are_followed(graph):
+    # Components of the prefix have no origin, they are resolved in the
+    # language of the entry referencing them.
+    assert words(graph, "unhappy", "en") == {"un- + happy", "un", "happy", "happ"}
+
+
+def test_bare_word_is_resolved_to_its_only_key(graph):
+    assert words(graph, "unhappy") == words(graph, "unhappy", "en")
+
+
+def test_ambiguous_bare_word_is_not_resolved(graph):
+    assert words(graph, "happy", "enm") == {"happ"}
+    assert words(graph, "happy") == set()
+
+
+def test_missing_word(graph):
+    assert words(graph, "sad") == set()
+    assert words(graph, "unhappy", "fr") == set()
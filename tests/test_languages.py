@@ -0,0 +1,41 @@
+"""Names of languages, cached between runs."""
+
+import json
+
+import pytest
+
+from wgraph import languages
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path / "wgraph" / "languages.json"
+
+
+def test_names_come_from_all_tables(cache):
+    names = languages.load()
+    assert names["la"] == "Latin"
+    assert names["enm"] == "Middle English (1100-1500)"
+    assert names["gem-pro"] == "Proto-Germanic"
+    assert names["gmq-osw"] == "Old Swedish"
+
+
+def test_names_are_cached(cache, monkeypatch):
+    names = languages.load()
+    assert json.loads(cache.read_text(encoding="utf-8"))["names"] == names
+
+    def build():
+        raise AssertionError("table should be read from cache")
+
+    monkeypatch.setattr(languages, "build", build)
+    assert languages.load() == names
+
+
+def test_outdated_cache_is_rebuilt(cache):
+    languages.load()
+    cached = json.loads(cache.read_text(encoding="utf-8"))
+    cached["fingerprint"][0] -= 1
+    cached["names"] = {}
+    cache.write_text(json.dumps(cached), encoding="utf-8")
+    assert languages.load()["la"] == "Latin"
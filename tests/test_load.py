@@ -0,0 +1,25 @@
+"""Loading graphs in memory, sequentially or in parallel."""
+
+import pytest
+
+from wgraph.graph import load
+
+
+@pytest.fixture(params=["graph_path", "frames_path"])
+def path(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_parallel_load_is_identical(path):
+    graph = load(path, workers=1)
+    assert len(graph) == 5
+    assert load(path, workers=3, chunk_size=64) == graph
+
+
+def test_references_have_no_line_ending(path):
+    graph = load(path, workers=1)
+    assert not any(references.endswith("\n") for references in graph.values())
+    assert not any(
+        references.endswith("\n")
+        for references in load(path, workers=3, chunk_size=64).values()
+    )
@@ -0,0 +1,48 @@
+"""Prefix and fuzzy lookup of words of a graph."""
+
+import pytest
+
+from wgraph import lookup
+from wgraph.graph import load
+
+
+@pytest.fixture
+def index(graph_path):
+    return lookup.build(load(graph_path, workers=1))
+
+
+def test_complete(index):
+    assert index.complete("Ha") == ["happ|ang", "happy|en", "happy|enm"]
+    assert index.complete("ha", limit=1) == ["happ|ang"]
+    assert index.complete("x") == []
+
+
+def test_suggest(index):
+    # Words sharing more trigrams come first among equally distant ones
+    assert index.suggest("hapy") == ["happy|en", "happy|enm", "happ|ang"]
+    assert index.suggest("sadd") == ["sad|en"]
+    assert index.suggest("lucky") == ["luck|fr"]
+    assert index.suggest("happiness") == []
+
+
+def test_variants(index):
+    assert index.variants("LUCK") == ["luck|fr"]
+    assert index.variants("unknown") == []
+
+
+def test_saved_lookup_is_loaded(graph_path, index):
+    lookup.save(index, graph_path)
+    assert lookup.is_valid(graph_path)
+    loaded = lookup.load(graph_path)
+    assert loaded.words == index.words
+    assert loaded.complete("ha") == index.complete("ha")
+    assert loaded.suggest("hapy") == index.suggest("hapy")
+
+
+def test_outdated_lookup_is_rebuilt(graph_path, index):
+    lookup.save(index, graph_path)
+    with open(graph_path, mode="at", encoding="utf-8") as output:
+        output.write("hope|en\thopa|inherit|ang|\n")
+    assert not lookup.is_valid(graph_path)
+    assert "hope|en" in lookup.open_lookup(graph_path).complete("ho")
+    assert lookup.is_valid(graph_path)
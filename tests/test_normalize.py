@@ -0,0 +1,64 @@
+"""Normalization of extracted references."""
+
+from wgraph.normalize import canonical_language, canonical_word, normalize
+from wgraph.parsing.utils import COUNTERS
+
+from conftest import ref
+
+
+def test_canonical_word():
+    assert canonical_word("pollex#Latin") == "pollex"
+    assert canonical_word("[[pollex]]") == ""
+    # Decomposed characters are composed
+    assert canonical_word("polli\u0306cem") == "poll\u012dcem"
+
+
+def test_canonical_language():
+    assert canonical_language(" LA ") == "la"
+    assert canonical_language(" ") is None
+    assert canonical_language(None) is None
+
+
+def test_variants_of_entries_refer_to_them():
+    graph = {
+        "pollex|la": {ref("pollĭcem", "la"), ref("pollicem", "la")},
+        "pollicem|la": {ref("pollex", "la", kind="form")},
+    }
+    normalize(graph)
+    assert graph["pollex|la"] == {ref("pollicem", "la")}
+    assert graph["pollicem|la"] == {ref("pollex", "la", kind="form")}
+
+
+def test_entries_only_differing_in_case_stay_distinct():
+    graph = {
+        "turkey|en": {ref("Turkey", "en", kind="cf"), ref("turkey", "enm")},
+        "Turkey|en": {ref("Turkish", "en", kind="cf")},
+    }
+    normalize(graph)
+    assert graph["turkey|en"] == {ref("Turkey", "en", kind="cf"), ref("turkey", "enm")}
+
+
+def test_ambiguous_variants_are_kept():
+    graph = {
+        "resume|en": {ref("résumé", "fr", kind="cf")},
+        "résumé|en": {ref("resumé", "fr", kind="cf")},
+    }
+    normalize(graph)
+    assert graph["résumé|en"] == {ref("resumé", "fr", kind="cf")}
+
+
+def test_duplicates_are_merged():
+    COUNTERS.clear()
+    graph = {
+        "thumb|en": {
+            ref("Thuma", "ang"),
+            ref("thuma", " ANG"),
+            ref("thumb", "en"),
+            ref("fro}}", "ang"),
+        },
+    }
+    normalize(graph)
+    assert graph["thumb|en"] == {ref("thuma", "ang")}
+    assert COUNTERS["duplicate references"] == 1
+    assert COUNTERS["self references"] == 1
+    assert COUNTERS["references dropped"] == 1
@@ -0,0 +1,86 @@
+"""Bounds of distances between words using landmarks."""
+
+from array import array
+from collections import deque
+import math
+
+import pytest
+
+from wgraph import oracle
+from wgraph.adjacency import FAR, UNREACHABLE, Adjacency, bfs, open_adjacency
+
+# A chain longer than FAR hops, and a separate cycle
+CHAIN = 300
+CYCLE = 3
+
+
+def adjacency_of(edges, count):
+    offsets, targets = array("Q", [0]), array("I")
+    for node in range(count):
+        targets.extend(sorted(target for source, target in edges if source == node))
+        offsets.append(len(targets))
+    return Adjacency([f"w{i}" for i in range(count)], offsets, targets)
+
+
+@pytest.fixture(scope="module")
+def adjacency():
+    edges = [(i, i + 1) for i in range(CHAIN - 1)]
+    edges += [(CHAIN + i, CHAIN + (i + 1) % CYCLE) for i in range(CYCLE)]
+    # Shortcut in the middle of the chain, and a word referencing the cycle
+    edges += [(10, 20), (CHAIN + CYCLE, CHAIN)]
+    return adjacency_of(edges, CHAIN + CYCLE + 1)
+
+
+def distances_from(adjacency, source):
+    """Exact (not clamped) number of hops from `source`."""
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for target in adjacency.neighbors(node):
+            if target not in distances:
+                distances[target] = distances[node] + 1
+                queue.append(target)
+    return [distances.get(node, math.inf) for node in range(len(adjacency))]
+
+
+@pytest.fixture(scope="module")
+def exact(adjacency):
+    return [distances_from(adjacency, node) for node in range(len(adjacency))]
+
+
+def test_bfs_clamps_distances(adjacency):
+    distances = bfs(adjacency, [0])
+    assert distances[5] == 5
+    assert distances[CHAIN - 1] == FAR
+    assert distances[CHAIN] == UNREACHABLE
+
+
+@pytest.mark.parametrize("landmarks", [1, 4])
+def test_bounds_are_admissible(adjacency, exact, landmarks):
+    estimates = oracle.build(adjacency, landmarks)
+    far = unreachable = 0
+    for u in range(len(adjacency)):
+        for v in range(len(adjacency)):
+            lower, upper = estimates.pair_bounds(u, v)
+            assert lower <= exact[u][v] <= upper, (u, v, lower, upper)
+            far += FAR <= exact[u][v] < math.inf
+            unreachable += exact[u][v] == math.inf
+    assert far and unreachable
+
+
+def test_exact_distance(adjacency, exact):
+    estimates = oracle.build(adjacency, 4)
+    for u, v in ((0, 5), (0, 25), (5, 250), (0, CHAIN - 1), (CHAIN + CYCLE, CHAIN + 2)):
+        assert estimates.distance([u], [v]) == exact[u][v]
+    assert estimates.distance([0], [CHAIN]) == math.inf
+    assert estimates.distance([CHAIN], [0]) == math.inf
+
+
+def test_saved_oracle_is_loaded(graph_path):
+    adjacency = open_adjacency(graph_path)
+    oracle.save(oracle.build(adjacency, 2), graph_path)
+    assert oracle.is_valid(graph_path)
+    loaded = oracle.load(graph_path)
+    assert loaded.word_distance("happy", "*hampą", "en") == 3
+    assert loaded.word_distance("happy", "sæd", "en") == math.inf
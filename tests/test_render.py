@@ -0,0 +1,36 @@
+"""Rendering of summaries, and their routes."""
+
+import shutil
+
+import graphviz as gv
+import pytest
+
+from wgraph import app
+from wgraph.render import Renderer, svg_fragment
+
+
+def test_svg_fragment_strips_prolog():
+    svg = b'<?xml version="1.0"?>\n<!DOCTYPE svg>\n<svg width="1pt"></svg>\n'
+    assert svg_fragment(svg) == '<svg width="1pt"></svg>\n'
+
+
+@pytest.mark.skipif(shutil.which("dot") is None, reason="graphviz is not installed")
+def test_render():
+    graph = gv.Digraph()
+    graph.edge("happy", "happ")
+    svg = Renderer(workers=1).render(graph)
+    assert "happ" in svg_fragment(svg)
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("url", ["/summary", "/summary?word=", "/summary.svg"])
+def test_missing_word_is_rejected(client, url):
+    assert client.get(url).status_code == 400
+
+
+def test_missing_word_is_rejected_from_form(client):
+    assert client.post("/", data={"lang": "en"}).status_code == 400
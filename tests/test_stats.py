@@ -0,0 +1,65 @@
+"""Throughput of the stages of the parse pipeline."""
+
+import gzip
+import io
+
+import pytest
+
+from wgraph.parse import iter_lines, iter_pages
+from wgraph.parsing.en import iter_references
+from wgraph.parsing.utils import TIMERS
+from wgraph.stats import PipelineStats
+
+DUMP = """<title>happy</title>
+==English==
+===Etymology===
+From {{inh|en|enm|happy}}, from {{der|en|non|happ}}.
+"""
+
+
+@pytest.fixture(params=["dump.xml", "dump.xml.gz"])
+def path(request, tmp_path):
+    path = tmp_path / request.param
+    data = DUMP.encode("utf-8")
+    path.write_bytes(gzip.compress(data) if request.param.endswith(".gz") else data)
+    return str(path)
+
+
+def stats():
+    return PipelineStats(
+        stages=("read", "decompression", "lines", "pages", "references"),
+        output=io.StringIO(),
+    )
+
+
+def test_bytes_are_counted_before_and_after_decompression(path):
+    pipeline = stats()
+    lines = list(pipeline.track("lines", iter_lines(path, pipeline)))
+    assert "".join(lines) == DUMP
+
+    report = pipeline.report()["stages"]
+    with open(path, mode="rb") as inputs:
+        assert report["read"]["count"] == len(inputs.read())
+    assert report["decompression"]["count"] == len(DUMP.encode("utf-8"))
+    assert report["lines"]["count"] == 4
+
+
+def test_template_scanning_is_timed_within_references(path):
+    TIMERS.clear()
+    pipeline = stats()
+    references = pipeline.track(
+        "references",
+        iter_references(
+            pipeline.track(
+                "pages", iter_pages(pipeline.track("lines", iter_lines(path, pipeline)))
+            )
+        ),
+    )
+    assert len(list(references)) == 2
+
+    report = pipeline.report()["stages"]
+    assert report["templates"]["count"] >= 2
+    assert 0.0 < report["templates"]["seconds"] <= report["references"]["seconds"]
+    assert report["references"]["self_seconds"] <= (
+        report["references"]["seconds"] - report["pages"]["seconds"]
+    )
@@ -0,0 +1,48 @@
+"""Words only differing in case or diacritics, explored as a single word."""
+
+from wgraph import lookup
+from wgraph.graph import NO_EQUIVALENTS, Graph, dfs, serialize_ref
+from wgraph.parsing.structs import Ref
+
+
+def refs(*words):
+    return "\t".join(
+        serialize_ref(Ref(origin="la", destination=None, word=word, kind="inherit"))
+        for word in words
+    )
+
+
+GRAPH = Graph(
+    {
+        "naïve|en": refs("nativus"),
+        "naive|en": refs("nativum"),
+        "naive|fr": refs("nativa"),
+        "nativus|la": refs("natus"),
+    }
+)
+
+
+def words(equivalents, word="naive"):
+    return [
+        ref.word
+        for _, _, ref in dfs(
+            GRAPH, word, max_depth=2, language="en", equivalents=equivalents
+        )
+    ]
+
+
+def test_variants_are_grouped_by_language():
+    groups = lookup.variant_groups(lookup.build(GRAPH))
+    assert set(groups) == {"naïve|en", "naive|en"}
+    assert groups["naïve|en"] == groups["naive|en"]
+
+
+def test_variants_are_explored_as_a_single_word():
+    equivalents = lookup.variant_groups(lookup.build(GRAPH))
+    assert sorted(words(equivalents)) == ["nativum", "nativus", "natus"]
+    assert sorted(words(equivalents, "naïve")) == ["nativum", "nativus", "natus"]
+
+
+def test_no_equivalents():
+    assert words(NO_EQUIVALENTS) == ["nativum"]
+    assert not NO_EQUIVALENTS
@@ -0,0 +1,77 @@
+"""Shortest paths weighted by kind of reference."""
+
+import math
+
+import pytest
+
+from wgraph.graph import Graph, serialize_ref
+from wgraph.parsing.structs import Ref
+from wgraph.weighted import (
+    KIND_COSTS,
+    Landmarks,
+    dijkstra,
+    edge_cost,
+    shortest_path,
+)
+
+
+def refs(*references):
+    return "\t".join(
+        serialize_ref(Ref(origin=origin, destination=None, word=word, kind=kind))
+        for word, origin, kind in references
+    )
+
+
+@pytest.fixture
+def graph():
+    # "d" is a cognate of "a", and also reached by three inheritances
+    return Graph(
+        {
+            "a|en": refs(("b", "enm", "inherit"), ("d", "fr", "cognate")),
+            "b|enm": refs(("c", "ang", "inherit")),
+            "c|ang": refs(("d", "fr", "inherit")),
+            "d|fr": refs(("e", "la", "mention")),
+        }
+    )
+
+
+def is_d(ref):
+    return ref.word == "d"
+
+
+def test_cheapest_path_is_found(graph):
+    cost, path = shortest_path(graph, "a", is_d, language="en")
+    assert cost == 3.0
+    assert [ref.word for ref in path] == ["b", "c", "d"]
+
+
+def test_costs_can_be_overridden(graph):
+    costs = dict(KIND_COSTS, cognate=0.5)
+    cost, path = shortest_path(graph, "a", is_d, costs=costs, language="en")
+    assert cost == 0.5
+    assert [ref.word for ref in path] == ["d"]
+    assert KIND_COSTS["cognate"] == 4.0
+
+
+def test_words_are_reached_by_increasing_cost(graph):
+    costs = [cost for _, cost, _ in dijkstra(graph, "a", language="en")]
+    assert costs == sorted(costs) == [1.0, 2.0, 3.0, 6.0]
+
+
+def test_unreachable_target(graph):
+    assert shortest_path(graph, "a", lambda ref: ref.word == "z", language="en") == (
+        math.inf,
+        [],
+    )
+    assert shortest_path(graph, "a", is_d, max_cost=2.5, language="en")[0] == math.inf
+
+
+def test_landmarks_do_not_change_cost(graph):
+    heuristic = Landmarks(graph, ["a|en", "b|enm"]).heuristic("d")
+    assert heuristic("b|enm") <= 2.0
+    assert shortest_path(graph, "a", is_d, heuristic=heuristic, language="en")[0] == 3.0
+
+
+def test_edge_cost():
+    assert edge_cost("inherit", {"inherit": 0.5}) == 0.5
+    assert edge_cost("suffix-") == KIND_COSTS["suffix"]
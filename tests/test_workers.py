@@ -0,0 +1,52 @@
+"""Bounded pool of workers serving requests."""
+
+import threading
+import time
+
+import pytest
+
+from wgraph.workers import BoundedPool, Overloaded
+
+
+def test_run_returns_result():
+    pool = BoundedPool(workers=2)
+    assert pool.run(sum, [1, 2, 3]) == 6
+
+
+def test_full_pool_rejects_jobs():
+    pool = BoundedPool(workers=1, max_pending=1)
+    release = threading.Event()
+    blocked = threading.Thread(target=pool.run, args=(release.wait,))
+    blocked.start()
+    time.sleep(0.05)
+    with pytest.raises(Overloaded):
+        pool.run(sum, [])
+    release.set()
+    blocked.join()
+    assert pool.run(sum, []) == 0
+
+
+def test_map_runs_items_concurrently():
+    pool = BoundedPool(workers=4, max_pending=1)
+    started = threading.Barrier(4, timeout=1.0)
+
+    def job(item):
+        started.wait()
+        return item * 2
+
+    # Would time out if items were run one after the other
+    assert pool.map(job, range(4)) == [0, 2, 4, 6]
+    assert pool.map(job, []) == []
+
+
+def test_map_has_a_single_deadline():
+    pool = BoundedPool(workers=2, timeout=0.2)
+    t0 = time.monotonic()
+    with pytest.raises(Overloaded):
+        pool.map(time.sleep, [0.15] * 6)
+    assert time.monotonic() - t0 < 0.4
+
+
+def test_stream_yields_items():
+    pool = BoundedPool(workers=1)
+    assert list(pool.stream(iter, [1, 2, 3])) == [1, 2, 3]
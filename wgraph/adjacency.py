@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compact adjacency of a graph, for algorithms over the whole graph.
+
+Words (keys of the graph, then words only found in references) are numbered,
+and the words referenced by word `i` are found in
+`targets[offsets[i]:offsets[i + 1]]`, as in the compressed sparse row format.
+Adjacency is persisted next to the graph (`<graph>.adj`) so that offline jobs
+only parse the graph once.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+import os
+import struct
+import sys
+
+from wgraph.graph import (
+    SerializedRefs,
+    Word,
+    node_key,
+    ref_key,
+    split_key,
+    split_references,
+)
+from wgraph.index import open_graph
+
+EXTENSION = ".adj"
+MAGIC = b"WGRAPHA1"
+
+# Magic, size and modification time of graph, number of nodes and edges, size
+# of the list of words.
+HEADER = struct.Struct("<8sQQQQQ")
+
+# Distances are stored on a byte per word, this one meaning unreachable
+UNREACHABLE = 255
+# Larger distances are clamped to this one, which is then only a lower bound
+FAR = 254
+
+
+class Adjacency:
+    def __init__(self, nodes: List[Word], offsets: array, targets: array):
+        self.nodes = nodes
+        self.ids: Dict[Word, int] = {node: i for i, node in enumerate(nodes)}
+        self.offsets = offsets
+        self.targets = targets
+        self._by_word: Optional[Dict[str, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def edges(self) -> int:
+        return len(self.targets)
+
+    def neighbors(self, node: int) -> array:
+        return self.targets[self.offsets[node] : self.offsets[node + 1]]
+
+    def ids_of(self, word: str) -> List[int]:
+        """Nodes of `word` in any language."""
+        if self._by_word is None:
+            self._by_word = {}
+            for i, node in enumerate(self.nodes):
+                self._by_word.setdefault(split_key(node)[0], []).append(i)
+        return self._by_word.get(word, [])
+
+    def node_of(self, word: str, language: Optional[str] = None) -> Optional[int]:
+        """Node of `word` as resolved by `graph.resolve_key`."""
+        node = self.ids.get(node_key(word, language))
+        if node is None and language is None:
+            nodes = [i for i in self.ids_of(word) if split_key(self.nodes[i])[1]]
+            if len(nodes) == 1:
+                node = nodes[0]
+        return node
+
+    def out_degrees(self) -> array:
+        offsets = self.offsets
+        return array("I", (offsets[i + 1] - offsets[i] for i in range(len(self))))
+
+    def in_degrees(self) -> array:
+        degrees = array("I", [0]) * len(self)
+        for target in self.targets:
+            degrees[target] += 1
+        return degrees
+
+    def reverse(self) -> "Adjacency":
+        """Adjacency with all edges reversed (counting sort of edges)."""
+        offsets = array("Q", [0]) * (len(self) + 1)
+        for target in self.targets:
+            offsets[target + 1] += 1
+        for i in range(len(self)):
+            offsets[i + 1] += offsets[i]
+
+        positions = array("Q", offsets)
+        sources = array("I", [0]) * self.edges
+        for node in range(len(self)):
+            for target in self.neighbors(node):
+                sources[positions[target]] = node
+                positions[target] += 1
+        return Adjacency(self.nodes, offsets, sources)
+
+
+def build(graph: Mapping[Word, SerializedRefs]) -> Adjacency:
+    nodes = sorted(graph)
+    ids = {node: i for i, node in enumerate(nodes)}
+
+    offsets = array("Q", [0])
+    targets = array("I")
+    for node in range(len(graph)):
+        neighbors: Dict[int, None] = {}
+        language = split_key(nodes[node])[1]
+        for ref in split_references(graph[nodes[node]]):
+            key = ref_key(graph, ref, language)
+            target = ids.get(key)
+            if target is None:
+                target = ids[key] = len(nodes)
+                nodes.append(key)
+            neighbors[target] = None
+        targets.extend(neighbors)
+        offsets.append(len(targets))
+
+    # Words only found in references have no references themselves
+    offsets.extend([len(targets)] * (len(nodes) - len(graph)))
+    return Adjacency(nodes, offsets, targets)
+
+
+def bfs(adjacency: Adjacency, sources: Iterable[int]) -> array:
+    """Number of hops from closest of `sources` to each node, as an array of
+    bytes (UNREACHABLE if there is no path, FAR if there are at least FAR
+    hops)."""
+    distances = array("B", [UNREACHABLE]) * len(adjacency)
+    frontier = list(sources)
+    for node in frontier:
+        distances[node] = 0
+
+    offsets, targets = adjacency.offsets, adjacency.targets
+    depth = 0
+    while frontier:
+        depth = min(depth + 1, FAR)
+        next_frontier = []
+        for node in frontier:
+            for target in targets[offsets[node] : offsets[node + 1]]:
+                if distances[target] == UNREACHABLE:
+                    distances[target] = depth
+                    next_frontier.append(target)
+        frontier = next_frontier
+    return distances
+
+
+def adjacency_path(path: str) -> str:
+    return f"{path}{EXTENSION}"
+
+
+def graph_stamp(path: str) -> Tuple[int, int]:
+    """Size and modification time of graph, stored in headers of files
+    derived from it."""
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def to_little_endian(values: array) -> array:
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+# Reading is the same operation
+from_little_endian = to_little_endian
+
+
+def save(adjacency: Adjacency, path: str) -> None:
+    """Write adjacency of graph stored in `path` into `path`.adj"""
+    names = "\n".join(adjacency.nodes).encode("utf-8")
+    with open(adjacency_path(path), mode="wb") as output:
+        output.write(
+            HEADER.pack(
+                MAGIC, *graph_stamp(path), len(adjacency), adjacency.edges, len(names)
+            )
+        )
+        to_little_endian(adjacency.offsets).tofile(output)
+        to_little_endian(adjacency.targets).tofile(output)
+        output.write(names)
+
+
+def is_valid(path: str) -> bool:
+    """Check that adjacency exists for `path` and is up-to-date."""
+    try:
+        with open(adjacency_path(path), mode="rb") as inputs:
+            magic, size, mtime, _, _, _ = HEADER.unpack(inputs.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return magic == MAGIC and (size, mtime) == graph_stamp(path)
+
+
+def load(path: str) -> Adjacency:
+    with open(adjacency_path(path), mode="rb") as inputs:
+        _, _, _, count, edges, size = HEADER.unpack(inputs.read(HEADER.size))
+        offsets = array("Q")
+        offsets.fromfile(inputs, count + 1)
+        targets = array("I")
+        targets.fromfile(inputs, edges)
+        nodes = inputs.read(size).decode("utf-8").split("\n") if count else []
+    return Adjacency(
+        [Word(node) for node in nodes],
+        from_little_endian(offsets),
+        from_little_endian(targets),
+    )
+
+
+def open_adjacency(
+    path: str, graph: Optional[Mapping[Word, SerializedRefs]] = None
+) -> Adjacency:
+    """Load adjacency of graph stored in `path`, building it (from `graph` if
+    it was already opened) if needed."""
+    if is_valid(path):
+        return load(path)
+    adjacency = build(graph if graph is not None else open_graph(path))
+    save(adjacency, path)
+    return adjacency
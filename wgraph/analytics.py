@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Whole-graph statistics and scores of words.
+
+Computes histograms of degrees, PageRank (following references, so that
+influential source words rank high) and HITS hub and authority scores over
+the adjacency arrays of the graph. A JSON report with the top words of the
+largest languages is printed, and attributes of all words are written next
+to the graph (`<graph>.attrs`, tab-separated, sorted by word, and the hubs in
+`<graph>.hubs`) where traversals can find hubs to avoid. Both files start
+with the size and modification time of graph, and are ignored once the graph
+changes.
+
+Usage:
+    analytics [options] <graph>
+    analytics -h | --help
+
+Options:
+    --iterations=<n>    Maximum number of iterations [default: 30].
+    --damping=<d>       Damping factor of PageRank [default: 0.85].
+    --hub-degree=<n>    Words with more references from and to them are hubs
+                        (defaults to the top 0.1% of degrees, at least 50).
+    --top=<n>           Number of languages, and of words per language, in
+                        report [default: 10].
+"""
+
+from array import array
+from collections import Counter, defaultdict
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+import heapq
+import json
+import math
+import mmap
+import time
+
+import docopt
+
+from wgraph.adjacency import Adjacency, graph_stamp, open_adjacency
+from wgraph.graph import SerializedRefs, Word, split_key, split_references
+from wgraph.index import open_graph
+
+EXTENSION = ".attrs"
+HUBS_EXTENSION = ".hubs"
+
+# Hubs have at least this degree, whatever the distribution of degrees
+MIN_HUB_DEGREE = 50
+
+Attributes = NamedTuple(
+    "Attributes",
+    [
+        ("word", Word),
+        ("language", Optional[str]),
+        ("in_degree", int),
+        ("out_degree", int),
+        ("pagerank", float),
+        ("hub", float),
+        ("authority", float),
+        ("is_hub", bool),
+    ],
+)
+
+
+def stamp(path: str) -> str:
+    """First line of files derived from graph stored in `path`."""
+    size, mtime = graph_stamp(path)
+    return f"#wgraph\t{size}\t{mtime}\n"
+
+
+def attributes_path(path: str) -> str:
+    return f"{path}{EXTENSION}"
+
+
+def hubs_path(path: str) -> str:
+    return f"{path}{HUBS_EXTENSION}"
+
+
+def node_languages(
+    graph: Mapping[Word, SerializedRefs], adjacency: Adjacency
+) -> List[Optional[str]]:
+    """Language of each node: language of its section for graphs keyed by
+    language, or origin of the first reference to it."""
+    languages = [split_key(node)[1] for node in adjacency.nodes]
+    for references in graph.values():
+        for ref in split_references(references):
+            if ref.origin is None:
+                continue
+            node = adjacency.ids.get(Word(ref.word))
+            if node is not None and languages[node] is None:
+                languages[node] = ref.origin
+    return languages
+
+
+def histogram(degrees: array) -> Dict[str, int]:
+    """Number of nodes per range of degrees, ranges doubling in size."""
+    buckets: Counter = Counter()
+    for degree in degrees:
+        buckets[degree and 1 << (degree.bit_length() - 1)] += 1
+    return {
+        f"{low}-{2 * low - 1}" if low > 1 else str(low): count
+        for low, count in sorted(buckets.items())
+    }
+
+
+def pagerank(
+    adjacency: Adjacency,
+    damping: float = 0.85,
+    iterations: int = 30,
+    tolerance: float = 1e-6,
+) -> List[float]:
+    """PageRank of nodes by power iteration, rank flowing along references.
+    Nodes without references give their rank to all nodes."""
+    count = len(adjacency)
+    if not count:
+        return []
+
+    offsets, targets = adjacency.offsets, adjacency.targets
+    ranks = [1.0 / count] * count
+    for _ in range(iterations):
+        dangling = 0.0
+        next_ranks = [0.0] * count
+        for node in range(count):
+            start, end = offsets[node], offsets[node + 1]
+            if start == end:
+                dangling += ranks[node]
+                continue
+            share = ranks[node] / (end - start)
+            for target in targets[start:end]:
+                next_ranks[target] += share
+
+        base = (1.0 - damping + damping * dangling) / count
+        next_ranks = [base + damping * rank for rank in next_ranks]
+        delta = sum(abs(new - old) for new, old in zip(next_ranks, ranks))
+        ranks = next_ranks
+        if delta < tolerance:
+            break
+    return ranks
+
+
+def normalize(scores: List[float]) -> List[float]:
+    norm = math.sqrt(sum(score * score for score in scores)) or 1.0
+    return [score / norm for score in scores]
+
+
+def hits(
+    adjacency: Adjacency, iterations: int = 30, tolerance: float = 1e-6
+) -> Tuple[List[float], List[float]]:
+    """HITS hub and authority scores of nodes. Good hubs reference many good
+    authorities, good authorities are referenced by many good hubs."""
+    count = len(adjacency)
+    offsets, targets = adjacency.offsets, adjacency.targets
+    hubs = normalize([1.0] * count)
+    authorities = hubs
+    for _ in range(iterations):
+        next_authorities = [0.0] * count
+        for node in range(count):
+            score = hubs[node]
+            for target in targets[offsets[node] : offsets[node + 1]]:
+                next_authorities[target] += score
+        authorities = normalize(next_authorities)
+
+        next_hubs = [0.0] * count
+        for node in range(count):
+            start, end = offsets[node], offsets[node + 1]
+            if start != end:
+                next_hubs[node] = sum([authorities[t] for t in targets[start:end]])
+        next_hubs = normalize(next_hubs)
+        delta = sum(abs(new - old) for new, old in zip(next_hubs, hubs))
+        hubs = next_hubs
+        if delta < tolerance:
+            break
+    return hubs, authorities
+
+
+def hub_threshold(degrees: List[int]) -> int:
+    """Top 0.1% of degrees, at least MIN_HUB_DEGREE."""
+    if not degrees:
+        return MIN_HUB_DEGREE
+    top = heapq.nlargest(max(1, len(degrees) // 1000), degrees)
+    return max(MIN_HUB_DEGREE, top[-1])
+
+
+def analyze(
+    graph: Mapping[Word, SerializedRefs],
+    adjacency: Adjacency,
+    damping: float = 0.85,
+    iterations: int = 30,
+    hub_degree: Optional[int] = None,
+) -> List[Attributes]:
+    in_degrees = adjacency.in_degrees()
+    out_degrees = adjacency.out_degrees()
+    degrees = [i + o for i, o in zip(in_degrees, out_degrees)]
+    if hub_degree is None:
+        hub_degree = hub_threshold(degrees)
+
+    languages = node_languages(graph, adjacency)
+    ranks = pagerank(adjacency, damping=damping, iterations=iterations)
+    hubs, authorities = hits(adjacency, iterations=iterations)
+    return [
+        Attributes(
+            word=word,
+            language=languages[node],
+            in_degree=in_degrees[node],
+            out_degree=out_degrees[node],
+            pagerank=ranks[node],
+            hub=hubs[node],
+            authority=authorities[node],
+            is_hub=degrees[node] >= hub_degree,
+        )
+        for node, word in enumerate(adjacency.nodes)
+    ]
+
+
+def report(attributes: List[Attributes], top: int = 10) -> Dict:
+    by_language: Dict[Optional[str], List[Attributes]] = defaultdict(list)
+    for node in attributes:
+        by_language[node.language].append(node)
+
+    def ranking(nodes: List[Attributes], score: str) -> List[Tuple[str, float]]:
+        best = heapq.nlargest(top, nodes, key=lambda node: getattr(node, score))
+        return [(node.word, getattr(node, score)) for node in best]
+
+    return {
+        "words": len(attributes),
+        "in_degrees": histogram(array("I", (node.in_degree for node in attributes))),
+        "out_degrees": histogram(array("I", (node.out_degree for node in attributes))),
+        "hubs": [
+            (node.word, node.in_degree, node.out_degree)
+            for node in heapq.nlargest(
+                top,
+                (node for node in attributes if node.is_hub),
+                key=lambda node: node.in_degree + node.out_degree,
+            )
+        ],
+        "languages": {
+            (language or "unknown"): {
+                "words": len(nodes),
+                "pagerank": ranking(nodes, "pagerank"),
+                "hub": ranking(nodes, "hub"),
+                "authority": ranking(nodes, "authority"),
+            }
+            for language, nodes in heapq.nlargest(
+                top, by_language.items(), key=lambda item: len(item[1])
+            )
+        },
+    }
+
+
+def dump(attributes: List[Attributes], path: str) -> None:
+    """Write attributes of words of graph stored in `path` into `path`.attrs,
+    and the words which are hubs into `path`.hubs (one per line), which is
+    small enough to be loaded by each traversal process."""
+    with open(hubs_path(path), mode="wt", encoding="utf-8") as output:
+        output.write(stamp(path))
+        for node in attributes:
+            if node.is_hub:
+                print(node.word, file=output)
+
+    with open(attributes_path(path), mode="wt", encoding="utf-8") as output:
+        output.write(stamp(path))
+        print("\t".join(Attributes._fields), file=output)
+        for node in sorted(attributes, key=lambda node: node.word):
+            print(
+                f"{node.word}\t{node.language or ''}\t{node.in_degree}\t"
+                f"{node.out_degree}\t{node.pagerank:.6g}\t{node.hub:.6g}\t"
+                f"{node.authority:.6g}\t{int(node.is_hub)}",
+                file=output,
+            )
+
+
+class Ranks(Mapping[str, float]):
+    """PageRank of words of graph stored in `path`, read on demand from the
+    memory-mapped `.attrs` file: words are found by bisecting its lines,
+    which are sorted by word, so that traversals only touch the pages of the
+    words they rank."""
+
+    def __init__(self, path: str):
+        with open(attributes_path(path), mode="rb") as inputs:
+            self._data = mmap.mmap(inputs.fileno(), 0, access=mmap.ACCESS_READ)
+        fields_start = self._data.find(b"\n") + 1
+        self._start = self._data.find(b"\n", fields_start) + 1
+        fields = self._data[fields_start : self._start - 1].split(b"\t")
+        self._column = fields.index(b"pagerank")
+        self._count: Optional[int] = None
+
+    def close(self) -> None:
+        self._data.close()
+
+    def _find(self, word: bytes) -> Optional[bytes]:
+        """Line of `word`, None if it is not found."""
+        low, high = self._start, len(self._data)
+        while low < high:
+            begin = self._data.rfind(b"\n", 0, (low + high) // 2) + 1
+            end = self._data.find(b"\n", begin)
+            if end == -1:
+                end = len(self._data)
+            line = self._data[begin:end]
+            found = line[: line.find(b"\t")]
+            if found < word:
+                low = end + 1
+            elif found > word:
+                high = begin
+            else:
+                return line
+        return None
+
+    def __getitem__(self, word: str) -> float:
+        line = self._find(word.encode("utf-8"))
+        if line is None:
+            raise KeyError(word)
+        return float(line.split(b"\t")[self._column])
+
+    def __iter__(self) -> Iterator[str]:
+        lines = self._data[self._start :].decode("utf-8").splitlines()
+        return (line[: line.find("\t")] for line in lines)
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
+
+
+def open_ranks(path: str) -> Mapping[str, float]:
+    """PageRank of words of graph stored in `path`, empty if analytics were
+    not computed or are outdated."""
+    try:
+        with open(attributes_path(path), mode="rt", encoding="utf-8") as inputs:
+            if inputs.readline() != stamp(path):
+                print("Attributes are outdated, run: analytics", path)
+                return {}
+        return Ranks(path)
+    except OSError:
+        return {}
+
+
+def load_hubs(path: str) -> FrozenSet[Word]:
+    """Words which are hubs in graph stored in `path`, empty if analytics were
+    not computed or are outdated."""
+    try:
+        with open(hubs_path(path), mode="rt", encoding="utf-8") as inputs:
+            if inputs.readline() != stamp(path):
+                print("Hubs are outdated, run: analytics", path)
+                return frozenset()
+            return frozenset(Word(line.rstrip("\n")) for line in inputs)
+    except OSError:
+        return frozenset()
+
+
+def main():
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+
+    t0 = time.time()
+    graph = open_graph(path)
+    adjacency = open_adjacency(path, graph)
+    attributes = analyze(
+        graph,
+        adjacency,
+        damping=float(args["--damping"]),
+        iterations=int(args["--iterations"]),
+        hub_degree=int(args["--hub-degree"]) if args["--hub-degree"] else None,
+    )
+    dump(attributes, path)
+    print("Analytics time", time.time() - t0)
+    print("Attributes written into:", attributes_path(path), hubs_path(path))
+    print(json.dumps(report(attributes, top=int(args["--top"])), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
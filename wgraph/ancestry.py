@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Stream the complete ancestry of a word.
+
+References are written as soon as they are explored, either as JSON objects
+(one per line) or as a tab-separated list of edges, so that very large
+ancestries can be piped to other tools. Exploration only proceeds as fast as
+the output is consumed, and at most `--frontier` references waiting to be
+explored are kept in memory, the others are spilled to a temporary file.
+
+Usage:
+    ancestry [options] <graph> <word>
+    ancestry -h | --help
+
+Options:
+    --format=<format>   Output format, 'ndjson' or 'edges' [default: ndjson].
+    --lang=<code>       Language of the word, for graphs keyed by language.
+    --max-depth=<n>     Maximum depth of the ancestry (unlimited by default).
+    --frontier=<n>      Maximum number of references to explore kept in
+                        memory [default: 100000].
+"""
+
+from collections import deque
+from typing import IO, Deque, Iterator, Mapping, Optional, Set, Tuple
+import contextlib
+import json
+import os
+import sys
+import tempfile
+
+import docopt
+
+from wgraph.graph import (
+    SerializedRefs,
+    Word,
+    ref_key,
+    resolve_key,
+    split_key,
+    split_references,
+)
+from wgraph.index import open_graph
+from wgraph.parsing.structs import Ref
+
+
+class SpillQueue:
+    """FIFO queue of lines keeping at most `max_items` of them in memory,
+    the most recent ones being appended to a temporary file and read back
+    when the ones in memory were consumed."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._head: Deque[str] = deque()
+        self._file: Optional[IO[bytes]] = None
+        self._spilled = 0
+        self._read_position = 0
+
+    def __len__(self) -> int:
+        return len(self._head) + self._spilled
+
+    def push(self, line: str) -> None:
+        # Once lines were spilled, new ones go after them to preserve order
+        if not self._spilled and len(self._head) < self.max_items:
+            self._head.append(line)
+            return
+
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._file.seek(0, 2)
+        self._file.write(line.encode("utf-8") + b"\n")
+        self._spilled += 1
+
+    def pop(self) -> str:
+        if not self._head and self._spilled:
+            self._refill()
+        return self._head.popleft()
+
+    def _refill(self) -> None:
+        assert self._file is not None
+        self._file.seek(self._read_position)
+        for _ in range(min(self.max_items, self._spilled)):
+            self._head.append(self._file.readline()[:-1].decode("utf-8"))
+        self._spilled -= len(self._head)
+        self._read_position = self._file.tell()
+
+        if not self._spilled:
+            # Everything was read back, reclaim disk space
+            self._file.seek(0)
+            self._file.truncate()
+            self._read_position = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def iter_ancestry(
+    graph: Mapping[Word, SerializedRefs],
+    word: Word,
+    language: Optional[str] = None,
+    max_depth: Optional[int] = None,
+    max_frontier: int = 100000,
+) -> Iterator[Tuple[Word, int, Ref]]:
+    """Explore graph level by level from `word` like `graph.dfs`, without
+    limit of depth by default, yielding (parent, level, ref) where `parent`
+    is the key of the referencing word. Only words already explored are kept
+    in memory, references waiting to be explored are spilled to disk beyond
+    `max_frontier`."""
+    root = resolve_key(graph, word, language)
+    if root is None:
+        return
+
+    seen: Set[Word] = set([root])
+    frontier = SpillQueue(max_frontier)
+    frontier.push(f"1\t{root}")
+    try:
+        while frontier:
+            level, parent = frontier.pop().split("\t")
+            depth = int(level)
+            language = split_key(parent)[1]
+            for ref in split_references(graph[Word(parent)]):
+                key = ref_key(graph, ref, language)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                yield Word(parent), depth, ref
+
+                if (
+                    ref.kind != "link"
+                    and (max_depth is None or depth < max_depth)
+                    and key in graph
+                ):
+                    frontier.push(f"{depth + 1}\t{key}")
+    finally:
+        frontier.close()
+
+
+def ndjson(parent: Word, level: int, ref: Ref) -> str:
+    return json.dumps(
+        {
+            "word": ref.word,
+            "origin": ref.origin,
+            "destination": ref.destination,
+            "kind": ref.kind,
+            "depth": level,
+            "parent": parent,
+        },
+        ensure_ascii=False,
+    )
+
+
+def edge(parent: Word, level: int, ref: Ref) -> str:
+    return f"{parent}\t{ref.word}\t{ref.kind}\t{ref.origin or ''}\t{level}"
+
+
+FORMATS = {"ndjson": ndjson, "edges": edge}
+
+
+def main():
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+    output_format = FORMATS.get(args["--format"])
+    if output_format is None:
+        sys.exit(f"Unknown format: {args['--format']}")
+
+    # Keep standard output for the ancestry
+    with contextlib.redirect_stdout(sys.stderr):
+        graph = open_graph(path)
+
+    try:
+        for parent, level, ref in iter_ancestry(
+            graph=graph,
+            word=Word(args["<word>"]),
+            language=args["--lang"],
+            max_depth=int(args["--max-depth"]) if args["--max-depth"] else None,
+            max_frontier=int(args["--frontier"]),
+        ):
+            print(output_format(parent, level, ref))
+    except BrokenPipeError:
+        # Downstream tool (e.g. `head`) does not need more, do not fail when
+        # flushing standard output on exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+if __name__ == "__main__":
+    main()
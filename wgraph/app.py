@@ -1,44 +1,353 @@
 #!/usr/bin/env python
 
-from flask import Flask, escape, request
+"""Web interface to explore etymology of words.
 
-from wgraph.summary import go
-from wgraph.graph import load, apply_styles
+The graph is read from the path found in the `WGRAPH_GRAPH` environment
+variable (defaults to `../graph.tsv`). When an index was built for it (see
+`wgraph.index`), workers memory-map the graph instead of loading it, so that
+all of them start instantly and share the same pages. A new graph can be
+published by building its index and then atomically renaming the index and
+the graph in place; workers pick it up on their next request. Words are
+completed, and misspelled words get suggestions, using the lookup index of the
+graph (see `wgraph.lookup`), which also tells which words only differ in case
+or diacritics and are explored as a single word.
+"""
+
+from functools import partial
+from typing import List, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+import json
+import os
+import threading
+
+from flask import (
+    Flask,
+    Response,
+    escape,
+    jsonify,
+    make_response,
+    request,
+    stream_with_context,
+)
+
+from wgraph.batch import batch_distances, group_queries
+from wgraph.cache import SVGCache, cache_key
+from wgraph.render import Renderer, svg_fragment
+from wgraph.workers import BoundedPool, Overloaded
+from wgraph.summary import etymology, go
+from wgraph.analytics import load_hubs
+from wgraph.graph import (
+    NO_EQUIVALENTS,
+    Budget,
+    Equivalents,
+    Pruning,
+    Word,
+    SerializedRefs,
+    apply_styles,
+    resolve_key,
+    split_key,
+    word_keys,
+)
+from wgraph.index import DiskGraph, is_valid, open_graph
+from wgraph.lookup import Lookup, open_lookup, variant_groups
 
 
 app = Flask(__name__)
-GRAPH = load("../graph.tsv")
+GRAPH_PATH = os.environ.get("WGRAPH_GRAPH", "../graph.tsv")
+
+GRAPH: Optional[Mapping[Word, SerializedRefs]] = None
+GRAPH_VERSION: Optional[Tuple[int, int, int]] = None
+GRAPH_LOCK = threading.Lock()
+# Graph replaced by the last swap, which requests started before it may still
+# be reading. It is closed on the next swap, requests being bounded in time.
+RETIRED_GRAPH: Optional[Mapping[Word, SerializedRefs]] = None
+
+# Lookup is built (or loaded) under its own lock, so that requests which do
+# not need it are never blocked while it is.
+LOOKUP_LOCK = threading.Lock()
+LOOKUP: Optional[Lookup] = None
+LOOKUP_VERSION: Optional[Tuple[int, int, int]] = None
+EQUIVALENTS: Equivalents = NO_EQUIVALENTS
+
+# Rendered graphs are cached in memory, and on disk if WGRAPH_CACHE_DIR is set
+SVG_CACHE = SVGCache(directory=os.environ.get("WGRAPH_CACHE_DIR"))
+
+# Traversals run in a bounded pool of threads and `dot` in a bounded number of
+# processes, requests which cannot be served in time get a 503.
+POOL = BoundedPool(timeout=10.0)
+RENDERER = Renderer(timeout=5.0)
+
+MAX_DEPTH = 5
+MAX_NODES = 50
+MAX_EDGES = 5000
+# Words with many references (or hubs found by wgraph.analytics) are not fully
+# expanded, so that a few of them do not flood traversals.
+MAX_DEGREE = 200
+MAX_FANOUT = 30
+# References of words exceeding MAX_FANOUT are ranked by word, PageRank of all
+# words (see wgraph.analytics) being too large to load in each worker.
+PRUNING = Pruning(
+    max_degree=MAX_DEGREE, max_fanout=MAX_FANOUT, hubs=frozenset(), ranks={}
+)
+# Traversals stop after this many seconds and return what was explored so far
+TRAVERSAL_TIMEOUT = 2.0
+GROUP_BY_ORIGIN = True
+# Batches are explored in jobs of at most BATCH_CHUNK_SIZE source words, which
+# run concurrently in POOL and are all subject to its timeout (503 once over).
+MAX_BATCH_SIZE = 1000
+BATCH_CHUNK_SIZE = 20
+MAX_SUGGESTIONS = 10
+# Explore words only differing in case or diacritics as a single word. All
+# traversals then need the lookup index, which should be built offline.
+MERGE_VARIANTS = False
+
+
+def graph_version(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def get_graph() -> Mapping[Word, SerializedRefs]:
+    """Return graph currently published at GRAPH_PATH, re-opening it if it was
+    replaced since last request."""
+    global GRAPH, GRAPH_VERSION, PRUNING, RETIRED_GRAPH
+
+    version = graph_version(GRAPH_PATH)
+    if GRAPH is not None and version == GRAPH_VERSION:
+        return GRAPH
+
+    with GRAPH_LOCK:
+        if GRAPH is None:
+            GRAPH = open_graph(GRAPH_PATH)
+            GRAPH_VERSION = version
+            PRUNING = PRUNING._replace(hubs=load_hubs(GRAPH_PATH))
+        elif version != GRAPH_VERSION and is_valid(GRAPH_PATH):
+            # Only swap once the index of the new graph is published, so
+            # that workers never fall back to loading the graph in memory.
+            if isinstance(RETIRED_GRAPH, DiskGraph):
+                RETIRED_GRAPH.close()
+            RETIRED_GRAPH = GRAPH
+            GRAPH = DiskGraph(GRAPH_PATH)
+            GRAPH_VERSION = version
+            PRUNING = PRUNING._replace(hubs=load_hubs(GRAPH_PATH))
+    return GRAPH
+
+
+def get_lookup() -> Lookup:
+    """Return lookup index of current graph, loading it (or building it if
+    it was not built yet) on first use."""
+    global LOOKUP, LOOKUP_VERSION, EQUIVALENTS
+
+    get_graph()
+    with GRAPH_LOCK:
+        graph, version = GRAPH, GRAPH_VERSION
+    if LOOKUP is not None and LOOKUP_VERSION == version:
+        return LOOKUP
+
+    with LOOKUP_LOCK:
+        if LOOKUP is not None and LOOKUP_VERSION == version:
+            return LOOKUP
+        lookup = open_lookup(GRAPH_PATH, graph)
+        lookup_equivalents = variant_groups(lookup)
+        with GRAPH_LOCK:
+            # Graph was swapped meanwhile: the lookup of the previous graph
+            # is returned to this request only.
+            if version != GRAPH_VERSION:
+                return lookup
+            EQUIVALENTS = lookup_equivalents
+            LOOKUP = lookup
+            LOOKUP_VERSION = version
+    return lookup
+
+
+def get_equivalents() -> Equivalents:
+    if not MERGE_VARIANTS:
+        return NO_EQUIVALENTS
+    get_lookup()
+    return EQUIVALENTS
+
+
+def suggestions(word: str, language: Optional[str] = None) -> List[str]:
+    """Keys of words close to `word` if it is not in graph, otherwise empty.
+    Words found in several languages, and queried without one, get the key of
+    each of them."""
+    if not word:
+        return []
+    graph = get_graph()
+    if resolve_key(graph, word, language) is not None:
+        return []
+    keys = word_keys(graph, word) if language is None else []
+    if keys:
+        return list(keys[:MAX_SUGGESTIONS])
+    return get_lookup().suggest(word, MAX_SUGGESTIONS)
+
+
+@app.errorhandler(Overloaded)
+def overloaded(error):
+    response = make_response(f"Service overloaded: {error}", 503)
+    response.headers["Retry-After"] = "1"
+    return response
 
 
 @app.route("/")
 def home():
     return """
 <form method="POST">
-    <input name="word">
+    <input name="word" list="words" autocomplete="off">
+    <datalist id="words"></datalist>
+    <input name="lang" placeholder="Language (optional)" size="10">
     <input type="submit" value="Enter a word">
 </form>
+<script>
+const input = document.querySelector("input[name=word]");
+input.addEventListener("input", async () => {
+    const response = await fetch(
+        `/complete?prefix=${encodeURIComponent(input.value)}`
+    );
+    const options = (await response.json()).map((word) => {
+        const option = document.createElement("option");
+        option.value = word;
+        return option;
+    });
+    document.getElementById("words").replaceChildren(...options);
+});
+</script>
 """
 
 
-def sumup(word):
-    # TODO - return error if no word specified
-    graph = go(
-        graph=GRAPH,
+@app.route("/complete", methods=["GET"])
+def complete():
+    """Words starting with `prefix`, ignoring case and diacritics."""
+    prefix = request.args.get("prefix", "")
+    if not prefix:
+        return jsonify([])
+    return jsonify(get_lookup().complete(prefix, MAX_SUGGESTIONS))
+
+
+@app.route("/suggest", methods=["GET"])
+def suggest():
+    """Words closest to `word`, if it is not in graph."""
+    return jsonify(suggestions(request.args.get("word"), request.args.get("lang")))
+
+
+def traversal_budget() -> Budget:
+    return Budget(max_edges=MAX_EDGES, timeout=TRAVERSAL_TIMEOUT)
+
+
+def render(
+    graph,
+    word,
+    language,
+    max_depth,
+    max_nodes,
+    group_by_origin,
+    pruning,
+    equivalents,
+) -> bytes:
+    g = go(
+        budget=traversal_budget(),
+        pruning=pruning,
+        equivalents=equivalents,
+        graph=graph,
         word=word,
-        max_depth=5,
-        max_nodes=50,
-        group_by_origin=True,
+        language=language,
+        max_depth=max_depth,
+        max_nodes=max_nodes,
+        group_by_origin=group_by_origin,
+    )
+    return RENDERER.render(apply_styles(word, g))
+
+
+def summary_svg(word, language=None):
+    """Return (ETag, SVG) of summary for `word` (in `language`, for graphs keyed
+    by language), SVG is None if the client already has the current version."""
+    graph = get_graph()
+
+    # The key identifies the rendered graph, it is used as ETag as well
+    key = cache_key(
+        word,
+        language,
+        MAX_DEPTH,
+        MAX_NODES,
+        GROUP_BY_ORIGIN,
+        MAX_DEGREE,
+        MAX_FANOUT,
+        MERGE_VARIANTS,
+        GRAPH_VERSION,
+    )
+    if request.if_none_match.contains(key):
+        return key, None
+
+    svg = SVG_CACHE.get(key)
+    if svg is None:
+        svg = POOL.run(
+            render,
+            graph,
+            word,
+            language,
+            MAX_DEPTH,
+            MAX_NODES,
+            GROUP_BY_ORIGIN,
+            PRUNING,
+            get_equivalents(),
+        )
+        SVG_CACHE.put(key, svg)
+    return key, svg
+
+
+def not_modified(key):
+    response = make_response("", 304)
+    response.set_etag(key)
+    return response
+
+
+def did_you_mean(word, keys):
+    links = []
+    for key in keys:
+        suggestion, suggestion_language = split_key(key)
+        query = urlencode({"word": suggestion, "lang": suggestion_language or ""})
+        label = f"{suggestion} ({suggestion_language})" if suggestion_language else key
+        links.append(f'<li><a href="/summary?{escape(query)}">{escape(label)}</a></li>')
+
+    if all(split_key(key)[0] == word for key in keys):
+        message, status = f"{escape(word)} is found in several languages:", 300
+    else:
+        message, status = f"{escape(word)} was not found, did you mean:", 404
+    return make_response(
+        f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8" />
+    <title>Wgraph {escape(word)}</title>
+</head>
+<body>
+<p>{message}</p>
+<ul>{"".join(links)}</ul>
+</body>
+</html>
+    """,
+        status,
     )
 
-    apply_styles(word, graph).render("output")
-    with open("output.svg") as inputs:
-        svg = inputs.read()
-        start = svg.find("<svg ")
-        if start != -1:
-            svg = svg[start:]
 
-        # TODO - return svg MIME type
-        return f"""
+def missing_word():
+    return make_response("Expected a word", 400)
+
+
+def sumup(word, language=None):
+    if not word:
+        return missing_word()
+    keys = suggestions(word, language)
+    if keys:
+        return did_you_mean(word, keys)
+
+    key, svg = summary_svg(word, language)
+    if svg is None:
+        return not_modified(key)
+
+    response = make_response(
+        f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -47,20 +356,164 @@ def sumup(word):
 </head>
 <body>
 <div style="max-width: 100%">
-{svg}
+{svg_fragment(svg)}
 </div>
 </body>
 </html>
     """
+    )
+    response.set_etag(key)
+    return response
 
 
 @app.route("/", methods=["POST"])
 def form():
-    word = request.form["word"]
-    return sumup(word)
+    word = request.form.get("word")
+    return sumup(word, request.form.get("lang") or None)
 
 
 @app.route("/summary", methods=["GET"])
 def summary():
     word = request.args.get("word")
-    return sumup(word)
+    return sumup(word, request.args.get("lang"))
+
+
+@app.route("/summary.svg", methods=["GET"])
+def summary_image():
+    word = request.args.get("word")
+    if not word:
+        return missing_word()
+    key, svg = summary_svg(word, request.args.get("lang"))
+    if svg is None:
+        return not_modified(key)
+
+    response = make_response(svg)
+    response.mimetype = "image/svg+xml"
+    response.set_etag(key)
+    return response
+
+
+def iter_levels(graph, word, language=None, budget=None):
+    """Yield (depth, nodes) for each level of the neighborhood of `word` as soon
+    as it has been explored."""
+    depth, nodes = 1, []
+    for parent, level, ref in etymology(
+        graph=graph,
+        word=word,
+        max_depth=MAX_DEPTH,
+        max_nodes=MAX_NODES,
+        language=language,
+        budget=budget,
+        pruning=PRUNING,
+        equivalents=get_equivalents(),
+    ):
+        if level != depth:
+            if nodes:
+                yield depth, nodes
+            depth, nodes = level, []
+
+        nodes.append(
+            {
+                "word": ref.word,
+                "origin": ref.origin,
+                "kind": ref.kind,
+                "depth": level,
+                "parent": parent.word if parent is not None else word,
+            }
+        )
+
+    if nodes:
+        yield depth, nodes
+
+
+def neighborhood(graph, word, language=None):
+    budget = traversal_budget()
+    nodes = [
+        node
+        for _, level in iter_levels(graph, word, language, budget)
+        for node in level
+    ]
+    return {
+        "word": word,
+        # True if the neighborhood was cut short by MAX_NODES, MAX_EDGES or
+        # TRAVERSAL_TIMEOUT
+        "truncated": budget.truncated,
+        # Words close to `word` when it is not in graph
+        "suggestions": suggestions(word, language),
+        "nodes": nodes,
+        "edges": [
+            {"source": node["parent"], "target": node["word"], "kind": node["kind"]}
+            for node in nodes
+        ],
+    }
+
+
+@app.route("/summary.json", methods=["GET"])
+def summary_json():
+    """Neighborhood of a word as nodes and edges, to be laid out by clients.
+    With `stream=1`, levels are streamed as newline-delimited JSON objects
+    while the graph is being explored."""
+    word = request.args.get("word")
+    language = request.args.get("lang")
+    graph = get_graph()
+
+    if request.args.get("stream") == "1":
+        # Levels are produced in POOL (503 when it is full), the traversal
+        # holding its slot for as long as the response is streamed.
+        levels = POOL.stream(iter_levels, graph, word, language, traversal_budget())
+        lines = (
+            json.dumps({"depth": depth, "nodes": nodes}) + "\n"
+            for depth, nodes in levels
+        )
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+    return jsonify(POOL.run(neighborhood, graph, word, language))
+
+
+def chunk_distances(graph, queries, closest, language):
+    return list(batch_distances(graph, queries, closest=closest, language=language))
+
+
+@app.route("/batch/distance", methods=["POST"])
+def batch_distance():
+    """Distances for a list of queries posted as JSON:
+    `{"pairs": [[word, target], ...], "closest": false, "lang": null}`.
+    Targets are words, or languages when `closest` is true. Source words are
+    looked up in `lang`, for graphs keyed by language."""
+    body = request.get_json(force=True, silent=True) or {}
+    pairs = body.get("pairs")
+    if not isinstance(pairs, list) or not all(
+        isinstance(pair, list)
+        and len(pair) == 2
+        and all(isinstance(word, str) for word in pair)
+        for pair in pairs
+    ):
+        return make_response("Expected a list of pairs", 400)
+    if len(pairs) > MAX_BATCH_SIZE:
+        return make_response(f"At most {MAX_BATCH_SIZE} pairs per batch", 413)
+
+    language = body.get("lang")
+    if language is not None and not isinstance(language, str):
+        return make_response("Expected a language code", 400)
+
+    graph = get_graph()
+    closest = bool(body.get("closest"))
+    groups = list(group_queries(pairs).items())
+    chunks = [
+        [
+            (word, target)
+            for word, targets in groups[start : start + BATCH_CHUNK_SIZE]
+            for target in targets
+        ]
+        for start in range(0, len(groups), BATCH_CHUNK_SIZE)
+    ]
+    results = POOL.map(
+        partial(chunk_distances, graph, closest=closest, language=language), chunks
+    )
+    return jsonify(
+        [
+            {"source": word, "target": target, "distance": distance}
+            for chunk in results
+            for word, target, distance in chunk
+        ]
+    )
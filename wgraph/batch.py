@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Answer many distance queries at once.
+
+Queries are read from stdin as tab-separated pairs of words (or of word and
+language with `--closest`), results are written on stdout with the distance
+appended as a third column (-1 if not found). Queries starting from the same
+word share a single traversal of the graph.
+
+Usage:
+    batch [options] <graph>
+    batch -h | --help
+
+Options:
+    --closest           Second column is a language, compute the distance to
+                        the closest word of this language.
+    --lang=<lang>       Language of source words, for graphs keyed by language.
+    --max-depth=<n>     Maximum depth of the graph to explore [default: 3].
+    --workers=<n>       Number of worker processes (defaults to CPU count).
+"""
+
+from collections import defaultdict
+from multiprocessing import Pool
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+import sys
+
+import docopt
+
+from wgraph.graph import SerializedRefs, Word, dfs
+from wgraph.index import open_graph
+
+
+def distances(
+    graph: Mapping[Word, SerializedRefs],
+    word: Word,
+    targets: Iterable[str],
+    closest: bool = False,
+    max_depth: int = 3,
+    language: Optional[str] = None,
+) -> Dict[str, int]:
+    """Distance from `word` to each of `targets` using a single traversal.
+    Targets are words, or languages if `closest` is True."""
+    remaining = set(targets)
+    found: Dict[str, int] = {}
+    for _, level, ref in dfs(
+        graph=graph, word=word, max_depth=max_depth, language=language
+    ):
+        target = ref.origin if closest else ref.word
+        if target in remaining:
+            remaining.remove(target)
+            found[target] = level
+            if not remaining:
+                break
+
+    return {target: found.get(target, -1) for target in targets}
+
+
+def group_queries(queries: Iterable[Tuple[str, str]]) -> Dict[Word, List[str]]:
+    """Group targets by source word, preserving order of first appearance."""
+    groups: Dict[Word, Dict[str, None]] = defaultdict(dict)
+    for word, target in queries:
+        groups[Word(word)][target] = None
+    return {word: list(targets) for word, targets in groups.items()}
+
+
+def batch_distances(
+    graph: Mapping[Word, SerializedRefs],
+    queries: Iterable[Tuple[str, str]],
+    closest: bool = False,
+    max_depth: int = 3,
+    language: Optional[str] = None,
+) -> Iterator[Tuple[str, str, int]]:
+    for word, targets in group_queries(queries).items():
+        for target, distance in distances(
+            graph,
+            word,
+            targets,
+            closest=closest,
+            max_depth=max_depth,
+            language=language,
+        ).items():
+            yield word, target, distance
+
+
+# Graph used by worker processes, inherited from the parent when workers are
+# forked, opened again otherwise.
+GRAPH: Optional[Mapping[Word, SerializedRefs]] = None
+
+
+def init_worker(path: str) -> None:
+    global GRAPH
+    if GRAPH is None:
+        GRAPH = open_graph(path)
+
+
+def run_group(
+    group: Tuple[Word, List[str], bool, int, Optional[str]],
+) -> List[Tuple[str, str, int]]:
+    word, targets, closest, max_depth, language = group
+    assert GRAPH is not None
+    return [
+        (word, target, distance)
+        for target, distance in distances(
+            GRAPH,
+            word,
+            targets,
+            closest=closest,
+            max_depth=max_depth,
+            language=language,
+        ).items()
+    ]
+
+
+def iter_queries(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    for line in lines:
+        parts = line.rstrip("\n").split("\t")
+        if len(parts) >= 2:
+            yield parts[0], parts[1]
+
+
+def main() -> None:
+    global GRAPH
+
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+    closest = args["--closest"]
+    max_depth = int(args["--max-depth"])
+    workers = int(args["--workers"]) if args["--workers"] else None
+    language = args["--lang"]
+
+    GRAPH = open_graph(path)
+    groups = [
+        (word, targets, closest, max_depth, language)
+        for word, targets in group_queries(iter_queries(sys.stdin)).items()
+    ]
+
+    with Pool(processes=workers, initializer=init_worker, initargs=(path,)) as pool:
+        for results in pool.imap(run_group, groups, chunksize=16):
+            for word, target, distance in results:
+                print(f"{word}\t{target}\t{distance}")
+
+
+if __name__ == "__main__":
+    main()
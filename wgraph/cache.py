@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Cache of rendered graphs, in memory and optionally on disk."""
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import hashlib
+import os
+import tempfile
+import threading
+
+
+def cache_key(*parts: object) -> str:
+    """Digest of query parameters, also used as ETag and file name."""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class SVGCache:
+    """LRU of rendered SVGs bounded by their total size. If `directory` is
+    specified, entries are also stored there (one file per key) so that they
+    survive restarts and are shared between workers; least recently used
+    files are evicted when the directory grows beyond `max_disk_bytes`."""
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_size = sum(size for _, size, _ in self._disk_entries())
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is not None:
+                self._entries.move_to_end(key)
+                return svg
+
+        if self.directory is not None:
+            path = os.path.join(self.directory, f"{key}.svg")
+            try:
+                with open(path, mode="rb") as inputs:
+                    svg = inputs.read()
+                os.utime(path)
+            except OSError:
+                return None
+            self._put_memory(key, svg)
+        return svg
+
+    def put(self, key: str, svg: bytes) -> None:
+        self._put_memory(key, svg)
+        if self.directory is not None:
+            self._put_disk(key, svg)
+
+    def _put_memory(self, key: str, svg: bytes) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+            self._entries[key] = svg
+            self._size += len(svg)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _put_disk(self, key: str, svg: bytes) -> None:
+        assert self.directory is not None
+
+        path = os.path.join(self.directory, f"{key}.svg")
+        try:
+            # Size of the entry being replaced, no longer taking space
+            previous = os.stat(path).st_size
+        except OSError:
+            previous = 0
+
+        # Write then rename so that concurrent readers never see partial files
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, mode="wb") as output:
+            output.write(svg)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._disk_size += len(svg) - previous
+            if self._disk_size > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self) -> List[Tuple[float, int, str]]:
+        """(modification time, size, path) of entries stored on disk. Files
+        being written by other workers (`.tmp`) are not entries yet."""
+        assert self.directory is not None
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".svg"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Evicted by another worker meanwhile
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict_disk(self) -> None:
+        files = sorted(self._disk_entries())
+        self._disk_size = sum(size for _, size, _ in files)
+        # Evict down to 90% of the budget to not evict on every insertion
+        for _, size, path in files:
+            if self._disk_size <= 0.9 * self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._disk_size -= size
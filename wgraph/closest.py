@@ -1,19 +1,44 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from typing import Tuple
-import sys
+"""Find the closest word of a language, following references from a word.
+
+Usage:
+    closest [options] <graph> <word> <target-lang>
+    closest -h | --help
+
+Options:
+    --lang=<lang>       Language of <word>, for graphs keyed by language.
+"""
+
+from typing import Optional, Tuple
 import time
 
-from wgraph.graph import load, search, Word, verbose, Graph
+import docopt
 
+from wgraph.graph import search, Word, verbose, Graph
+from wgraph.components import Components, open_components
+from wgraph.index import open_graph
+
+
+def distance_to_closest(
+    graph: Graph,
+    word: Word,
+    langs: Tuple[str, ...],
+    components: Optional[Components] = None,
+    language: Optional[str] = None,
+) -> int:
+    if components is not None and not components.reaches_languages(
+        word, langs, language
+    ):
+        return -1
 
-def distance_to_closest(graph: Graph, word: Word, langs: Tuple[str, ...]) -> int:
     graph_path = search(
         graph=graph,
         start_word=word,
         stop_condition=lambda ref: ref.origin in langs,
         max_depth=3,
+        language=language,
     )
     if not graph_path:
         return -1
@@ -21,20 +46,30 @@ def distance_to_closest(graph: Graph, word: Word, langs: Tuple[str, ...]) -> int
 
 
 def main() -> None:
-    path = sys.argv[1]
-    word = Word(sys.argv[2])
-    lang = sys.argv[3]
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+    word = Word(args["<word>"])
+    lang = args["<target-lang>"]
+    language = args["--lang"]
 
     t0 = time.time()
-    graph = load(path)
+    graph = open_graph(path)
+    components = open_components(path)
 
     t1 = time.time()
-    graph_path = search(
-        graph=graph,
-        start_word=word,
-        stop_condition=lambda ref: ref.origin == lang,
-        max_depth=3,
-    )
+    if components is not None and not components.reaches_languages(
+        word, [lang], language
+    ):
+        print("Unreachable: no word of", lang, "is related to", word)
+        graph_path = []
+    else:
+        graph_path = search(
+            graph=graph,
+            start_word=word,
+            stop_condition=lambda ref: ref.origin == lang,
+            max_depth=3,
+            language=language,
+        )
     t2 = time.time()
     print("Search time", t2 - t1)
     print("Total time", t2 - t0)
@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Weakly and strongly connected components of graph.
+
+Components are labeled offline and stored next to the graph (`<graph>.cc`),
+with the sorted names of words so that queries memory-map the labels instead
+of loading the adjacency of graph.
+Words in different weakly connected components are not related at all, and
+strongly connected components are numbered in topological order, so that a
+word can only reach words of components with a greater or equal number. Both
+tell instantly that a word cannot be reached from another one, and prune
+traversals looking for a given word.
+
+Usage:
+    components build <graph>
+    components <graph>
+    components -h | --help
+"""
+
+from array import array
+from collections import Counter, defaultdict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+import json
+import mmap
+import struct
+
+import docopt
+
+from wgraph.adjacency import (
+    Adjacency,
+    from_little_endian,
+    graph_stamp,
+    open_adjacency,
+    to_little_endian,
+)
+from wgraph.graph import (
+    SerializedRefs,
+    Word,
+    node_key,
+    ref_key,
+    split_references,
+)
+from wgraph.index import open_graph
+from wgraph.parsing.structs import Ref
+
+EXTENSION = ".cc"
+MAGIC = b"WGRAPHC2"
+
+# Magic, size and modification time of graph, number of words, size of the
+# sorted records `word\tnode`, size of the list of languages of weakly
+# connected components.
+HEADER = struct.Struct("<8sQQQQQ")
+LABEL = struct.Struct("<I")
+POSITION = struct.Struct("<Q")
+
+
+def components_path(path: str) -> str:
+    return f"{path}{EXTENSION}"
+
+
+def weak_components(adjacency: Adjacency) -> array:
+    """Label of weakly connected component of each node (union-find)."""
+    parents = array("I", range(len(adjacency)))
+
+    def find(node: int) -> int:
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    offsets, targets = adjacency.offsets, adjacency.targets
+    for node in range(len(adjacency)):
+        for target in targets[offsets[node] : offsets[node + 1]]:
+            root, other = find(node), find(target)
+            if root != other:
+                parents[max(root, other)] = min(root, other)
+
+    labels = array("I", [0]) * len(adjacency)
+    roots: Dict[int, int] = {}
+    for node in range(len(adjacency)):
+        labels[node] = roots.setdefault(find(node), len(roots))
+    return labels
+
+
+def strong_components(adjacency: Adjacency) -> array:
+    """Label of strongly connected component of each node (Kosaraju). Labels
+    follow a topological order: edges never go from a component to one with
+    a smaller label."""
+    offsets, targets = adjacency.offsets, adjacency.targets
+
+    # Order nodes by time at which their exploration finished
+    finished: List[int] = []
+    visited = bytearray(len(adjacency))
+    next_edge = array("Q", offsets)
+    for start in range(len(adjacency)):
+        if visited[start]:
+            continue
+        visited[start] = 1
+        stack = [start]
+        while stack:
+            node = stack[-1]
+            edge = next_edge[node]
+            if edge < offsets[node + 1]:
+                next_edge[node] = edge + 1
+                target = targets[edge]
+                if not visited[target]:
+                    visited[target] = 1
+                    stack.append(target)
+            else:
+                stack.pop()
+                finished.append(node)
+
+    # Nodes reaching the last finished node (in reversed graph) form a
+    # component with no incoming edges, and so on.
+    reverse = adjacency.reverse()
+    unlabeled = len(adjacency)
+    labels = array("I", [unlabeled]) * len(adjacency)
+    label = 0
+    for start in reversed(finished):
+        if labels[start] != unlabeled:
+            continue
+        labels[start] = label
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for source in reverse.neighbors(node):
+                if labels[source] == unlabeled:
+                    labels[source] = label
+                    stack.append(source)
+        label += 1
+    return labels
+
+
+def component_languages(
+    graph: Mapping[Word, SerializedRefs], adjacency: Adjacency, weak: array
+) -> Dict[int, Set[str]]:
+    """Origins of references found in each weakly connected component."""
+    languages: Dict[int, Set[str]] = defaultdict(set)
+    for word, references in graph.items():
+        component = weak[adjacency.ids[word]]
+        for ref in split_references(references):
+            if ref.origin is not None:
+                languages[component].add(ref.origin)
+    return languages
+
+
+ComponentLabels = NamedTuple(
+    "ComponentLabels",
+    [
+        ("nodes", List[Word]),
+        ("weak", array),
+        ("strong", array),
+        ("languages", Mapping[int, Set[str]]),
+    ],
+)
+
+
+def build(
+    graph: Mapping[Word, SerializedRefs], adjacency: Adjacency
+) -> ComponentLabels:
+    weak = weak_components(adjacency)
+    return ComponentLabels(
+        adjacency.nodes,
+        weak,
+        strong_components(adjacency),
+        component_languages(graph, adjacency, weak),
+    )
+
+
+def save(labels: ComponentLabels, path: str) -> None:
+    """Write components of graph stored in `path` into `path`.cc"""
+    records = [
+        b"%s\t%d\n" % (node.encode("utf-8"), i) for i, node in enumerate(labels.nodes)
+    ]
+    records.sort()
+    languages = "\n".join(
+        f"{component}\t{' '.join(sorted(origins))}"
+        for component, origins in labels.languages.items()
+    ).encode("utf-8")
+    with open(components_path(path), mode="wb") as output:
+        output.write(
+            HEADER.pack(
+                MAGIC,
+                *graph_stamp(path),
+                len(labels.nodes),
+                sum(len(record) for record in records),
+                len(languages),
+            )
+        )
+        to_little_endian(labels.weak).tofile(output)
+        to_little_endian(labels.strong).tofile(output)
+
+        # Position of each record, records are written right after (as in
+        # wgraph.index)
+        position = output.tell() + POSITION.size * len(records)
+        for record in records:
+            output.write(POSITION.pack(position))
+            position += len(record)
+        output.writelines(records)
+        output.write(languages)
+
+
+def is_valid(path: str) -> bool:
+    """Check that components exist for `path` and are up-to-date."""
+    try:
+        with open(components_path(path), mode="rb") as inputs:
+            magic, size, mtime, _, _, _ = HEADER.unpack(inputs.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return magic == MAGIC and (size, mtime) == graph_stamp(path)
+
+
+class Components:
+    """Components of graph stored in `path`, read on demand from the
+    memory-mapped `.cc` file: answering a query only touches the pages of the
+    words involved, the adjacency of graph is not needed."""
+
+    def __init__(self, path: str):
+        with open(components_path(path), mode="rb") as inputs:
+            self._data = mmap.mmap(inputs.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, self._count, names, languages = HEADER.unpack_from(self._data, 0)
+        self._weak = HEADER.size
+        self._strong = self._weak + LABEL.size * self._count
+        self._positions = self._strong + LABEL.size * self._count
+        self._languages = self._positions + POSITION.size * self._count + names
+        self._languages_size = languages
+        self._languages_of: Optional[Dict[int, Set[str]]] = None
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def weak(self, node: int) -> int:
+        return LABEL.unpack_from(self._data, self._weak + LABEL.size * node)[0]
+
+    def strong(self, node: int) -> int:
+        return LABEL.unpack_from(self._data, self._strong + LABEL.size * node)[0]
+
+    def labels(self, name: str) -> array:
+        """All labels of weakly or strongly connected components."""
+        start = self._weak if name == "weak" else self._strong
+        labels = array("I")
+        labels.frombytes(self._data[start : start + LABEL.size * self._count])
+        return from_little_endian(labels)
+
+    @property
+    def languages(self) -> Dict[int, Set[str]]:
+        """Origins of references found in each weakly connected component."""
+        if self._languages_of is None:
+            data = self._data[
+                self._languages : self._languages + self._languages_size
+            ].decode("utf-8")
+            languages = {}
+            for line in data.splitlines():
+                component, origins = line.split("\t")
+                languages[int(component)] = set(origins.split())
+            self._languages_of = languages
+        return self._languages_of
+
+    def _record(self, i: int) -> Tuple[bytes, int]:
+        (start,) = POSITION.unpack_from(self._data, self._positions + POSITION.size * i)
+        end = self._data.find(b"\n", start)
+        name, node = self._data[start:end].rsplit(b"\t", 1)
+        return name, int(node)
+
+    def _position(self, name: bytes) -> int:
+        """Position of first record greater than or equal to `name`."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(middle)[0] < name:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, key: str) -> Optional[int]:
+        """Node of `key` (word, or `word|language`), None if not found."""
+        name = key.encode("utf-8")
+        i = self._position(name)
+        if i < self._count:
+            found, node = self._record(i)
+            if found == name:
+                return node
+        return None
+
+    def _keyed(self, word: str) -> List[int]:
+        """Nodes `word|language` of `word`, which are consecutive."""
+        prefix = f"{word}|".encode("utf-8")
+        nodes = []
+        for i in range(self._position(prefix), self._count):
+            name, node = self._record(i)
+            if not name.startswith(prefix):
+                break
+            nodes.append(node)
+        return nodes
+
+    def ids_of(self, word: str) -> List[int]:
+        """Nodes of `word` in any language."""
+        node = self.get(word)
+        return ([node] if node is not None else []) + self._keyed(word)
+
+    def start(self, word: str, language: Optional[str] = None) -> List[int]:
+        """Node from which traversals of `word` start, as resolved by
+        `graph.resolve_key`."""
+        node = self.get(node_key(word, language))
+        if node is None and language is None:
+            nodes = self._keyed(word)
+            if len(nodes) == 1:
+                node = nodes[0]
+        return [node] if node is not None else []
+
+    def may_reach(self, sources: Sequence[int], targets: Sequence[int]) -> bool:
+        """False if none of `targets` can be reached from any of `sources`."""
+        weak, strong = self.weak, self.strong
+        return any(
+            weak(u) == weak(v) and strong(u) <= strong(v)
+            for u in sources
+            for v in targets
+        )
+
+    def reachable(self, word: str, target: str, language: Optional[str] = None) -> bool:
+        """False if `target` (in any language) cannot be reached from `word`."""
+        return self.may_reach(self.start(word, language), self.ids_of(target))
+
+    def reaches_languages(
+        self, word: str, languages: Iterable[str], language: Optional[str] = None
+    ) -> bool:
+        """False if no reference of `languages` can be reached from `word`."""
+        languages = set(languages)
+        return any(
+            not languages.isdisjoint(self.languages.get(self.weak(node), ()))
+            for node in self.start(word, language)
+        )
+
+    def ref_filter(
+        self, graph: Mapping[Word, SerializedRefs], target: str
+    ) -> Callable[[Ref], bool]:
+        """Predicate rejecting references from which `target` cannot be
+        reached, to prune traversals (see `graph.dfs`). References without
+        origin are resolved in any language."""
+        targets = self.ids_of(target)
+
+        def may_reach_target(ref: Ref) -> bool:
+            if ref.origin is None:
+                nodes = self.ids_of(ref.word)
+                return not nodes or self.may_reach(nodes, targets)
+            node = self.get(ref_key(graph, ref))
+            return node is None or self.may_reach([node], targets)
+
+        return may_reach_target
+
+    def report(self) -> Dict[str, Any]:
+        """Sizes of components, to monitor quality of graph."""
+        report: Dict[str, Any] = {}
+        for name in ("weak", "strong"):
+            sizes = Counter(self.labels(name))
+            histogram = Counter(sizes.values())
+            report[name] = {
+                "count": len(sizes),
+                "largest": sorted(sizes.values(), reverse=True)[:10],
+                "singletons": histogram[1],
+                "sizes": {
+                    str(size): count for size, count in sorted(histogram.items())
+                },
+            }
+        report["words"] = len(self)
+        return report
+
+
+def open_components(path: str) -> Optional[Components]:
+    """Components of graph stored in `path` if they were built and are
+    up-to-date, None otherwise (they are never built on demand)."""
+    if is_valid(path):
+        return Components(path)
+    return None
+
+
+def main():
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+
+    if args["build"]:
+        graph = open_graph(path)
+        save(build(graph, open_adjacency(path, graph)), path)
+        print("Components written into:", components_path(path))
+
+    components = open_components(path)
+    if components is None:
+        print("Components are missing or outdated, run: components build", path)
+        return
+
+    print(json.dumps(components.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
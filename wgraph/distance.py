@@ -1,11 +1,28 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import sys
+"""Find how words are related, following references from one to the other.
+
+Usage:
+    distance [options] <graph> <word> <target>
+    distance -h | --help
+
+Options:
+    --lang=<lang>       Language of <word>, for graphs keyed by language.
+    --weighted          Weight references by kind, the path with the lowest
+                        cost is returned instead of the shortest one.
+    --landmarks=<n>     Number of landmarks guiding weighted search [default: 0].
+    --max-cost=<cost>   Maximum cost of weighted paths [default: 8].
+"""
+
+from typing import List, Optional
+import math
 import time
 
+import docopt
+
 from wgraph.graph import (
-    load,
+    Budget,
     search,
     Word,
     verbose,
@@ -15,14 +32,32 @@ from wgraph.graph import (
     create_graph,
     apply_styles,
 )
+from wgraph.components import Components, open_components
+from wgraph.parsing.structs import Ref
+from wgraph.index import open_graph
+from wgraph.weighted import Heuristic, Landmarks, select_landmarks, shortest_path
+
 
+def distance(
+    graph: Graph,
+    word1: Word,
+    word2: Word,
+    components: Optional[Components] = None,
+    language: Optional[str] = None,
+) -> int:
+    is_valid = None
+    if components is not None:
+        if not components.reachable(word1, word2, language):
+            return -1
+        is_valid = components.ref_filter(graph, word2)
 
-def distance(graph: Graph, word1: Word, word2: Word) -> int:
     graph_path = search(
         graph=graph,
         start_word=word1,
         stop_condition=lambda ref: ref.word == word2,
         max_depth=3,
+        language=language,
+        is_valid=is_valid,
     )
 
     if not graph_path:
@@ -30,21 +65,74 @@ def distance(graph: Graph, word1: Word, word2: Word) -> int:
     return len(graph_path)
 
 
+def weighted_distance(
+    graph: Graph,
+    word1: Word,
+    word2: Word,
+    heuristic: Optional[Heuristic] = None,
+    max_cost: Optional[float] = None,
+    language: Optional[str] = None,
+) -> float:
+    """Cost of cheapest path from `word1` to `word2`, -1 if there is none."""
+    cost, _ = shortest_path(
+        graph=graph,
+        start_word=word1,
+        stop_condition=lambda ref: ref.word == word2,
+        heuristic=heuristic,
+        max_cost=max_cost,
+        language=language,
+    )
+    if cost == math.inf:
+        return -1
+    return cost
+
+
 def main() -> None:
-    path = sys.argv[1]
-    word1 = Word(sys.argv[2])
-    word2 = Word(sys.argv[3])
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+    word1 = Word(args["<word>"])
+    word2 = Word(args["<target>"])
+    language = args["--lang"]
 
     t0 = time.time()
-    graph = load(path)
+    graph = open_graph(path)
+    components = open_components(path)
 
     t1 = time.time()
-    graph_path = search(
-        graph=graph,
-        start_word=word1,
-        stop_condition=lambda ref: ref.word == word2,
-        max_depth=3,
-    )
+    if components is not None and not components.reachable(word1, word2, language):
+        print("Unreachable:", word2, "is not related to", word1)
+        graph_path: List[Ref] = []
+    elif args["--weighted"]:
+        heuristic = None
+        landmarks = int(args["--landmarks"])
+        if landmarks:
+            words = select_landmarks(graph, landmarks)
+            heuristic = Landmarks(graph, words).heuristic(word2)
+            t1 = time.time()
+            print("Landmarks time", t1 - t0)
+
+        budget = Budget()
+        cost, graph_path = shortest_path(
+            graph=graph,
+            start_word=word1,
+            stop_condition=lambda ref: ref.word == word2,
+            heuristic=heuristic,
+            max_cost=float(args["--max-cost"]),
+            language=language,
+            budget=budget,
+        )
+        print("Expanded words", budget.nodes)
+        if graph_path:
+            print("Cost:", cost)
+    else:
+        graph_path = search(
+            graph=graph,
+            start_word=word1,
+            stop_condition=lambda ref: ref.word == word2,
+            max_depth=3,
+            language=language,
+            is_valid=components.ref_filter(graph, word2) if components else None,
+        )
     t2 = time.time()
     print("Search time", t2 - t1)
     print("Total time", t2 - t0)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Seekable, frame-based compressed storage for graphs.
+
+Lines of the graph are sorted by word and grouped into frames which are
+compressed independently, so that they can be decompressed in parallel and
+single words can be looked-up by only decompressing one frame. The layout of
+the file is:
+
+    MAGIC
+    frame 0, frame 1, ..., frame n     (compressed, sorted graph lines)
+    index                              (compressed `first word\\toffset\\tsize`)
+    footer                             (offset and size of index, MAGIC)
+"""
+
+from typing import Iterable, Iterator, List, Tuple
+import struct
+import zlib
+
+EXTENSION = ".frames"
+MAGIC = b"WGRAPHF1"
+FOOTER = struct.Struct("<QQ8s")
+
+# Size of uncompressed frames, this is a trade-off between compression ratio
+# and the amount of data to decompress for a single look-up.
+FRAME_SIZE = 1024 * 1024
+
+FrameIndex = List[Tuple[str, int, int]]
+
+
+def write(lines: Iterable[Tuple[str, str]], path: str, frame_size=FRAME_SIZE):
+    """Write (word, serialized references) pairs into a framed file. `lines`
+    are expected to be sorted by word."""
+    index: FrameIndex = []
+    with open(path, mode="wb") as output:
+        output.write(MAGIC)
+
+        def flush(frame: List[str], first_word: str) -> None:
+            compressed = zlib.compress("".join(frame).encode("utf-8"))
+            index.append((first_word, output.tell(), len(compressed)))
+            output.write(compressed)
+
+        frame: List[str] = []
+        frame_length = 0
+        first_word = ""
+        for word, references in lines:
+            if not frame:
+                first_word = word
+            line = f"{word}\t{references}\n"
+            frame.append(line)
+            frame_length += len(line)
+            if frame_length >= frame_size:
+                flush(frame, first_word)
+                frame = []
+                frame_length = 0
+
+        if frame:
+            flush(frame, first_word)
+
+        index_offset = output.tell()
+        serialized_index = zlib.compress(
+            "".join(f"{w}\t{o}\t{s}\n" for w, o, s in index).encode("utf-8")
+        )
+        output.write(serialized_index)
+        output.write(FOOTER.pack(index_offset, len(serialized_index), MAGIC))
+
+
+def read_index(path: str) -> FrameIndex:
+    """Read index of frames: (first word, offset, size) sorted by word."""
+    with open(path, mode="rb") as inputs:
+        if inputs.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a framed graph")
+        inputs.seek(-FOOTER.size, 2)
+        offset, size, magic = FOOTER.unpack(inputs.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is truncated")
+        inputs.seek(offset)
+        serialized_index = zlib.decompress(inputs.read(size)).decode("utf-8")
+
+    index: FrameIndex = []
+    for line in serialized_index.splitlines():
+        word, frame_offset, frame_size = line.rsplit("\t", 2)
+        index.append((word, int(frame_offset), int(frame_size)))
+    return index
+
+
+def read_frame(path: str, offset: int, size: int) -> str:
+    with open(path, mode="rb") as inputs:
+        inputs.seek(offset)
+        return zlib.decompress(inputs.read(size)).decode("utf-8")
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    for _, offset, size in read_index(path):
+        for line in read_frame(path, offset, size).split("\n"):
+            if line:
+                yield line
@@ -2,28 +2,56 @@
 # -*- coding: utf-8 -*-
 
 from typing import (
+    AbstractSet,
     Callable,
     Dict,
     Iterable,
     Iterator,
     List,
+    Mapping,
+    NamedTuple,
     NewType,
     Optional,
+    Sequence,
     Set,
     Tuple,
+    cast,
 )
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from types import MappingProxyType
 import bz2
 import gzip
+import heapq
+import os
 import time
 
-from iso639 import languages
 import graphviz as gv
 
 from wgraph.parsing.structs import Ref
+from wgraph.languages import language_names
+from wgraph import frames
 
 Word = NewType("Word", str)
 SerializedRefs = NewType("SerializedRefs", str)
-Graph = NewType("Graph", Dict[Word, SerializedRefs])
+
+
+class Graph(Dict[Word, SerializedRefs]):
+    """Graph loaded in memory."""
+
+    _by_word: Optional[Dict[str, List[Word]]] = None
+
+    def keys_of(self, word: str) -> List[Word]:
+        """Keys `word|language` of `word`, indexed on first call (the graph
+        must not be modified afterwards)."""
+        if self._by_word is None:
+            by_word: Dict[str, List[Word]] = {}
+            for key in self:
+                bare, language = split_key(key)
+                if language is not None:
+                    by_word.setdefault(bare, []).append(key)
+            self._by_word = by_word
+        return self._by_word.get(word, [])
 
 
 REF_KIND = {
@@ -42,9 +70,72 @@ REF_KIND = {
 }
 
 
+def node_key(word: str, language: Optional[str] = None) -> Word:
+    """Key of `word` in graph. Graphs extracted with the language of sections
+    have keys `word|language`, which are not ambiguous across languages."""
+    if language:
+        return Word(f"{word}|{language}")
+    return Word(word)
+
+
+def split_key(key: str) -> Tuple[str, Optional[str]]:
+    word, _, language = key.partition("|")
+    return word, language or None
+
+
+def word_keys(graph: Mapping[Word, SerializedRefs], word: str) -> Sequence[Word]:
+    """Keys `word|language` of `word` in graph. Graphs which do not index
+    them (see `Graph.keys_of`) are scanned."""
+    keys_of = getattr(graph, "keys_of", None)
+    if keys_of is not None:
+        return keys_of(word)
+    prefix = f"{word}|"
+    return [key for key in graph if key.startswith(prefix)]
+
+
+def resolve_key(
+    graph: Mapping[Word, SerializedRefs], word: str, language: Optional[str] = None
+) -> Optional[Word]:
+    """Key of `word` (in `language` if specified) in graph, None if it is
+    not found. Without language, the bare word is used, or the only key of
+    `word` in graphs keyed by language."""
+    key = node_key(word, language)
+    if key in graph:
+        return key
+    if language is None:
+        keys = word_keys(graph, word)
+        if len(keys) == 1:
+            return keys[0]
+    return None
+
+
+def ref_key(
+    graph: Mapping[Word, SerializedRefs], ref: Ref, language: Optional[str] = None
+) -> Word:
+    """Key of the word referenced by `ref`, found in an entry of `language`:
+    word in the language of origin of the reference if present in graph.
+    References without origin (e.g. links) are resolved in their language of
+    destination or `language`, then like words queried without language (see
+    `resolve_key`). The bare word is returned for words not found."""
+    if ref.origin:
+        key = node_key(ref.word, ref.origin)
+        if key in graph:
+            return key
+        return Word(ref.word)
+
+    language = ref.destination or language
+    if language:
+        key = node_key(ref.word, language)
+        if key in graph:
+            return key
+    return resolve_key(graph, ref.word) or Word(ref.word)
+
+
 def iter_lines(path: str) -> Iterator[str]:
     """Iter lines from all dumps"""
-    if path.endswith(".bz2"):
+    if path.endswith(frames.EXTENSION):
+        yield from frames.iter_lines(path)
+    elif path.endswith(".bz2"):
         with bz2.open(path, mode="rt") as input_wiki:
             yield from input_wiki
     elif path.endswith(".gz"):
@@ -76,15 +167,105 @@ def split_references(references: str) -> Iterator[Ref]:
             yield deserialized
 
 
-def load(path: str) -> Graph:
+# Plain-text graphs smaller than this are loaded in a single process, the cost
+# of spawning workers and merging their results would dominate.
+MIN_CHUNK_SIZE = 32 * 1024 * 1024
+
+
+def shallow_split_reference(line: str) -> Tuple[Word, SerializedRefs]:
+    word, references = line.split("\t", 1)
+    return (Word(word), SerializedRefs(references))
+
+
+def iter_chunks(path: str, chunks: int) -> Iterator[Tuple[int, int]]:
+    """Split a plain-text graph into `chunks` byte ranges aligned on lines."""
+    size = os.path.getsize(path)
+    step = max(1, size // chunks)
+    with open(path, mode="rb") as inputs:
+        start = 0
+        while start < size:
+            end = start + step
+            if end >= size:
+                end = size
+            else:
+                inputs.seek(end)
+                inputs.readline()
+                end = inputs.tell()
+            yield start, end
+            start = end
+
+
+# Words and serialized references of lines of graph, each joined by newlines:
+# workers return them as two strings which are cheap to transfer, and which
+# are merged without unpickling then re-hashing a dict per chunk.
+Columns = Tuple[str, str]
+
+
+def split_columns(lines: str) -> Columns:
+    words: List[str] = []
+    references: List[str] = []
+    for line in lines.split("\n"):
+        if line:
+            word, refs = line.split("\t", 1)
+            words.append(word)
+            references.append(refs)
+    return "\n".join(words), "\n".join(references)
+
+
+def load_chunk(path: str, start: int, end: int) -> Columns:
+    """Parse lines of graph found between bytes `start` and `end` of `path`."""
+    with open(path, mode="rb") as inputs:
+        inputs.seek(start)
+        data = inputs.read(end - start).decode("utf-8")
+    return split_columns(data)
+
+
+def load_frame(path: str, offset: int, size: int) -> Columns:
+    """Decompress and parse one frame of a framed graph."""
+    return split_columns(frames.read_frame(path, offset, size))
+
+
+def load(
+    path: str, workers: Optional[int] = None, chunk_size: int = MIN_CHUNK_SIZE
+) -> Graph:
+    """Load graph stored in `path` in memory, using up to `workers` processes
+    for frames, and for plain-text graphs of at least two `chunk_size` chunks."""
     print("Loading graph")
     t0 = time.time()
 
-    def shallow_split_reference(line: str) -> Tuple[Word, SerializedRefs]:
-        word, references = line.split("\t", 1)
-        return (Word(word), SerializedRefs(references))
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    load_task: Callable[[str, int, int], Columns] = load_chunk
+    tasks: List[Tuple[int, int]] = []
+    if workers > 1 and path.endswith(frames.EXTENSION):
+        # Frames are compressed independently and can be loaded in parallel
+        load_task = load_frame
+        tasks = [(offset, size) for _, offset, size in frames.read_index(path)]
+    elif workers > 1 and not path.endswith((".bz2", ".gz")):
+        chunks = min(workers, os.path.getsize(path) // chunk_size + 1)
+        if chunks > 1:
+            tasks = list(iter_chunks(path, chunks))
+
+    if not tasks:
+        graph = Graph(
+            shallow_split_reference(line.rstrip("\n")) for line in iter_lines(path)
+        )
+    else:
+        graph = Graph()
+        starts, ends = zip(*tasks)
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            for words, references in executor.map(
+                load_task, repeat(path), starts, ends
+            ):
+                if words:
+                    graph.update(
+                        zip(
+                            cast(List[Word], words.split("\n")),
+                            cast(List[SerializedRefs], references.split("\n")),
+                        )
+                    )
 
-    graph = Graph(dict(shallow_split_reference(entry) for entry in iter_lines(path)))
     t1 = time.time()
     print("Loading time", t1 - t0)
     print("Number of words", len(graph))
@@ -92,62 +273,202 @@ def load(path: str) -> Graph:
 
 
 def dump(references: Iterable[Tuple[str, Set[Ref]]], path: str) -> None:
+    if path.endswith(frames.EXTENSION):
+        # Framed graphs are sorted so that words can be found using the index
+        frames.write(
+            (
+                (word, "\t".join([serialize_ref(r) for r in refs]))
+                for word, refs in sorted(references, key=lambda entry: entry[0])
+            ),
+            path,
+        )
+        return
+
     with open(path, mode="wt") as output:
         for word, refs in references:
             serialized_references = "\t".join([serialize_ref(r) for r in refs])
             print(f"{word}\t{serialized_references}", file=output)
 
 
+class Budget:
+    """Limits of a traversal: number of nodes yielded, number of edges queued
+    and wall-clock time (in seconds). When a traversal stops early because of
+    one of them, `truncated` is set to True."""
+
+    def __init__(
+        self,
+        max_nodes: Optional[int] = None,
+        max_edges: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.nodes = 0
+        self.edges = 0
+        self.truncated = False
+
+    def allows_node(self) -> bool:
+        if (self.max_nodes is not None and self.nodes >= self.max_nodes) or (
+            self.deadline is not None and time.monotonic() > self.deadline
+        ):
+            self.truncated = True
+            return False
+        self.nodes += 1
+        return True
+
+    def allows_edge(self) -> bool:
+        if self.max_edges is not None and self.edges >= self.max_edges:
+            self.truncated = True
+            return False
+        self.edges += 1
+        return True
+
+
+# Limits of expansion of words having many references (or referenced by many
+# words), which would otherwise flood traversals: words with more than
+# `max_degree` references are not expanded, at most `max_fanout` references
+# of each word are explored (the ones to words of highest `ranks`, e.g.
+# PageRank from wgraph.analytics, then in order of words), and references of
+# `hubs` are explored after the ones of other words at the same depth. The
+# word a traversal starts from is always fully expanded.
+Pruning = NamedTuple(
+    "Pruning",
+    [
+        ("max_degree", Optional[int]),
+        ("max_fanout", Optional[int]),
+        ("hubs", AbstractSet[str]),
+        ("ranks", Mapping[str, float]),
+    ],
+)
+
+NO_PRUNING = Pruning(max_degree=None, max_fanout=None, hubs=frozenset(), ranks={})
+
+# Keys of words only differing in case, diacritics or Unicode normalization,
+# indexed by each of them (see `lookup.variant_groups`). Traversals explore them
+# as a single word, the first key of the group.
+Equivalents = Mapping[Word, Sequence[Word]]
+NO_EQUIVALENTS: Equivalents = MappingProxyType({})
+
+
+def fanout_order(
+    graph: Mapping[Word, SerializedRefs],
+    ranks: Mapping[str, float],
+    language: Optional[str],
+) -> Callable[[Ref], Tuple[float, str, str, str]]:
+    """Sort key of references of a word of `language` explored first when
+    they exceed the fan-out: to words of highest rank, then in order."""
+
+    def order(ref: Ref) -> Tuple[float, str, str, str]:
+        rank = ranks.get(ref_key(graph, ref, language), 0.0)
+        return (-rank, ref.word, ref.origin or "", ref.kind)
+
+    return order
+
+
 def dfs(
-    graph: Graph, word: Word, max_depth: int = 2
+    graph: Mapping[Word, SerializedRefs],
+    word: Word,
+    max_depth: int = 2,
+    language: Optional[str] = None,
+    budget: Optional[Budget] = None,
+    is_valid: Optional[Callable[[Ref], bool]] = None,
+    pruning: Pruning = NO_PRUNING,
+    equivalents: Equivalents = NO_EQUIVALENTS,
 ) -> Iterator[Tuple[Optional[Ref], int, Ref]]:
-    if word not in graph:
+    """Explore graph level by level from `word`, yielding (parent, level, ref).
+    References rejected by `is_valid` are neither yielded nor explored, and
+    exploration stops as soon as `budget` is exhausted. Words which are
+    `equivalents` are explored once, with the references of all of them."""
+    if budget is None:
+        budget = Budget()
+    max_degree, max_fanout, hubs, ranks = pruning
+
+    root = resolve_key(graph, word, language)
+    if root is None:
         return
-
-    # Keep track of the mapping between each ref and its parent
-    parents: Dict[Ref, Ref] = {}
+    group = equivalents.get(root, (root,))
 
     # Keep track of processed words to not explore parts of the graphs more than once
-    seen: Set[Word] = set([word])
-
-    # Queue managing parts of the graph to explore
-    queue: List[Optional[Ref]] = []
-    queue.extend(split_references(graph[word]))
-    queue.append(None)
+    seen: Set[Word] = set([group[0]])
+
+    # References to explore at current level, with their parent and the
+    # language of the word referencing them.
+    language = split_key(root)[1]
+    frontier: List[Tuple[Optional[Ref], Optional[str], Ref]] = [
+        (None, language, ref)
+        for key in group
+        for ref in split_references(graph[key])
+        if is_valid is None or is_valid(ref)
+    ]
 
     level = 1
-    while queue and level <= max_depth:
-        ref = queue.pop(0)
-
-        if ref is None:
-            level += 1
-        else:
-            word = Word(ref.word)
+    while frontier and level <= max_depth:
+        next_frontier: List[Tuple[Optional[Ref], Optional[str], Ref]] = []
+        deferred: List[Tuple[Optional[Ref], Optional[str], Ref]] = []
+        for parent, language, ref in frontier:
+            word = ref_key(graph, ref, language)
+            variants = equivalents.get(word)
+            if variants is not None:
+                word = variants[0]
 
             if word in seen:
                 continue
             seen.add(word)
 
-            print((parents.get(ref), level, ref))
-            yield (parents.get(ref), level, ref)
+            if not budget.allows_node():
+                return
+            yield (parent, level, ref)
 
-            if ref.kind == 'link':
+            if ref.kind == "link" or level == max_depth or word not in graph:
                 continue
 
-            if word in graph:
-                for r in split_references(graph[word]):
-                    parents[r] = ref
-                    queue.append(r)
+            if variants is None:
+                references = graph[word]
+            else:
+                references = SerializedRefs("\t".join(graph[key] for key in variants))
+            if max_degree is not None and references.count("\t") >= max_degree:
+                continue
+
+            queue = deferred if word in hubs else next_frontier
+            language = split_key(word)[1]
+            refs = [
+                r
+                for r in split_references(references)
+                if is_valid is None or is_valid(r)
+            ]
+            if max_fanout is not None and len(refs) > max_fanout:
+                # Order of references in graph is arbitrary
+                refs = heapq.nsmallest(
+                    max_fanout, refs, key=fanout_order(graph, ranks, language)
+                )
+            for r in refs:
+                if not budget.allows_edge():
+                    break
+                queue.append((ref, language, r))
+
+        frontier = next_frontier + deferred
+        level += 1
 
 
 def search(
-    graph: Graph,
+    graph: Mapping[Word, SerializedRefs],
     start_word: Word,
     stop_condition: Callable[[Ref], bool],
     max_depth: int = 2,
+    language: Optional[str] = None,
+    is_valid: Optional[Callable[[Ref], bool]] = None,
+    equivalents: Equivalents = NO_EQUIVALENTS,
 ) -> List[Ref]:
     parents: Dict[Ref, Ref] = {}
-    for parent, _, ref in dfs(graph=graph, max_depth=max_depth, word=start_word):
+    for parent, _, ref in dfs(
+        graph=graph,
+        max_depth=max_depth,
+        word=start_word,
+        language=language,
+        is_valid=is_valid,
+        equivalents=equivalents,
+    ):
         # Keep track of parents
         if parent is not None:
             parents[ref] = parent
@@ -162,28 +483,10 @@ def search(
     return []
 
 
-EXTRA_LANGUAGES = {
-    "gem-pro": "Proto-Germanic",
-    "ine-pro": "Proto-Indo-European",
-    "cel-pro": "Proto-Celtic",
-    "gmq-osw": "Old Swedish",
-}
-
-
 def verbose_language(origin: Optional[str]) -> str:
-    language = "unknown origin"
-    if origin is not None:
-        language = EXTRA_LANGUAGES.get(origin, origin)
-        try:
-            if len(origin) == 2:
-                language = languages.get(alpha2=origin).name
-            elif len(origin) == 3:
-                language = languages.get(part3=origin).name
-            else:
-                print("???", origin)
-        except KeyError:
-            language = origin
-    return language
+    if origin is None:
+        return "unknown origin"
+    return language_names().get(origin, origin)
 
 
 def verbose(ref: Ref) -> str:
@@ -237,7 +540,6 @@ def add_node(graph, parent, ref, default_parent):
 
     # Create new node
     graph.node(ref.word)
-    print(ref.kind)
     graph.edge(
         parent.word if parent is not None else default_parent, ref.word, label=ref.kind
     )
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Build a point-lookup index for a plain-text graph.
+
+The index maps each word to the byte offset of its line in the graph, keys
+being sorted so that look-ups are a binary search over a memory-mapped file.
+Queries about a handful of words can then be answered without loading the
+whole graph in memory. Only plain-text graphs can be indexed: lines of
+compressed graphs are not found at byte offsets of the file. Framed graphs
+(see `wgraph.frames`) are looked-up using their own index of frames instead.
+
+Usage:
+    index <graph>
+    index -h | --help
+"""
+
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple, Union
+import functools
+import mmap
+import os
+import struct
+import sys
+
+import docopt
+
+from wgraph import frames
+from wgraph.graph import Word, SerializedRefs, load
+
+EXTENSION = ".idx"
+MAGIC = b"WGRAPHI1"
+
+# Magic, size and modification time of indexed graph, number of words
+HEADER = struct.Struct("<8sQQQ")
+OFFSET = struct.Struct("<Q")
+
+# Number of decompressed frames kept by FrameGraph
+FRAME_CACHE_SIZE = 16
+
+# Signatures of compressed graphs
+COMPRESSED = {b"\x1f\x8b": "gzip", b"BZh": "bzip2", frames.MAGIC: "frames"}
+
+
+def index_path(path: str) -> str:
+    return f"{path}{EXTENSION}"
+
+
+def compression(path: str) -> Optional[str]:
+    """Compression format of graph stored in `path`, None if plain text."""
+    with open(path, mode="rb") as inputs:
+        head = inputs.read(max(len(signature) for signature in COMPRESSED))
+    for signature, name in COMPRESSED.items():
+        if head.startswith(signature):
+            return name
+    return None
+
+
+def build(path: str) -> None:
+    """Index lines of graph stored in `path` into `path`.idx"""
+    compressed = compression(path)
+    if compressed is not None:
+        raise ValueError(
+            f"{path} is compressed ({compressed}), only plain-text graphs can be"
+            " indexed: decompress it first"
+        )
+
+    offsets = {}
+    with open(path, mode="rb") as inputs:
+        offset = 0
+        for line in inputs:
+            offsets[line.split(b"\t", 1)[0]] = offset
+            offset += len(line)
+
+    stat = os.stat(path)
+    with open(index_path(path), mode="wb") as output:
+        output.write(HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets)))
+
+        # Position of each record, records are written right after
+        position = HEADER.size + OFFSET.size * len(offsets)
+        records = []
+        for word, offset in sorted(offsets.items()):
+            record = b"%s\t%d\n" % (word, offset)
+            output.write(OFFSET.pack(position))
+            records.append(record)
+            position += len(record)
+
+        output.writelines(records)
+
+
+def is_valid(path: str) -> bool:
+    """Check that an index exists for `path` and is up-to-date, and that
+    graph is plain text."""
+    try:
+        with open(index_path(path), mode="rb") as inputs:
+            magic, size, mtime, _ = HEADER.unpack(inputs.read(HEADER.size))
+        stat = os.stat(path)
+        if compression(path) is not None:
+            return False
+    except (OSError, struct.error):
+        return False
+    return magic == MAGIC and size == stat.st_size and mtime == stat.st_mtime_ns
+
+
+class DiskGraph(Mapping[Word, SerializedRefs]):
+    """Read-only view of an indexed graph, adjacency is fetched on demand
+    from memory-mapped files and can be shared between processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(index_path(path), mode="rb") as inputs:
+            self._index = mmap.mmap(inputs.fileno(), 0, access=mmap.ACCESS_READ)
+        _, size, _, self._count = HEADER.unpack_from(self._index, 0)
+
+        # Empty files cannot be mapped
+        self._graph: Union[bytes, mmap.mmap] = b""
+        if size:
+            with open(path, mode="rb") as inputs:
+                self._graph = mmap.mmap(inputs.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        self._index.close()
+        if isinstance(self._graph, mmap.mmap):
+            self._graph.close()
+
+    def _record(self, i: int) -> Tuple[bytes, int]:
+        (start,) = OFFSET.unpack_from(self._index, HEADER.size + OFFSET.size * i)
+        end = self._index.find(b"\n", start)
+        word, offset = self._index[start:end].rsplit(b"\t", 1)
+        return word, int(offset)
+
+    def _position(self, word: bytes) -> int:
+        """Position of first record greater than or equal to `word`."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(middle)[0] < word:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, word: bytes) -> int:
+        low = self._position(word)
+        if low < self._count:
+            found, offset = self._record(low)
+            if found == word:
+                return offset
+        return -1
+
+    def __getitem__(self, word: Word) -> SerializedRefs:
+        offset = self._find(word.encode("utf-8"))
+        if offset == -1:
+            raise KeyError(word)
+
+        start = self._graph.find(b"\t", offset) + 1
+        end = self._graph.find(b"\n", start)
+        if end == -1:
+            end = len(self._graph)
+        return SerializedRefs(self._graph[start:end].decode("utf-8"))
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self._find(word.encode("utf-8")) != -1
+
+    def keys_of(self, word: str) -> List[Word]:
+        """Keys `word|language` of `word`, which are consecutive in index."""
+        prefix = f"{word}|".encode("utf-8")
+        keys = []
+        for i in range(self._position(prefix), self._count):
+            key = self._record(i)[0]
+            if not key.startswith(prefix):
+                break
+            keys.append(Word(key.decode("utf-8")))
+        return keys
+
+    def __iter__(self) -> Iterator[Word]:
+        for i in range(self._count):
+            yield Word(self._record(i)[0].decode("utf-8"))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class FrameGraph(Mapping[Word, SerializedRefs]):
+    """Read-only view of a framed graph (see `wgraph.frames`): the frame of a
+    word is found by bisecting the first words of frames, and only this frame
+    is decompressed. The last FRAME_CACHE_SIZE frames used are kept."""
+
+    def __init__(self, path: str):
+        self.path = path
+        index = frames.read_index(path)
+        self._first_words = [word for word, _, _ in index]
+        self._positions = [(offset, size) for _, offset, size in index]
+        self._frame = functools.lru_cache(maxsize=FRAME_CACHE_SIZE)(self._load_frame)
+        self._count: Optional[int] = None
+
+    def _load_frame(self, i: int) -> Dict[Word, SerializedRefs]:
+        offset, size = self._positions[i]
+        frame = {}
+        for line in frames.read_frame(self.path, offset, size).split("\n"):
+            if line:
+                word, references = line.split("\t", 1)
+                frame[Word(word)] = SerializedRefs(references)
+        return frame
+
+    def _frame_of(self, word: str) -> int:
+        """Frame which would contain `word`, -1 if it is before all frames."""
+        return bisect_right(self._first_words, word) - 1
+
+    def __getitem__(self, word: Word) -> SerializedRefs:
+        i = self._frame_of(word)
+        if i < 0:
+            raise KeyError(word)
+        return self._frame(i)[word]
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str):
+            return False
+        i = self._frame_of(word)
+        return i >= 0 and word in self._frame(i)
+
+    def keys_of(self, word: str) -> List[Word]:
+        """Keys `word|language` of `word`, which are consecutive in frames."""
+        prefix = f"{word}|"
+        keys = []
+        for i in range(max(0, self._frame_of(prefix)), len(self._positions)):
+            for key in self._frame(i):
+                if key.startswith(prefix):
+                    keys.append(key)
+                elif key > prefix:
+                    return keys
+        return keys
+
+    def __iter__(self) -> Iterator[Word]:
+        for i in range(len(self._positions)):
+            yield from self._frame(i)
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(len(self._frame(i)) for i in range(len(self._positions)))
+        return self._count
+
+
+def open_graph(path: str) -> Mapping[Word, SerializedRefs]:
+    """Open graph from its index if one is available, or its frames if it is
+    a framed graph, or load it in memory."""
+    if path.endswith(frames.EXTENSION):
+        return FrameGraph(path)
+    if is_valid(path):
+        return DiskGraph(path)
+    return load(path)
+
+
+def main():
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+    try:
+        build(path)
+    except ValueError as error:
+        sys.exit(str(error))
+    print("Index written into:", index_path(path))
+
+
+if __name__ == "__main__":
+    main()
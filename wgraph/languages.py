@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Names of languages for the codes found in references.
+
+Names come from ISO 639 (codes of 2 or 3 letters), then `EXTRA_LANGUAGES`
+(codes used by Wiktionary for proto-languages and the like), then the table of
+the French Wiktionary for the remaining codes. Merging these tables is slow,
+so the result is persisted in `$XDG_CACHE_HOME/wgraph/` and rebuilt only when
+one of its sources changes.
+"""
+
+from importlib.util import find_spec
+from typing import Dict, List, Optional
+import json
+import os
+import tempfile
+
+EXTRA_LANGUAGES = {
+    "gem-pro": "Proto-Germanic",
+    "ine-pro": "Proto-Indo-European",
+    "cel-pro": "Proto-Celtic",
+    "gmq-osw": "Old Swedish",
+}
+
+# Increment when the way the table is built changes
+VERSION = 1
+
+NAMES: Optional[Dict[str, str]] = None
+
+
+def build() -> Dict[str, str]:
+    from iso639 import languages
+
+    from wgraph.parsing.fr_langs import LANGUAGES
+
+    names = {}
+    for code, language in languages.part1.items():
+        names[code] = language.name
+    for code, language in languages.part3.items():
+        names.setdefault(code, language.name)
+    for code, name in EXTRA_LANGUAGES.items():
+        names.setdefault(code, name)
+    for code, entry in LANGUAGES.items():
+        # Entries mix string and boolean fields, mypy types them as objects
+        if isinstance(entry, dict):
+            names.setdefault(code, entry["nom"])
+    return names
+
+
+def cache_path() -> str:
+    directory = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(directory, "wgraph", "languages.json")
+
+
+def fingerprint() -> List[int]:
+    """Identify sources of the table, without importing them."""
+    sources = [
+        __file__,
+        os.path.join(os.path.dirname(__file__), "parsing", "fr_langs.py"),
+    ]
+    spec = find_spec("iso639")
+    if spec is not None and spec.origin is not None:
+        sources.append(spec.origin)
+    return [VERSION] + [os.stat(path).st_mtime_ns for path in sources]
+
+
+def load() -> Dict[str, str]:
+    """Load table from cache, or build and persist it."""
+    path = cache_path()
+    version = fingerprint()
+    try:
+        with open(path, mode="rt", encoding="utf-8") as inputs:
+            cached = json.load(inputs)
+        if cached["fingerprint"] == version:
+            return cached["names"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    names = build()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so that concurrent readers never see partial files
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, mode="wt", encoding="utf-8") as output:
+            json.dump({"fingerprint": version, "names": names}, output)
+        os.replace(tmp, path)
+    except OSError:
+        # The cache is an optimization, a read-only home is fine
+        pass
+    return names
+
+
+def language_names() -> Dict[str, str]:
+    global NAMES
+    if NAMES is None:
+        NAMES = load()
+    return NAMES
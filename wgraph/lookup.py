@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Prefix and fuzzy lookup of words of a graph.
+
+Words of graph are folded (case, diacritics, Unicode normalization and
+language of graphs keyed by language are ignored) and sorted, so that
+completions of a prefix are found by binary search, and indexed by trigrams
+so that words within a small edit distance of a misspelled word can be
+suggested. The index is stored next to the graph
+(`<graph>.lookup`) so that it is only built once. Keys of graph with the same
+folded word (and language) are equivalent, and can be merged by traversals.
+
+Usage:
+    lookup build <graph>
+    lookup [options] <graph> <word>
+    lookup -h | --help
+
+Options:
+    --limit=<n>         Maximum number of words returned [default: 10].
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+import os
+import struct
+import time
+import unicodedata
+
+import docopt
+
+from wgraph.adjacency import from_little_endian, graph_stamp, to_little_endian
+from wgraph.graph import Equivalents, SerializedRefs, Word, split_key
+from wgraph.index import open_graph
+
+EXTENSION = ".lookup"
+MAGIC = b"WGRAPHT1"
+
+# Magic, size and modification time of graph, number of words, sizes of lists
+# of words and of keys, number of trigrams, size of list of trigrams and
+# number of postings.
+HEADER = struct.Struct("<8sQQQQQQQQ")
+
+# Only the candidates sharing most trigrams with a word are compared to it
+MAX_CANDIDATES = 50
+
+# Trigrams found in more than this ratio of words are too common to select
+# candidates and are ignored.
+STOP_RATIO = 0.01
+
+
+def lookup_path(path: str) -> str:
+    return f"{path}{EXTENSION}"
+
+
+def fold(word: str) -> str:
+    """Key of words which only differ in case, diacritics or normalization.
+
+    >>> fold('Pollĭcem')
+    'pollicem'
+    >>> fold('ἄνθρωπος') == fold('ανθρωπος')
+    True
+    """
+    return "".join(
+        c for c in unicodedata.normalize("NFD", word) if not unicodedata.combining(c)
+    ).casefold()
+
+
+def trigrams(key: str) -> List[str]:
+    """
+    >>> trigrams('arm')
+    ['$$a', '$ar', 'arm', 'rm$', 'm$$']
+    """
+    padded = f"$${key}$$"
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str, bound: int) -> int:
+    """Levenshtein distance between `a` and `b`, or `bound + 1` if greater.
+    Columns of the dynamic programming matrix are encoded as bit vectors
+    (Myers, Hyyrö), which makes it a few integer operations per character.
+
+    >>> edit_distance('pollex', 'polex', 2)
+    1
+    >>> edit_distance('pollex', 'thumb', 2)
+    3
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if not a:
+        return len(b)
+
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    last = 1 << (len(a) - 1)
+    full = (1 << len(a)) - 1
+
+    distance = len(a)
+    positive, negative = full, 0
+    for char in b:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        up = negative | (~(horizontal | positive) & full)
+        down = positive & horizontal
+        if up & last:
+            distance += 1
+        elif down & last:
+            distance -= 1
+        up = (up << 1) | 1
+        down <<= 1
+        positive = (down | ~(vertical | up)) & full
+        negative = up & vertical
+    return min(distance, bound + 1)
+
+
+class Sorted:
+    """Sequence of `key(i)` for `i` in `indices`, to binary search it."""
+
+    def __init__(self, indices: Sequence[int], key: Callable[[int], Any]):
+        self.indices = indices
+        self.key = key
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, i: int) -> Any:
+        return self.key(self.indices[i])
+
+
+class Lookup:
+    def __init__(
+        self,
+        words: List[str],
+        keys: List[str],
+        order: array,
+        grams: List[str],
+        offsets: array,
+        postings: array,
+    ):
+        # Words are numbered by length of their key, then by key, so that
+        # words of a given length have consecutive numbers. `order` lists
+        # them by key, and postings of trigram `i` are the numbers of words in
+        # `postings[offsets[i]:offsets[i + 1]]`.
+        self.words = words
+        self.keys = keys
+        self.order = order
+        self.trigrams: Dict[str, int] = {gram: i for i, gram in enumerate(grams)}
+        self.offsets = offsets
+        self.postings = postings
+        self.max_postings = max(100, int(len(words) * STOP_RATIO))
+
+        # First number of words with keys of each length
+        lengths = Sorted(range(len(keys)), lambda i: len(keys[i]))
+        longest = len(keys[-1]) if keys else 0
+        self.first = [bisect_left(lengths, n) for n in range(longest + 2)]
+        self.alphabetical = Sorted(order, keys.__getitem__)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def by_length(self, low: int, high: int) -> Tuple[int, int]:
+        """Range of numbers of words with keys of length in [low, high]."""
+        first = self.first
+        low = first[min(max(low, 0), len(first) - 1)]
+        high = first[min(max(high + 1, 0), len(first) - 1)]
+        return low, high
+
+    def variants(self, word: str) -> List[str]:
+        """Words only differing from `word` in case, diacritics or
+        normalization (including `word` if it is in graph)."""
+        key = fold(word)
+        low = bisect_left(self.alphabetical, key)
+        high = bisect_right(self.alphabetical, key, lo=low)
+        return [self.words[i] for i in self.order[low:high]]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Words starting with `prefix`, in alphabetical order of keys."""
+        key = fold(prefix)
+        completions: List[str] = []
+        order, keys = self.order, self.keys
+        for i in range(bisect_left(self.alphabetical, key), len(order)):
+            if len(completions) == limit or not keys[order[i]].startswith(key):
+                break
+            completions.append(self.words[order[i]])
+        return completions
+
+    def suggest(
+        self, word: str, limit: int = 10, max_distance: Optional[int] = None
+    ) -> List[str]:
+        """Words closest to `word` in edit distance (at most `max_distance`,
+        which defaults to 1 for short words and 2 otherwise), ignoring case
+        and diacritics."""
+        key = fold(word)
+        if max_distance is None:
+            max_distance = 1 if len(key) <= 4 else 2
+
+        # Only words of close lengths can be within `max_distance`
+        low, high = self.by_length(len(key) - max_distance, len(key) + max_distance)
+        postings, offsets = self.postings, self.offsets
+        grams = set(trigrams(key))
+        counts: Counter = Counter()
+        skipped = 0
+        for gram in grams:
+            i = self.trigrams.get(gram)
+            if i is None:
+                continue
+            start = bisect_left(postings, low, offsets[i], offsets[i + 1])
+            end = bisect_left(postings, high, start, offsets[i + 1])
+            if end - start > self.max_postings:
+                skipped += 1
+            else:
+                counts.update(postings[start:end])
+
+        # An edit changes at most three trigrams of a word
+        required = max(1, len(grams) - 3 * max_distance - skipped)
+        candidates = [
+            i for i, count in counts.most_common(MAX_CANDIDATES) if count >= required
+        ]
+
+        scored = []
+        for i in candidates:
+            distance = edit_distance(key, self.keys[i], max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -counts[i], self.words[i]))
+        return [word for _, _, word in sorted(scored)[:limit]]
+
+
+def build(graph: Mapping[Word, SerializedRefs]) -> Lookup:
+    """Lookup of keys of graph, which are returned as they are (e.g.
+    `word|language` for graphs keyed by language)."""
+    pairs = sorted(
+        (len(key), key, word)
+        for key, word in ((fold(split_key(word)[0]), word) for word in graph)
+    )
+    keys = [key for _, key, _ in pairs]
+    order = array("I", sorted(range(len(keys)), key=keys.__getitem__))
+    postings: Dict[str, array] = defaultdict(lambda: array("I"))
+    for i, key in enumerate(keys):
+        for gram in set(trigrams(key)):
+            postings[gram].append(i)
+
+    grams = sorted(postings)
+    offsets = array("Q", [0])
+    concatenated = array("I")
+    for gram in grams:
+        concatenated.extend(postings[gram])
+        offsets.append(len(concatenated))
+    return Lookup(
+        [word for _, _, word in pairs], keys, order, grams, offsets, concatenated
+    )
+
+
+def variant_groups(lookup: Lookup) -> Equivalents:
+    """Groups of keys of graph whose words have the same key in `lookup`,
+    and the same language, indexed by each of their keys."""
+    groups: Dict[Word, Tuple[Word, ...]] = {}
+    keys, words = lookup.keys, lookup.words
+    start = 0
+    # Words with the same key have consecutive numbers
+    for end in range(1, len(keys) + 1):
+        if end < len(keys) and keys[end] == keys[start]:
+            continue
+        if end - start > 1:
+            by_language: Dict[Optional[str], List[Word]] = defaultdict(list)
+            for word in words[start:end]:
+                by_language[split_key(word)[1]].append(Word(word))
+            for group in by_language.values():
+                if len(group) > 1:
+                    members = tuple(group)
+                    groups.update(dict.fromkeys(members, members))
+        start = end
+    return groups
+
+
+def save(lookup: Lookup, path: str, stamp: Optional[Tuple[int, int]] = None) -> None:
+    """Write lookup of graph stored in `path` into `path`.lookup. The file is
+    replaced atomically, as it can be built by the first process needing it
+    while others read it. `stamp` is the one of the graph it was built from,
+    if the graph may have been replaced since."""
+    words = "\n".join(lookup.words).encode("utf-8")
+    keys = "\n".join(lookup.keys).encode("utf-8")
+    grams = "\n".join(lookup.trigrams).encode("utf-8")
+    tmp = f"{lookup_path(path)}.{os.getpid()}.tmp"
+    with open(tmp, mode="wb") as output:
+        output.write(
+            HEADER.pack(
+                MAGIC,
+                *(stamp or graph_stamp(path)),
+                len(lookup),
+                len(words),
+                len(keys),
+                len(lookup.trigrams),
+                len(grams),
+                len(lookup.postings),
+            )
+        )
+        to_little_endian(lookup.order).tofile(output)
+        to_little_endian(lookup.offsets).tofile(output)
+        to_little_endian(lookup.postings).tofile(output)
+        output.write(words)
+        output.write(keys)
+        output.write(grams)
+    os.replace(tmp, lookup_path(path))
+
+
+def is_valid(path: str) -> bool:
+    """Check that lookup exists for `path` and is up-to-date."""
+    try:
+        with open(lookup_path(path), mode="rb") as inputs:
+            magic, size, mtime, *_ = HEADER.unpack(inputs.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return magic == MAGIC and (size, mtime) == graph_stamp(path)
+
+
+def load(path: str) -> Lookup:
+    with open(lookup_path(path), mode="rb") as inputs:
+        header = HEADER.unpack(inputs.read(HEADER.size))
+        count, words_size, keys_size, grams_count, grams_size, size = header[3:]
+        order = array("I")
+        order.fromfile(inputs, count)
+        offsets = array("Q")
+        offsets.fromfile(inputs, grams_count + 1)
+        postings = array("I")
+        postings.fromfile(inputs, size)
+        words = inputs.read(words_size).decode("utf-8").split("\n") if count else []
+        keys = inputs.read(keys_size).decode("utf-8").split("\n") if count else []
+        grams = (
+            inputs.read(grams_size).decode("utf-8").split("\n") if grams_count else []
+        )
+    return Lookup(
+        words,
+        keys,
+        from_little_endian(order),
+        grams,
+        from_little_endian(offsets),
+        from_little_endian(postings),
+    )
+
+
+def open_lookup(
+    path: str, graph: Optional[Mapping[Word, SerializedRefs]] = None
+) -> Lookup:
+    """Load lookup of graph stored in `path`, building it (from `graph` if it
+    was already opened) if needed."""
+    if is_valid(path):
+        return load(path)
+    # Stamp of the graph being indexed: if it is replaced meanwhile, the
+    # lookup is saved as outdated.
+    stamp = graph_stamp(path)
+    lookup = build(graph if graph is not None else open_graph(path))
+    save(lookup, path, stamp)
+    return lookup
+
+
+def main():
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+
+    if args["build"]:
+        t0 = time.time()
+        lookup = build(open_graph(path))
+        save(lookup, path)
+        print("Lookup time", time.time() - t0)
+        print("Lookup written into:", lookup_path(path))
+        return
+
+    lookup = open_lookup(path)
+    word, limit = args["<word>"], int(args["--limit"])
+
+    t0 = time.time()
+    print("Completions:", ", ".join(lookup.complete(word, limit)))
+    print("Suggestions:", ", ".join(lookup.suggest(word, limit)))
+    print("Query time", time.time() - t0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Normalization of extracted references before the graph is written.
+
+Extraction leaves words with anchors (e.g. 'pollex#Latin'), irregular
+whitespace, decomposed Unicode characters or a different case or diacritics
+than the entry they refer to (e.g. 'pollĭcem' for 'pollicem', Wiktionary
+stripping some diacritics from titles), which creates duplicate references
+and words. Words are canonicalized (once per distinct string), then duplicate
+references and references of words to themselves are removed, each step being
+counted. Words with wiki markup residue (e.g. 'fro}}') come from templates
+which were not parsed correctly, their references are dropped.
+"""
+
+from typing import Dict, Optional, Set
+import re
+import unicodedata
+
+from wgraph.graph import split_key
+from wgraph.lookup import fold
+from wgraph.parsing.structs import Ref
+from wgraph.parsing.utils import COUNTERS
+
+# Wiki markup: braces, brackets (which titles cannot contain), bold or italics
+MARKUP = re.compile(r"[{}\[\]]|''")
+
+
+def canonical_word(word: str) -> str:
+    """Canonical form of `word`, empty if it is not a usable word.
+
+    >>> canonical_word(' pomme_de  terre ')
+    'pomme de terre'
+    >>> canonical_word('pollex#Latin')
+    'pollex'
+    >>> canonical_word('fro}}'), canonical_word("'''clear'''")
+    ('', '')
+    >>> canonical_word("'s")
+    "'s"
+    >>> canonical_word('polli\\u0306cem') == 'poll\\u012dcem'
+    True
+    """
+    word = word.partition("#")[0]
+    if MARKUP.search(word):
+        return ""
+    return unicodedata.normalize("NFC", " ".join(word.replace("_", " ").split()))
+
+
+def canonical_language(language: Optional[str]) -> Optional[str]:
+    if language is None:
+        return None
+    return language.strip().lower() or None
+
+
+def normalize(graph: Dict[str, Set[Ref]]) -> None:
+    """Normalize references of `graph` in place. References to words which
+    are not entries of graph, but only differ in case, diacritics or Unicode
+    normalization from one of them, are made to refer to it. References to
+    words which are not entries are merged with the ones only differing in
+    case, keeping the entry (or else the lowercase word)."""
+    words: Dict[str, str] = {}
+    languages: Dict[Optional[str], Optional[str]] = {None: None}
+
+    # Index of entries by folded word (see `lookup.fold`), None if ambiguous
+    entries = set()
+    by_fold: Dict[str, Optional[str]] = {}
+    for key in graph:
+        entry = split_key(key)[0]
+        entries.add(entry)
+        folded = fold(entry)
+        by_fold[folded] = entry if by_fold.get(folded, entry) == entry else None
+
+    for key, references in graph.items():
+        entry, entry_language = split_key(key)
+        normalized: Dict[tuple, Ref] = {}
+        for ref in references:
+            word = words.get(ref.word)
+            if word is None:
+                word = canonical_word(ref.word)
+                if word and word not in entries:
+                    word = by_fold.get(fold(word)) or word
+                words[ref.word] = word
+            if not word:
+                COUNTERS["references dropped"] += 1
+                continue
+
+            origin = languages.get(ref.origin, "")
+            if origin == "":
+                origin = languages[ref.origin] = canonical_language(ref.origin)
+            destination = languages.get(ref.destination, "")
+            if destination == "":
+                destination = languages[ref.destination] = canonical_language(
+                    ref.destination
+                )
+
+            if word == entry and origin in (None, entry_language):
+                COUNTERS["self references"] += 1
+                continue
+
+            if (word, origin, destination) == (ref.word, ref.origin, ref.destination):
+                canonical = ref
+            else:
+                canonical = Ref(
+                    origin=origin, destination=destination, word=word, kind=ref.kind
+                )
+                COUNTERS["references normalized"] += 1
+
+            # Distinct entries only differing in case (e.g. 'Turkey' and
+            # 'turkey') are not merged.
+            variant = word if word in entries else word.casefold()
+            duplicate = (variant, ref.kind, origin, destination)
+            previous = normalized.get(duplicate)
+            if previous is None:
+                normalized[duplicate] = canonical
+            else:
+                COUNTERS["duplicate references"] += 1
+                if (canonical.word in entries, canonical.word) > (
+                    previous.word in entries,
+                    previous.word,
+                ):
+                    normalized[duplicate] = canonical
+
+        graph[key] = set(normalized.values())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Estimate distances between words in constant time using landmarks.
+
+Distances (number of hops) from and to a few landmark words are computed
+offline over the whole graph and stored next to it (`<graph>.alt`), one byte
+per word and landmark. By the triangle inequality, for each landmark `L`:
+
+    d(L, v) - d(L, u) <= d(u, v) <= d(u, L) + d(L, v)
+    d(u, L) - d(v, L) <= d(u, v)
+
+which bounds the distance between any two words in O(landmarks), and prunes
+the search for the exact distance.
+
+Usage:
+    oracle build [options] <graph>
+    oracle [options] <graph> <word> <target>
+    oracle -h | --help
+
+Options:
+    --landmarks=<n>     Number of landmarks [default: 16].
+    --lang=<code>       Language of the word, for graphs keyed by language.
+    --exact             Compute exact distance, using bounds to prune search.
+"""
+
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+import heapq
+import math
+import struct
+import time
+
+import docopt
+
+from wgraph.adjacency import (
+    FAR,
+    UNREACHABLE,
+    Adjacency,
+    bfs,
+    from_little_endian,
+    graph_stamp,
+    open_adjacency,
+    to_little_endian,
+)
+
+EXTENSION = ".alt"
+MAGIC = b"WGRAPHL1"
+
+# Magic, size and modification time of graph, number of landmarks and words
+HEADER = struct.Struct("<8sQQQQ")
+
+
+def oracle_path(path: str) -> str:
+    return f"{path}{EXTENSION}"
+
+
+def select_landmarks(adjacency: Adjacency, count: int) -> List[int]:
+    """Words with the most references from and to them, which are on the way
+    of many paths."""
+    out_degrees = adjacency.out_degrees()
+    in_degrees = adjacency.in_degrees()
+    return heapq.nlargest(
+        count, range(len(adjacency)), key=lambda i: out_degrees[i] + in_degrees[i]
+    )
+
+
+class Oracle:
+    def __init__(
+        self,
+        adjacency: Adjacency,
+        landmarks: List[int],
+        from_landmarks: List[array],
+        to_landmarks: List[array],
+    ):
+        self.adjacency = adjacency
+        self.landmarks = landmarks
+        # from_landmarks[i][u] is d(L_i, u), to_landmarks[i][u] is d(u, L_i)
+        self.from_landmarks = from_landmarks
+        self.to_landmarks = to_landmarks
+        self._reverse: Optional[Adjacency] = None
+
+    def pair_bounds(self, u: int, v: int) -> Tuple[float, float]:
+        """Lower and upper bounds of distance from node `u` to node `v`,
+        infinite if `v` cannot be reached from `u`. Distances clamped to FAR
+        are only lower bounds: they are never subtracted, nor used in upper
+        bounds, so that bounds stay admissible."""
+        if u == v:
+            return 0, 0
+
+        lower, upper = 0, math.inf
+        for d_from, d_to in zip(self.from_landmarks, self.to_landmarks):
+            from_u, from_v, to_u, to_v = d_from[u], d_from[v], d_to[u], d_to[v]
+            if to_u < FAR and from_v < FAR:
+                upper = min(upper, to_u + from_v)
+            if from_u != UNREACHABLE:
+                if from_v == UNREACHABLE:
+                    # `L` reaches `u` but not `v`, neither can `u`
+                    return math.inf, math.inf
+                if from_u < FAR:
+                    lower = max(lower, from_v - from_u)
+            if to_v != UNREACHABLE:
+                if to_u == UNREACHABLE:
+                    # `v` reaches `L` but `u` does not, so `u` cannot reach `v`
+                    return math.inf, math.inf
+                if to_v < FAR:
+                    lower = max(lower, to_u - to_v)
+        return lower, upper
+
+    def bounds(
+        self, sources: Sequence[int], targets: Sequence[int]
+    ) -> Tuple[float, float]:
+        """Bounds of distance from closest of `sources` to closest of
+        `targets`."""
+        lower, upper = math.inf, math.inf
+        for u in sources:
+            for v in targets:
+                pair_lower, pair_upper = self.pair_bounds(u, v)
+                lower = min(lower, pair_lower)
+                upper = min(upper, pair_upper)
+        return lower, upper
+
+    def distance(self, sources: Sequence[int], targets: Sequence[int]) -> float:
+        """Exact distance from closest of `sources` to closest of `targets`,
+        using a bidirectional breadth-first search in which words that cannot
+        be on a path shorter than the best one known are not expanded."""
+        lower, upper = self.bounds(sources, targets)
+        if lower == upper:
+            return lower
+
+        if self._reverse is None:
+            self._reverse = self.adjacency.reverse()
+
+        best = upper
+        forward: Dict[int, int] = {u: 0 for u in sources}
+        backward: Dict[int, int] = {v: 0 for v in targets}
+        forward_frontier, backward_frontier = list(forward), list(backward)
+        forward_depth = backward_depth = 0
+
+        # Paths not found yet are longer than `forward_depth + backward_depth`
+        while (
+            forward_frontier
+            and backward_frontier
+            and forward_depth + backward_depth + 1 < best
+        ):
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_depth += 1
+                next_frontier = []
+                for u in forward_frontier:
+                    for v in self.adjacency.neighbors(u):
+                        if v in forward:
+                            continue
+                        forward[v] = forward_depth
+                        if v in backward:
+                            best = min(best, forward_depth + backward[v])
+                        elif forward_depth + self.bounds([v], targets)[0] < best:
+                            next_frontier.append(v)
+                forward_frontier = next_frontier
+            else:
+                backward_depth += 1
+                next_frontier = []
+                for v in backward_frontier:
+                    for u in self._reverse.neighbors(v):
+                        if u in backward:
+                            continue
+                        backward[u] = backward_depth
+                        if u in forward:
+                            best = min(best, forward[u] + backward_depth)
+                        elif backward_depth + self.bounds(sources, [u])[0] < best:
+                            next_frontier.append(u)
+                backward_frontier = next_frontier
+        return best
+
+    def word_ids(
+        self, word: str, target: str, language: Optional[str] = None
+    ) -> Tuple[List[int], List[int]]:
+        """Nodes of `word` (in `language` if graph is keyed by language), and
+        nodes of `target` in any language."""
+        source = self.adjacency.node_of(word, language)
+        sources = [source] if source is not None else []
+        return sources, self.adjacency.ids_of(target)
+
+    def estimate(
+        self, word: str, target: str, language: Optional[str] = None
+    ) -> Tuple[float, float]:
+        return self.bounds(*self.word_ids(word, target, language))
+
+    def word_distance(
+        self, word: str, target: str, language: Optional[str] = None
+    ) -> float:
+        return self.distance(*self.word_ids(word, target, language))
+
+
+def build(adjacency: Adjacency, count: int) -> Oracle:
+    landmarks = select_landmarks(adjacency, count)
+    reverse = adjacency.reverse()
+    return Oracle(
+        adjacency,
+        landmarks,
+        [bfs(adjacency, [landmark]) for landmark in landmarks],
+        [bfs(reverse, [landmark]) for landmark in landmarks],
+    )
+
+
+def save(oracle: Oracle, path: str) -> None:
+    """Write distances of landmarks of graph stored in `path` into `path`.alt"""
+    with open(oracle_path(path), mode="wb") as output:
+        output.write(
+            HEADER.pack(
+                MAGIC, *graph_stamp(path), len(oracle.landmarks), len(oracle.adjacency)
+            )
+        )
+        to_little_endian(array("I", oracle.landmarks)).tofile(output)
+        for distances in oracle.from_landmarks + oracle.to_landmarks:
+            distances.tofile(output)
+
+
+def is_valid(path: str) -> bool:
+    """Check that landmarks exist for `path` and are up-to-date."""
+    try:
+        with open(oracle_path(path), mode="rb") as inputs:
+            magic, size, mtime, _, _ = HEADER.unpack(inputs.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return magic == MAGIC and (size, mtime) == graph_stamp(path)
+
+
+def load(path: str) -> Oracle:
+    adjacency = open_adjacency(path)
+    with open(oracle_path(path), mode="rb") as inputs:
+        _, _, _, count, words = HEADER.unpack(inputs.read(HEADER.size))
+        landmarks = array("I")
+        landmarks.fromfile(inputs, count)
+        distances = []
+        for _ in range(2 * count):
+            distances.append(array("B"))
+            distances[-1].fromfile(inputs, words)
+    return Oracle(
+        adjacency,
+        list(from_little_endian(landmarks)),
+        distances[:count],
+        distances[count:],
+    )
+
+
+def main():
+    args = docopt.docopt(__doc__)
+    path = args["<graph>"]
+
+    if args["build"]:
+        t0 = time.time()
+        adjacency = open_adjacency(path)
+        oracle = build(adjacency, int(args["--landmarks"]))
+        save(oracle, path)
+        print("Landmarks time", time.time() - t0)
+        print("Landmarks written into:", oracle_path(path))
+        return
+
+    if not is_valid(path):
+        print("Landmarks are missing or outdated, run: oracle build", path)
+        return
+
+    oracle = load(path)
+    word, target, language = args["<word>"], args["<target>"], args["--lang"]
+
+    t0 = time.time()
+    lower, upper = oracle.estimate(word, target, language)
+    print("Lower bound:", lower)
+    print("Upper bound:", upper)
+    if args["--exact"]:
+        print("Distance:", oracle.word_distance(word, target, language))
+    print("Query time", time.time() - t0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,37 @@
 """Parse a Wiktionary dump and extract a word graph
 
 Usage:
-    parse.py <paths>...
+    parse.py [options] <paths>...
     parse.py --help | -h
+
+Options:
+    --output=<path>     Where to write the graph, use the `.frames` extension
+                        for a seekable compressed graph [default: graph.tsv].
+    --stats=<path>      Write throughput of each stage as JSON at exit
+                        (defaults to stderr).
+    --stats-interval=<seconds>  Report throughput periodically on stderr
+                        [default: 60].
+    --raw               Keep references as extracted, without normalizing
+                        words and removing duplicates.
 """
 
 
 from collections import defaultdict
 from typing import (
+    IO,
     DefaultDict,
     Iterable,
     Iterator,
+    Optional,
     Set,
     Tuple,
 )
 import bz2
 import gzip
+import io
 import os.path
 import sys
+import time
 
 import docopt
 import tqdm
@@ -30,7 +44,10 @@ from wgraph.parsing.fr import iter_references as iter_references_fr
 
 # from wgraph.parsing.de import iter_references as iter_references_de
 from wgraph.parsing.structs import Ref, Title, Section, Line
-from wgraph.graph import dump as dump_graph
+from wgraph.parsing.utils import COUNTERS
+from wgraph.graph import dump as dump_graph, node_key
+from wgraph.normalize import normalize
+from wgraph.stats import BinaryFile, PipelineStats
 
 # TODO - add French/German wiktionary (Check if it works)
 # TODO - extract 'Alternative forms' section
@@ -39,16 +56,19 @@ from wgraph.graph import dump as dump_graph
 # TODO - add long form for `origin` attribute
 
 
-def iter_lines(path: str) -> Iterator[str]:
-    """Iter lines from all dumps"""
-    if path.endswith(".bz2"):
-        with bz2.open(path, mode="rt") as input_wiki:
-            yield from input_wiki
-    elif path.endswith(".gz"):
-        with gzip.open(path, mode="rt") as input_wiki:
-            yield from input_wiki
-    else:
-        with open(path, mode="rt", encoding="utf-8") as input_wiki:
+def iter_lines(path: str, stats: Optional[PipelineStats] = None) -> Iterator[str]:
+    """Iter lines from all dumps, counting bytes read and decompressed in
+    `stats` if specified."""
+    raw: IO[bytes] = open(path, mode="rb") if stats is None else stats.open(path)
+    with raw:
+        decompressed: BinaryFile = raw
+        if path.endswith(".bz2"):
+            decompressed = bz2.BZ2File(raw)
+        elif path.endswith(".gz"):
+            decompressed = gzip.GzipFile(fileobj=raw)
+        if stats is not None:
+            decompressed = stats.reader("decompression", decompressed)
+        with io.TextIOWrapper(decompressed, encoding="utf-8") as input_wiki:
             yield from input_wiki
 
 
@@ -82,6 +102,18 @@ def iter_pages(lines: Iterable[str]) -> Iterator[Tuple[Title, Section, Line]]:
 
 def main() -> None:
     args = docopt.docopt(__doc__)
+    stats = PipelineStats(
+        stages=(
+            "read",
+            "decompression",
+            "lines",
+            "pages",
+            "references",
+            "insertions",
+            "normalization",
+        ),
+        interval=float(args["--stats-interval"]),
+    )
     graph: DefaultDict[str, Set[Ref]] = defaultdict(set)
     parsers = {
         "fr": iter_references_fr,
@@ -99,10 +131,45 @@ def main() -> None:
         iter_references = parsers[lang]
         # for title, section, line in tqdm.tqdm(iter_pages(iter_lines(path))):
         #     print(f'title="{title}" > section="{section}" > line="{line}"')
-        for word, reference in tqdm.tqdm(iter_references(iter_pages(iter_lines(path)))):
-            graph[word].add(reference)
+        references = stats.track(
+            "references",
+            iter_references(
+                stats.track(
+                    "pages", iter_pages(stats.track("lines", iter_lines(path, stats)))
+                )
+            ),
+        )
+
+        # Time spent inserting is the time of the loop minus time spent in
+        # producing references.
+        t0 = time.perf_counter()
+        insertions = 0
+        for (word, language), reference in tqdm.tqdm(references):
+            graph[node_key(word, language)].add(reference)
+            insertions += 1
+        stats.add("insertions", insertions, time.perf_counter() - t0)
+
+    if not args["--raw"]:
+        # Normalization runs after all other stages, whose time is added to
+        # keep timers inclusive.
+        t0 = time.perf_counter()
+        references_count = sum(len(refs) for refs in graph.values())
+        normalize(graph)
+        stats.add(
+            "normalization",
+            references_count,
+            stats.seconds["insertions"] + time.perf_counter() - t0,
+        )
+
+    COUNTERS["unique references"] = sum(len(refs) for refs in graph.values())
+
+    if args["--stats"]:
+        with open(args["--stats"], mode="wt", encoding="utf-8") as output:
+            stats.write(output)
+    else:
+        stats.write()
 
-    dump_graph(graph.items(), "graph.tsv")
+    dump_graph(graph.items(), args["--output"])
 
 
 if __name__ == "__main__":
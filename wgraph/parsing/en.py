@@ -3,327 +3,283 @@
 
 """Reference extractor for English Wiktionary."""
 
-from typing import List, Iterator, Iterable, Tuple
+from typing import Callable, Dict, List, Iterator, Iterable, NamedTuple, Optional, Tuple
 
-from wgraph.parsing.structs import Ref, Title, Section, Line
-from wgraph.parsing.utils import iter_templates
-
-
-def parse_inherited(parts: List[str]) -> Iterator[Ref]:
-    """This template is used to format the etymology of terms inherited from an
-    earlier stage of the same language: https://en.wiktionary.org/wiki/Template:inherited.
-    """
-    if len(parts) > 3:
-        yield Ref(origin=parts[2], destination=parts[1], word=parts[3], kind="inherit")
+from iso639 import languages
 
-
-def parse_derived(parts: List[str]) -> Iterator[Ref]:
-    """This template is used to format the etymology of terms derived from
-    another language. it combines the functions of {{etyl}} and {{m}} into a
-    single template, with fewer keystrokes and without writing out the language
-    codes twice: https://en.wiktionary.org/wiki/Template:derived/documentation.
-    """
-    if len(parts) > 3:
-        yield Ref(origin=parts[2], destination=parts[1], word=parts[3], kind="derived")
+from wgraph.languages import EXTRA_LANGUAGES
+from wgraph.parsing.structs import Key, Ref, Title, Section, Line
+from wgraph.parsing.utils import iter_templates
 
 
-def parse_borrowed(parts: List[str]) -> Iterator[Ref]:
-    """This template is used to format the etymology of borrowings and
-    loanwords: https://en.wiktionary.org/wiki/Template:borrowed/documentation
-    """
-    if len(parts) > 3:
-        yield Ref(origin=parts[2], destination=None, word=parts[3], kind="borrowed")
+def section_languages() -> Dict[str, str]:
+    """Map names of language sections (e.g. 'english' or 'middle english') to
+    the codes used by templates: ISO 639-1 when available, else ISO 639-3."""
+    codes = {name.lower(): code for code, name in EXTRA_LANGUAGES.items()}
+    for name, language in languages.name.items():
+        code = language.part1 or language.part3
+        if code:
+            codes.setdefault(name.lower(), code)
+    for name, language in languages.name.items():
+        # e.g. 'Middle English (1100-1500)'
+        code = language.part1 or language.part3
+        if code:
+            codes.setdefault(name.split(" (", 1)[0].lower(), code)
+    return codes
+
+
+SECTION_LANGUAGES = section_languages()
+
+# Layout of positional arguments of a template: index of origin language,
+# index of destination language (None when absent) and index of the (first)
+# word. Index 0 is the name of the template.
+Layout = Tuple[Optional[int], Optional[int], int]
+
+# Templates made of several words (e.g. compounds) yield one reference for the
+# composite word, with components decorated according to `style` and joined
+# with `separator`, then (if `components`) one reference per component.
+Composite = NamedTuple(
+    "Composite",
+    [
+        ("separator", str),
+        ("style", str),
+        ("components", bool),
+        ("single_role", str),
+    ],
+)
+
+TemplateSpec = NamedTuple(
+    "TemplateSpec",
+    [
+        ("kind", str),
+        ("names", Tuple[str, ...]),
+        # Layout for each supported number of positional arguments
+        ("layouts", Dict[int, Layout]),
+        # If set, layouts[min_parts] is also used for any larger number of parts
+        ("min_parts", Optional[int]),
+        ("composite", Optional[Composite]),
+    ],
+)
+
+
+def simple(kind: str, names: Tuple[str, ...], min_parts: int, layout: Layout):
+    return TemplateSpec(kind, names, {min_parts: layout}, min_parts, None)
+
+
+def composite(
+    kind: str,
+    names: Tuple[str, ...],
+    layouts: Dict[int, Layout],
+    separator: str = " + ",
+    style: str = "plain",
+    single_role: str = "first",
+):
+    return TemplateSpec(
+        kind, names, layouts, None, Composite(separator, style, True, single_role)
+    )
+
+
+# Kind of the reference of a component of a composite word, for each role
+ROLES = {
+    "first": "{}-",
+    "middle": "-{}-",
+    "last": "-{}",
+}
 
+# Decoration of components in composite word, for each role
+STYLES = {
+    "plain": {"first": "{}", "middle": "{}", "last": "{}"},
+    "prefix": {"first": "{}-", "middle": "{}", "last": "{}"},
+    "suffix": {"first": "{}", "middle": "{}", "last": "-{}"},
+    "confix": {"first": "{}-", "middle": "-{}-", "last": "-{}"},
+}
 
-def parse_affix(parts: List[str]) -> Iterator[Ref]:
-    """This template shows the parts (morphemes) that make up a word, for use
-    in etymology sections. Although it is called affix, it can be used for
-    compounds too, like {{compound}}: https://en.wiktionary.org/wiki/Template:affix/documentation
+TEMPLATES = [
+    # https://en.wiktionary.org/wiki/Template:inherited
+    simple("inherit", ("inherited", "inh"), 4, (2, 1, 3)),
+    # https://en.wiktionary.org/wiki/Template:derived/documentation
+    simple("derived", ("derived", "der"), 4, (2, 1, 3)),
+    # https://en.wiktionary.org/wiki/Template:borrowed/documentation
+    simple("borrowed", ("borrowed", "bor"), 4, (2, None, 3)),
+    # https://en.wiktionary.org/wiki/Template:affix/documentation
+    TemplateSpec(
+        "affix",
+        ("affix", "af"),
+        {3: (1, None, 2)},
+        3,
+        Composite("", "plain", False, "first"),
+    ),
+    # https://en.wiktionary.org/wiki/Template:prefix/documentation
+    composite(
+        "prefix",
+        ("prefix",),
+        {2: (None, None, 1), 3: (None, None, 1), 4: (1, None, 2)},
+        style="prefix",
+    ),
+    # https://en.wiktionary.org/wiki/Template:suffix/documentation
+    composite(
+        "suffix",
+        ("suffix", "suf"),
+        {2: (None, None, 1), 3: (None, None, 1), 4: (1, None, 2)},
+        style="suffix",
+        single_role="last",
+    ),
+    # https://en.wiktionary.org/wiki/Template:confix/documentation
+    composite(
+        "confix",
+        ("confix",),
+        {3: (None, None, 1), 4: (1, None, 2), 5: (1, None, 2)},
+        style="confix",
+    ),
+    # https://en.wiktionary.org/wiki/Template:compound/documentation
+    composite(
+        "compound",
+        ("compound",),
+        {3: (None, None, 1), 4: (1, None, 2), 5: (1, None, 2), 6: (1, None, 2)},
+    ),
+    # https://en.wiktionary.org/wiki/Template:blend/documentation
+    composite(
+        "blend", ("blend",), {3: (None, None, 1), 4: (1, None, 2)}, separator=" ~ "
+    ),
+    # https://en.wiktionary.org/wiki/Template:clipping/documentation
+    TemplateSpec(
+        "clipping", ("clipping",), {2: (None, None, 1), 3: (1, None, 2)}, None, None
+    ),
+    # https://en.wiktionary.org/wiki/Template:short_for
+    simple("short-for", ("short for",), 3, (None, None, 1)),
+    # https://en.wiktionary.org/wiki/Template:back-formation/documentation
+    TemplateSpec(
+        "back-formation",
+        ("back-form",),
+        {2: (None, None, 1), 3: (1, None, 2)},
+        None,
+        None,
+    ),
+    # https://en.wiktionary.org/wiki/Template:calque/documentation
+    simple("calque", ("calque",), 4, (2, None, 3)),
+    # https://en.wiktionary.org/wiki/Template:semantic_loan/documentation
+    simple("semantic-loan", ("semantic loan",), 4, (2, None, 3)),
+    # https://en.wiktionary.org/wiki/Template:link/documentation
+    simple("mention", ("mention", "m"), 3, (1, None, 2)),
+    # https://en.wiktionary.org/wiki/Template:cognate/documentation
+    simple("cognate", ("cognate", "cog"), 3, (1, None, 2)),
+    # https://en.wiktionary.org/wiki/Template:noncognate
+    simple("noncog", ("noncognate", "noncog"), 3, (1, None, 2)),
+]
+
+SPECS = {name: spec for spec in TEMPLATES for name in spec.names}
+
+Parser = Callable[[List[str]], Tuple[Ref, ...]]
+
+# Compiled parsers, for each name of template and number of positional
+# arguments (None if this number of arguments is not supported).
+PARSERS: Dict[str, Dict[int, Optional[Parser]]] = {name: {} for name in SPECS}
+
+
+def role(i: int, count: int, single_role: str) -> str:
+    if count == 1:
+        return single_role
+    if i == 0:
+        return "first"
+    if i == count - 1:
+        return "last"
+    return "middle"
+
+
+def argument(index: Optional[int]) -> str:
+    return "None" if index is None else f"parts[{index}]"
+
+
+def compile_parser(name: str, arity: int) -> Optional[Parser]:
+    """Generate parser of template `name` having `arity` positional arguments
+    (including name of template), or None if this arity is not supported.
+    Parsers are straight-line code returning a tuple of references.
+
+    >>> compile_parser('cog', 3)(['cog', 'la', 'pollex'])
+    (Ref(origin='la', destination=None, word='pollex', kind='cognate'),)
+
+    >>> compile_parser('suffix', 4)(['suffix', 'en', 'clear', 'ly'])
+    (Ref(origin='en', destination=None, word='clear + -ly', kind='suffix'), Ref(origin='en', destination=None, word='clear', kind='suffix-'), Ref(origin='en', destination=None, word='ly', kind='-suffix'))
+
+    >>> compile_parser('prefix', 5) is None
+    True
     """
-    if len(parts) > 2:
-        yield Ref(
-            origin=parts[1], destination=None, word="".join(parts[2:]), kind="affix"
-        )
-    # else:
-    #     print("AFFIX", parts)
-
-
-def parse_prefix(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:prefix/documentation"""
-    if len(parts) == 2:
-        yield Ref(origin=None, destination=None, word=f"{parts[1]}-", kind="prefix")
-        yield Ref(origin=None, destination=None, word=parts[1], kind="prefix-")
-    elif len(parts) == 3:
-        yield Ref(
-            origin=None,
-            destination=None,
-            word=f"{parts[1]}- + {parts[2]}",
-            kind="prefix",
-        )
-        yield Ref(origin=None, destination=None, word=parts[1], kind="prefix-")
-        yield Ref(origin=None, destination=None, word=parts[2], kind="-prefix")
-    elif len(parts) == 4:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]}- + {parts[3]}",
-            kind="prefix",
-        )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="prefix-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-prefix")
-    # else:
-    #     print("PREFIX", parts)
-
-
-def parse_suffix(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:suffix/documentation"""
-    if len(parts) == 2:
-        yield Ref(origin=None, destination=None, word=f"-{parts[1]}", kind="suffix")
-        yield Ref(origin=None, destination=None, word=parts[1], kind="-suffix")
-    elif len(parts) == 3:
-        yield Ref(
-            origin=None,
-            destination=None,
-            word=f"{parts[1]} + -{parts[2]}",
-            kind="suffix",
-        )
-        yield Ref(origin=None, destination=None, word=parts[1], kind="suffix-")
-        yield Ref(origin=None, destination=None, word=parts[2], kind="-suffix")
-    elif len(parts) == 4:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]} + -{parts[3]}",
-            kind="suffix",
+    spec = SPECS[name]
+    layout = spec.layouts.get(arity)
+    if layout is None and spec.min_parts is not None and arity >= spec.min_parts:
+        layout = spec.layouts[spec.min_parts]
+    if layout is None:
+        return None
+
+    origin, destination, first = layout
+    references = []
+    if spec.composite is None:
+        references.append(
+            f"Ref({argument(origin)}, {argument(destination)}, "
+            f"parts[{first}], {spec.kind!r})"
         )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="suffix-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-suffix")
-    # else:
-    #     print("SUFFIX", parts)
-    return None
-
-
-def parse_confix(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:confix/documentation"""
-    if len(parts) == 3:
-        yield Ref(
-            origin=None,
-            destination=None,
-            word=f"{parts[1]}- + -{parts[2]}",
-            kind="confix",
+    else:
+        separator, style, with_components, single_role = spec.composite
+        count = arity - first
+        roles = [role(i, count, single_role) for i in range(count)]
+
+        # e.g. 'parts[2] + "- + " + parts[3]'
+        decorated = []
+        for i, component_role in enumerate(roles):
+            before, after = STYLES[style][component_role].split("{}")
+            if i != 0:
+                before = separator + before
+            if before:
+                decorated.append(repr(before))
+            decorated.append(f"parts[{first + i}]")
+            if after:
+                decorated.append(repr(after))
+        references.append(
+            f"Ref({argument(origin)}, None, {' + '.join(decorated)}, {spec.kind!r})"
         )
-        yield Ref(origin=None, destination=None, word=parts[1], kind="confix-")
-        yield Ref(origin=None, destination=None, word=parts[2], kind="-confix")
-    elif len(parts) == 4:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]}- + -{parts[3]}",
-            kind="confix",
-        )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="confix-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-confix")
-    elif len(parts) == 5:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]}- + -{parts[3]}- + -{parts[4]}",
-            kind="confix",
-        )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="confix-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-confix-")
-        yield Ref(origin=parts[1], destination=None, word=parts[4], kind="-confix")
-    # else:
-    #     print("CONFIX", parts)
-
-
-def parse_compound(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:compound/documentation"""
-    if len(parts) == 3:
-        yield Ref(
-            origin=None,
-            destination=None,
-            word=f"{parts[1]} + {parts[2]}",
-            kind="compound",
-        )
-        yield Ref(origin=None, destination=None, word=parts[1], kind="compound-")
-        yield Ref(origin=None, destination=None, word=parts[2], kind="-compound")
-    elif len(parts) == 4:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]} + {parts[3]}",
-            kind="compound",
-        )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="compound-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-compound")
-    elif len(parts) == 5:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]} + {parts[3]} + {parts[4]}",
-            kind="compound",
-        )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="compound-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-compound-")
-        yield Ref(origin=parts[1], destination=None, word=parts[4], kind="-compound")
-    elif len(parts) == 6:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]} + {parts[3]} + {parts[4]} + {parts[5]}",
-            kind="compound",
-        )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="compound-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-compound-")
-        yield Ref(origin=parts[1], destination=None, word=parts[4], kind="-compound-")
-        yield Ref(origin=parts[1], destination=None, word=parts[5], kind="-compound")
-    # else:
-    #     print("COMPOUND", parts)
-
-
-def parse_blend(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:blend/documentation"""
-    if len(parts) == 3:
-        yield Ref(
-            origin=None, destination=None, word=f"{parts[1]} ~ {parts[2]}", kind="blend"
-        )
-        yield Ref(origin=None, destination=None, word=parts[1], kind="blend-")
-        yield Ref(origin=None, destination=None, word=parts[2], kind="-blend")
-    elif len(parts) == 4:
-        yield Ref(
-            origin=parts[1],
-            destination=None,
-            word=f"{parts[2]} ~ {parts[3]}",
-            kind="blend",
-        )
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="blend-")
-        yield Ref(origin=parts[1], destination=None, word=parts[3], kind="-blend")
-    # else:
-    #     print("BLEND", parts)
-
-
-def parse_clipping(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:clipping/documentation"""
-    if len(parts) == 2:
-        yield Ref(origin=None, destination=None, word=parts[1], kind="clipping")
-    elif len(parts) == 3:
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="clipping")
-    # else:
-    #     print("CLIPPING", parts)
-
-
-def parse_short_for(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:clipping/documentation"""
-    if len(parts) > 2:
-        yield Ref(origin=None, destination=None, word=parts[1], kind="short-for")
-    # else:
-    #     print("SHORT FOR", parts)
-
-
-def parse_back_form(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:back-formation/documentation"""
-    if len(parts) == 2:
-        yield Ref(origin=None, destination=None, word=parts[1], kind="back-formation")
-    elif len(parts) == 3:
-        yield Ref(
-            origin=parts[1], destination=None, word=parts[2], kind="back-formation"
-        )
-    # else:
-    #     print("BACK FORMATION", parts)
 
+        if with_components:
+            for i, component_role in enumerate(roles):
+                kind = ROLES[component_role].format(spec.kind)
+                references.append(
+                    f"Ref({argument(origin)}, None, parts[{first + i}], {kind!r})"
+                )
 
-def parse_calque(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:calque/documentation"""
-    if len(parts) > 3:
-        yield Ref(origin=parts[2], destination=None, word=parts[3], kind="calque")
-    # else:
-    #     print("CALQUE", parts)
+    source = f"def parse(parts):\n    return ({', '.join(references)},)\n"
+    namespace: Dict = {"Ref": Ref}
+    exec(source, namespace)  # pylint: disable=exec-used
+    return namespace["parse"]
 
 
-def parse_semantic_loan(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:semantic_loan/documentation"""
-    if len(parts) > 3:
-        yield Ref(
-            origin=parts[2], destination=None, word=parts[3], kind="semantic-loan"
-        )
-    # else:
-    #     print("SEMANTIC LOAN", parts)
-
-
-def parse_mention(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:link/documentation"""
-    if len(parts) > 2:
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="mention")
-    # else:
-    #     print("MENTION", parts)
-
-
-def parse_cognate(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:cognate/documentation"""
-    if len(parts) > 2:
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="cognate")
-    # else:
-    #     print("COGNATE", parts)
-
-
-def parse_non_cognate(parts: List[str]) -> Iterator[Ref]:
-    """https://en.wiktionary.org/wiki/Template:noncognate"""
-    if len(parts) > 2:
-        yield Ref(origin=parts[1], destination=None, word=parts[2], kind="noncog")
-    # else:
-    #     print("NONCOGNATE", parts)
-
-
-REFERENCES_PARSERS = {
-    "derived": parse_derived,
-    "der": parse_derived,
-    "borrowed": parse_borrowed,
-    "bor": parse_borrowed,
-    "inherited": parse_inherited,
-    "inh": parse_inherited,
-    "affix": parse_affix,
-    "af": parse_affix,
-    "prefix": parse_prefix,
-    "confix": parse_confix,
-    "suffix": parse_suffix,
-    "suf": parse_suffix,
-    "compound": parse_compound,
-    "blend": parse_blend,
-    "clipping": parse_clipping,
-    "short for": parse_short_for,
-    "back-form": parse_back_form,
-    "calque": parse_calque,
-    "semantic loan": parse_semantic_loan,
-    "mention": parse_mention,
-    "m": parse_mention,
-    "cognate": parse_cognate,
-    "cog": parse_cognate,
-    "noncognate": parse_non_cognate,
-    "noncog": parse_non_cognate,
-}
-
-
-def parse_reference(ref: str) -> Iterator[Ref]:
-    kind = ref.split("|", 1)[0]
-    parser = REFERENCES_PARSERS.get(kind)
-    if parser is not None:
+def parse_reference(ref: str) -> Iterable[Ref]:
+    end_of_kind = ref.find("|")
+    name = ref[:end_of_kind] if end_of_kind != -1 else ref
+    parsers = PARSERS.get(name)
+    if parsers is not None:
         parts = [p for p in ref.split("|") if "=" not in p]
-        if parts:
-            yield from parser(parts)
-    # else:
-    #     print("????", kind)
+        arity = len(parts)
+        try:
+            parser = parsers[arity]
+        except KeyError:
+            parser = parsers[arity] = compile_parser(name, arity)
+        if parser is not None:
+            return parser(parts)
+    return ()
 
 
 def iter_references(
     lines: Iterable[Tuple[Title, Section, Line]]
-) -> Iterator[Tuple[Title, Ref]]:
+) -> Iterator[Tuple[Key, Ref]]:
+    page = None
+    language = None
     for title, section, line in lines:
-        # TODO - here detect language of this section (reverse mapping from
-        # iso639.languages) Then return this alongside title and ref, this will
-        # allow to have keys as (word, language) instead of just (word), which
-        # is ambiguous.
-        if "etymology" in section:
+        if title != page:
+            page, language = title, None
+
+        if not line:
+            # Headers of level 2 are languages, e.g. '==English=='
+            language = SECTION_LANGUAGES.get(section)
+        elif "etymology" in section:
             for default_destination, template in iter_templates(line):
                 for reference in parse_reference(template):
-                    yield title, reference
+                    yield (title, language), reference
@@ -3,11 +3,17 @@
 
 """Reference extractor for French Wiktionary."""
 
-from typing import Iterator, Iterable, Tuple, Optional, List
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, Iterable, Tuple, Optional, List
 
 from wgraph.parsing.fr_langs import LANGUAGES
-from wgraph.parsing.structs import Ref, Title, Section, Line
-from wgraph.parsing.utils import iter_templates, iter_links, extract_named_argument
+from wgraph.parsing.structs import Key, Ref, Title, Section, Line
+from wgraph.parsing.utils import (
+    COUNTERS,
+    iter_templates,
+    iter_links,
+    extract_named_argument,
+)
 
 # title: pouce
 # line: : {{date|1130}} De l’{{étyl|fro|fr|polz}}, ''{{lien|pouz|fro}}'', puis ''{{lien|poulce|fro}}'', du {{étyl|la|fr|pollicem|dif=pollĭcem}}, [[accusatif]] singulier de ''{{lien|pollex|la}}'' (« pouce »).
@@ -388,21 +394,93 @@ REFERENCES_PARSERS = {
 #  20670 R R
 
 
+# Frequent kinds of templates which never contain references (see frequencies
+# above). They are rejected without splitting the template.
+IGNORED_KINDS = frozenset(
+    [
+        "R",
+        "R:TLFi",
+        "RÉF",
+        "W",
+        "WP",
+        "avk",
+        "avk-arbitraire",
+        "avk-ref-arbitraire",
+        "circa",
+        "date",
+        "e",
+        "eo-étym",
+        "info lex",
+        "lien web",
+        "note",
+        "ouvrage",
+        "polytonique",
+        "Polytonique",
+        "pron",
+        "réf",
+        "réfnéc",
+        "refnec",
+        "siècle",
+        "siècle2",
+        "smcp",
+        "source",
+        "tableau han",
+        "term",
+        "w",
+        "ébauche",
+        "ébauche-étym",
+    ]
+)
+
+
+Parser = Callable[..., Iterator[Ref]]
+Dispatch = Dict[str, List[Tuple[str, int, Optional[Parser]]]]
+
+
+def build_dispatch(parsers: Dict[str, Parser], ignored: Iterable[str]) -> Dispatch:
+    """Index kinds of templates by their first character. Each entry lists
+    (kind, length of kind, parser), parser being None for ignored kinds."""
+    dispatch: Dispatch = defaultdict(list)
+    for kind, parser in parsers.items():
+        dispatch[kind[0]].append((kind, len(kind), parser))
+    for kind in ignored:
+        dispatch[kind[0]].append((kind, len(kind), None))
+    return dict(dispatch)
+
+
+DISPATCH = build_dispatch(REFERENCES_PARSERS, IGNORED_KINDS)
+
+
 def parse_template(
     template: str, default_destination: Optional[str] = None
 ) -> Iterator[Ref]:
+    """Parse references from template.
+
+    >>> list(parse_template('étyl|fro|fr|polz'))
+    [Ref(origin='fro', destination='fr', word='polz', kind='etyl')]
+
+    >>> list(parse_template('étylp|fro|fr|polz'))
+    [Ref(origin='fro', destination='fr', word='polz', kind='etyl')]
+
+    >>> list(parse_template('date|1130'))
+    []
+    """
+    # Fast path: compare with known kinds sharing the same first character
+    # and check that the kind is followed by '|', without allocating.
+    for kind, length, parser in DISPATCH.get(template[:1], ()):
+        if template.startswith("|", length) and template.startswith(kind):
+            if parser is None:
+                COUNTERS["templates rejected"] += 1
+                return
+            yield from parser(template, default_destination=default_destination)
+            return
+
+    # Slow path: long tail of unknown kinds
     if "|" not in template:
         return
 
     kind = template.split("|", 1)[0]
-    if kind == "ébauche-étym":
-        return
-
-    parser = REFERENCES_PARSERS.get(kind)
-    if parser is not None:
-        yield from parser(template, default_destination=default_destination)
-    else:
-        print("KIND", kind, template)
+    print("KIND", kind, template)
 
 
 def parse_link(link: str) -> Iterator[Ref]:
@@ -463,10 +541,14 @@ def parse_link(link: str) -> Iterator[Ref]:
 
 def iter_references(
     lines: Iterable[Tuple[Title, Section, Line]]
-) -> Iterator[Tuple[Title, Ref]]:
+) -> Iterator[Tuple[Key, Ref]]:
+    page = None
     section_language = None
 
     for title, section, line in lines:
+        if title != page:
+            page, section_language = title, None
+
         if title.startswith("Utilisateur:"):
             # e.g. https://fr.wiktionary.org/wiki/Utilisateur:Diligent/Tch%C3%A8que
             continue
@@ -485,7 +567,7 @@ def iter_references(
                     default_destination=default_destination or section_language,
                 ):
                     print("  -> ref (template):", reference)
-                    yield title, reference
+                    yield (title, section_language), reference
 
             # Most references are actually not using templates
             # TODO - we could extract the 'origin' from the context
@@ -493,7 +575,7 @@ def iter_references(
                 print(" + link:", link)
                 for reference in parse_link(link):
                     print("  -> ref (link):", reference)
-                    yield title, reference
+                    yield (title, section_language), reference
         # else:
         #     print("?", line.strip())
 
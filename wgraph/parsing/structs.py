@@ -3,7 +3,7 @@
 
 """Some common types."""
 
-from typing import NamedTuple, Optional
+from typing import NamedTuple, Optional, Tuple
 
 Ref = NamedTuple(
     "Ref",
@@ -17,3 +17,7 @@ Ref = NamedTuple(
 Title = str
 Section = str
 Line = str
+
+# Entries of the graph are identified by a word and the language of the section
+# it was found in (None if unknown).
+Key = Tuple[Title, Optional[str]]
@@ -4,10 +4,19 @@
 """Some parsing utilities"""
 
 import re
-from typing import Iterator, Iterable, Tuple, Optional
+import time
+from collections import Counter, defaultdict
+from typing import DefaultDict, Iterator, Iterable, Tuple, Optional
 
 from wgraph.parsing.structs import Ref, Title, Section, Line
 
+# Global counters of parsing events (e.g. number of templates extracted), they
+# are reported by `wgraph.stats` when instrumenting the parsing pipeline.
+COUNTERS: Counter = Counter()
+# Seconds spent in parsing steps which run within stages of the pipeline (e.g.
+# scanning lines for templates), also reported by `wgraph.stats`.
+TIMERS: DefaultDict[str, float] = defaultdict(float)
+
 
 def extract_named_argument(string: str, kw: str) -> Optional[str]:
     token = f"{kw}="
@@ -62,7 +71,8 @@ HTML_COMMENT_RE = re.compile(r'&lt;!--.*--&gt;')
 
 
 def iter_templates(line: str) -> Iterator[Tuple[Optional[str], str]]:
-    """Extract templates from line.
+    """Extract templates from line, the time spent scanning it is added to
+    TIMERS["templates"].
 
     >>> list(iter_templates('Emprunté au {{étyl|la|fr|mot=hypothesis|sens=argument}}.'))
     [(None, 'étyl|la|fr|mot=hypothesis|sens=argument')]
@@ -76,6 +86,15 @@ def iter_templates(line: str) -> Iterator[Tuple[Optional[str], str]]:
     >>> list(iter_templates("De ''[[Gaume#fr-nom|Gaume]]''&lt;!--, de {{étyl|??|fr|mot=???|sens=[[Gaume]]}}, --&gt;, avec le suffixe ''[[-ais]]''"))
     []
     """
+    if "{{" not in line:
+        return iter(())
+    t0 = time.perf_counter()
+    templates = list(scan_templates(line))
+    TIMERS["templates"] += time.perf_counter() - t0
+    return iter(templates)
+
+
+def scan_templates(line: str) -> Iterator[Tuple[Optional[str], str]]:
     default_origin = None
 
     if '&lt;!--' in line:
@@ -102,6 +121,7 @@ def iter_templates(line: str) -> Iterator[Tuple[Optional[str], str]]:
                 # e.g. {{date|lang=fr|1539}}
                 default_origin = template[10:].split("|", 1)[0]
             else:
+                COUNTERS["templates"] += 1
                 yield default_origin, template
             ref_begin = ref_end + 2
 
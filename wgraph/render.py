@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Render graphs to SVG in memory."""
+
+from typing import Optional
+import os
+import subprocess
+import threading
+
+import graphviz as gv
+
+from wgraph.workers import Overloaded
+
+
+class Renderer:
+    """Render graphs by piping them through `dot`, without temporary files.
+    At most `workers` `dot` processes run concurrently, other callers wait up
+    to `queue_timeout` seconds for a slot to be released. `dot` processes
+    running longer than `timeout` seconds are killed."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: float = 5.0,
+        queue_timeout: float = 5.0,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.workers)
+
+    def render(self, graph: gv.Digraph) -> bytes:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise Overloaded("no render slot available")
+
+        try:
+            return subprocess.run(
+                ["dot", "-Tsvg"],
+                input=graph.source.encode("utf-8"),
+                capture_output=True,
+                check=True,
+                timeout=self.timeout,
+            ).stdout
+        except subprocess.TimeoutExpired:
+            raise Overloaded("rendering timed out") from None
+        finally:
+            self._slots.release()
+
+
+def svg_fragment(svg: bytes) -> str:
+    """Strip XML prolog and doctype so that SVG can be inlined in HTML."""
+    text = svg.decode("utf-8")
+    start = text.find("<svg ")
+    if start != -1:
+        text = text[start:]
+    return text
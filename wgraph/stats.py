@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Throughput instrumentation of the parsing pipeline."""
+
+from typing import Dict, IO, Iterable, Iterator, List, Optional, TypeVar, Union
+import gzip
+import io
+import json
+import sys
+import time
+
+from wgraph.parsing.utils import COUNTERS, TIMERS
+
+T = TypeVar("T")
+
+# Binary files which can be read by stages (GzipFile does not implement IO)
+BinaryFile = Union[IO[bytes], gzip.GzipFile]
+
+# Number of items after which per-stage counters are updated, so that the
+# bookkeeping cost is not paid for every item.
+FLUSH_EVERY = 4096
+
+# Steps timed by parsers themselves (see `wgraph.parsing.utils.TIMERS`), and
+# the stage they run in.
+NESTED_STAGES = {"templates": "references"}
+
+
+class PipelineStats:
+    """Counters and timers of the stages of a pipeline of nested iterators.
+
+    Timers are inclusive: the time spent in a stage contains the time spent
+    in the stages it pulls items from. `stages` lists them from the innermost
+    to the outermost so that the time spent in each stage alone can be
+    derived. Steps of NESTED_STAGES are timed alone, their time is deducted
+    from the stage they run in. A JSON report is written to `output` every
+    `interval` seconds."""
+
+    def __init__(
+        self,
+        stages: Iterable[str] = (),
+        interval: float = 60.0,
+        output: IO[str] = sys.stderr,
+    ):
+        self.interval = interval
+        self.output = output
+        self.stages: List[str] = []
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        for stage in stages:
+            self.add(stage)
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    def add(self, stage: str, count: int = 0, seconds: float = 0.0) -> None:
+        if stage not in self.counts:
+            self.stages.append(stage)
+            self.counts[stage] = 0
+            self.seconds[stage] = 0.0
+        self.counts[stage] += count
+        self.seconds[stage] += seconds
+
+    def track(self, stage: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Count items of `iterable` and time spent producing them."""
+        self.add(stage)
+        return self._track(stage, iter(iterable))
+
+    def _track(self, stage: str, iterator: Iterator[T]) -> Iterator[T]:
+        perf_counter = time.perf_counter
+        count = 0
+        seconds = 0.0
+        try:
+            while True:
+                t0 = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    seconds += perf_counter() - t0
+                    break
+                seconds += perf_counter() - t0
+                count += 1
+                if count == FLUSH_EVERY:
+                    self.add(stage, count, seconds)
+                    count, seconds = 0, 0.0
+                    self.maybe_report()
+                yield item
+        finally:
+            self.add(stage, count, seconds)
+
+    def open(self, path: str) -> io.BufferedReader:
+        """Open `path` in binary mode, counting bytes read as the `read` stage."""
+        return self.reader("read", open(path, mode="rb"))
+
+    def reader(self, stage: str, raw: BinaryFile) -> io.BufferedReader:
+        """Wrap binary file `raw`, counting bytes read from it and time spent
+        reading them as `stage`."""
+        self.add(stage)
+        return io.BufferedReader(CountingReader(raw, self, stage))
+
+    def report(self) -> Dict:
+        stages = {}
+        inner_seconds = 0.0
+        for stage in self.stages:
+            count, seconds = self.counts[stage], self.seconds[stage]
+            stages[stage] = {
+                "count": count,
+                "seconds": seconds,
+                "self_seconds": max(0.0, seconds - inner_seconds),
+                "per_second": count / seconds if seconds else 0.0,
+            }
+            inner_seconds = seconds
+
+        for stage, outer in NESTED_STAGES.items():
+            if stage in TIMERS and outer in stages:
+                count, seconds = COUNTERS[stage], TIMERS[stage]
+                stages[stage] = {
+                    "count": count,
+                    "seconds": seconds,
+                    "self_seconds": seconds,
+                    "per_second": count / seconds if seconds else 0.0,
+                }
+                stages[outer]["self_seconds"] = max(
+                    0.0, stages[outer]["self_seconds"] - seconds
+                )
+
+        return {
+            "elapsed": time.perf_counter() - self.start,
+            "stages": stages,
+            "counters": dict(COUNTERS),
+        }
+
+    def maybe_report(self) -> None:
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.write()
+
+    def write(self, output: Optional[IO[str]] = None) -> None:
+        print(json.dumps(self.report()), file=output or self.output, flush=True)
+
+
+class CountingReader(io.RawIOBase):
+    """Binary file wrapper counting bytes read and time spent reading as
+    `stage`."""
+
+    def __init__(self, raw: BinaryFile, stats: PipelineStats, stage: str):
+        super().__init__()
+        self.raw = raw
+        self.stats = stats
+        self.stage = stage
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> Optional[int]:
+        t0 = time.perf_counter()
+        data = self.raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.stats.add(self.stage, size, time.perf_counter() - t0)
+        return size
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
@@ -10,26 +10,37 @@ Usage:
 Options:
     --group-by-origin   Group nodes of the graph by origin
     --max-depth=<n>     Maximum depth of the graph to explore [default: 1].
+    --lang=<code>       Language of the word, for graphs keyed by language.
+    --max-degree=<n>    Do not expand words with more references [default: 200].
+    --max-fanout=<n>    Maximum number of references explored for each word
+                        [default: 30].
+    --merge-variants    Explore words only differing in case or diacritics
+                        as a single word.
 """
 
 from collections import defaultdict
-import itertools
 
 import docopt
 
+from wgraph.analytics import load_hubs, open_ranks
 from wgraph.graph import (
+    NO_EQUIVALENTS,
+    NO_PRUNING,
+    Budget,
+    Pruning,
     Word,
     apply_styles,
     create_graph,
     dfs,
     draw_graph,
-    load,
+    resolve_key,
     verbose_language,
 )
+from wgraph.index import open_graph
+from wgraph.lookup import open_lookup, variant_groups
 
 
 def is_invalid(string):
-    print("IS VALID?", string)
     if not string:
         return True
     if len(string) > 20:
@@ -43,36 +54,76 @@ def is_invalid(string):
     return False
 
 
-def go(graph, word, max_depth=1, max_nodes=50, group_by_origin=True):
+def etymology(
+    graph,
+    word,
+    max_depth=1,
+    max_nodes=50,
+    language=None,
+    budget=None,
+    pruning=NO_PRUNING,
+    equivalents=NO_EQUIVALENTS,
+):
+    """Explore references from `word` which can be displayed, at most
+    `max_nodes` of them. If specified, `budget` can further limit the
+    traversal and tells if it was truncated."""
+    if budget is None:
+        budget = Budget()
+    if budget.max_nodes is None or budget.max_nodes > max_nodes:
+        budget.max_nodes = max_nodes
+
+    yield from dfs(
+        graph=graph,
+        max_depth=max_depth,
+        word=word,
+        language=language,
+        budget=budget,
+        is_valid=lambda ref: not is_invalid(ref.word),
+        pruning=pruning,
+        equivalents=equivalents,
+    )
+
+
+def go(
+    graph,
+    word,
+    max_depth=1,
+    max_nodes=50,
+    group_by_origin=True,
+    language=None,
+    budget=None,
+    pruning=NO_PRUNING,
+    equivalents=NO_EQUIVALENTS,
+):
     g = create_graph(root=word)
 
     # TODO first identify all source languages with this word, then create one
     # sub-graph for each.
 
-    etymology = itertools.islice(
-        dfs(graph=graph, max_depth=max_depth, word=word), max_nodes
+    references = etymology(
+        graph=graph,
+        word=word,
+        max_depth=max_depth,
+        max_nodes=max_nodes,
+        language=language,
+        budget=budget,
+        pruning=pruning,
+        equivalents=equivalents,
     )
     if group_by_origin:
         by_origin = defaultdict(list)
-        for parent, _, ref in etymology:
-            if is_invalid(ref.word) or (parent is not None and is_invalid(parent.word)):
-                continue
+        for parent, _, ref in references:
             by_origin[ref.origin].append((parent, ref))
 
-        for origin, references in by_origin.items():
+        for origin, elements in by_origin.items():
             with g.subgraph(name=f'cluster_{origin or "unknown_origin"}') as subgraph:
                 subgraph.attr(label=verbose_language(origin))
-                draw_graph(graph=subgraph, root=word, elements=references)
+                draw_graph(graph=subgraph, root=word, elements=elements)
     else:
         g = draw_graph(
             root=word,
             graph=g,
-            elements=(
-                (parent, ref)
-                for parent, _, ref in etymology
-                if not is_invalid(ref.word)
-                and (parent is None or not is_invalid(parent.word))
-            ),
+            elements=((parent, ref) for parent, _, ref in references),
         )
     return g
 
@@ -82,14 +133,39 @@ def main():
     path = args["<graph>"]
     word = Word(args["<word>"])
     max_depth = int(args["--max-depth"])
+    budget = Budget()
+    pruning = Pruning(
+        max_degree=int(args["--max-degree"]),
+        max_fanout=int(args["--max-fanout"]),
+        hubs=load_hubs(path),
+        ranks=open_ranks(path),
+    )
+
+    graph = open_graph(path)
+    if resolve_key(graph, word, args["--lang"]) is None:
+        print("Word not found:", word)
+        suggestions = open_lookup(path, graph).suggest(word)
+        if suggestions:
+            print("Did you mean:", ", ".join(suggestions))
+        return
 
     g = go(
-        graph=load(path),
+        budget=budget,
+        pruning=pruning,
+        equivalents=(
+            variant_groups(open_lookup(path, graph))
+            if args["--merge-variants"]
+            else NO_EQUIVALENTS
+        ),
+        graph=graph,
         word=word,
         max_depth=max_depth,
         group_by_origin=args["--group-by-origin"],
+        language=args["--lang"],
     )
 
     filename = f"wgraph_{word}"
     apply_styles(word, g).render(filename)
     print("Graph written into:", filename)
+    if budget.truncated:
+        print("Graph was truncated to", budget.nodes, "nodes")
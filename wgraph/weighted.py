@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Shortest paths in graph, relations being weighted by their kind.
+
+Hops are not all equally meaningful: inheriting a word from an ancestor
+language is a much stronger link than mentioning a cognate. Each kind of
+reference is given a cost (see `KIND_COSTS`) and paths are explored by
+increasing cost, using Dijkstra's algorithm or A* when an admissible estimate
+of the remaining cost is available (see `Landmarks`).
+"""
+
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+import heapq
+import itertools
+import math
+
+from wgraph.graph import (
+    Budget,
+    SerializedRefs,
+    Word,
+    resolve_key,
+    ref_key,
+    split_key,
+    split_references,
+)
+from wgraph.parsing.structs import Ref
+
+Costs = Mapping[str, float]
+Heuristic = Callable[[Word], float]
+
+KIND_COSTS: Dict[str, float] = {
+    # Word comes from the referenced one
+    "inherit": 1.0,
+    "derived": 1.0,
+    "borrowed": 1.0,
+    "etyl": 1.0,
+    "back-formation": 1.0,
+    "clipping": 1.0,
+    "short-for": 1.0,
+    # Word is made of the referenced ones
+    "affix": 1.0,
+    "prefix": 1.0,
+    "suffix": 1.0,
+    "confix": 1.0,
+    "compound": 1.0,
+    "blend": 1.0,
+    "composé_de": 1.0,
+    "calque": 1.5,
+    "semantic-loan": 1.5,
+    # Referenced word is only related
+    "mention": 3.0,
+    "lien": 3.0,
+    "cf": 3.0,
+    "cognate": 4.0,
+    "link": 5.0,
+    "noncog": 8.0,
+}
+
+# Cost of kinds missing from table
+DEFAULT_COST = 2.0
+
+
+def edge_cost(kind: str, costs: Optional[Costs] = None) -> float:
+    """Cost of a reference of `kind`. Components of composite words (e.g.
+    'suffix-' or '-suffix') cost the same as the composite.
+
+    >>> edge_cost('inherit'), edge_cost('-suffix'), edge_cost('unknown')
+    (1.0, 1.0, 2.0)
+    """
+    if costs is None:
+        costs = KIND_COSTS
+    cost = costs.get(kind)
+    if cost is None:
+        cost = costs.get(kind.strip("-"), DEFAULT_COST)
+    return cost
+
+
+def dijkstra(
+    graph: Mapping[Word, SerializedRefs],
+    word: Word,
+    costs: Optional[Costs] = None,
+    heuristic: Optional[Heuristic] = None,
+    max_cost: Optional[float] = None,
+    language: Optional[str] = None,
+    budget: Optional[Budget] = None,
+) -> Iterator[Tuple[Optional[Ref], float, Ref]]:
+    """Explore graph from `word` by increasing cost, yielding (parent, cost,
+    ref) for each word reached, `cost` being the cost of the cheapest path.
+
+    If specified, `heuristic` must never overestimate the cost from a word (as
+    found in graph) to the goal of the search; words are then explored by
+    increasing estimated total cost (A*), and words for which it is infinite
+    are never explored."""
+    if budget is None:
+        budget = Budget()
+    if costs is None:
+        costs = KIND_COSTS
+
+    root = resolve_key(graph, word, language)
+    if root is None:
+        return
+
+    settled: Set[Word] = set([root])
+    best: Dict[Word, float] = {root: 0.0}
+    tie_breaker = itertools.count()
+    queue: List[Tuple[float, float, int, Word, Optional[Ref], Ref]] = []
+
+    def push(
+        parent: Optional[Ref], cost: float, ref: Ref, language: Optional[str]
+    ) -> None:
+        key = ref_key(graph, ref, language)
+        if key in settled or cost >= best.get(key, math.inf):
+            return
+        if max_cost is not None and cost > max_cost:
+            return
+        estimate = cost if heuristic is None else cost + heuristic(key)
+        if estimate == math.inf:
+            return
+        best[key] = cost
+        heapq.heappush(queue, (estimate, cost, next(tie_breaker), key, parent, ref))
+
+    language = split_key(root)[1]
+    for ref in split_references(graph[root]):
+        push(None, edge_cost(ref.kind, costs), ref, language)
+
+    while queue:
+        _, cost, _, key, parent, ref = heapq.heappop(queue)
+        if key in settled:
+            # Already reached with a lower cost
+            continue
+        settled.add(key)
+
+        if not budget.allows_node():
+            return
+        yield (parent, cost, ref)
+
+        if key in graph:
+            language = split_key(key)[1]
+            for r in split_references(graph[key]):
+                push(ref, cost + edge_cost(r.kind, costs), r, language)
+
+
+def shortest_path(
+    graph: Mapping[Word, SerializedRefs],
+    start_word: Word,
+    stop_condition: Callable[[Ref], bool],
+    costs: Optional[Costs] = None,
+    heuristic: Optional[Heuristic] = None,
+    max_cost: Optional[float] = None,
+    language: Optional[str] = None,
+    budget: Optional[Budget] = None,
+) -> Tuple[float, List[Ref]]:
+    """Cheapest path from `start_word` to a reference satisfying
+    `stop_condition`, as (cost, references). Cost is infinite (and path empty)
+    if no such reference can be reached."""
+    parents: Dict[Ref, Ref] = {}
+    for parent, cost, ref in dijkstra(
+        graph=graph,
+        word=start_word,
+        costs=costs,
+        heuristic=heuristic,
+        max_cost=max_cost,
+        language=language,
+        budget=budget,
+    ):
+        if parent is not None:
+            parents[ref] = parent
+
+        if stop_condition(ref):
+            ancestors = [ref]
+            while ref in parents:
+                ref = parents[ref]
+                ancestors.append(ref)
+            ancestors.reverse()
+            return cost, ancestors
+    return math.inf, []
+
+
+def landmark_distances(
+    graph: Mapping[Word, SerializedRefs], landmark: Word, costs: Optional[Costs] = None
+) -> Dict[Word, float]:
+    """Cost of cheapest paths from `landmark` to all words it reaches."""
+    distances = {landmark: 0.0}
+    # Keys of references yielded, parents being yielded before their children
+    keys: Dict[Optional[Ref], Word] = {None: landmark}
+    for parent, cost, ref in dijkstra(graph=graph, word=landmark, costs=costs):
+        key = keys[ref] = ref_key(graph, ref, split_key(keys[parent])[1])
+        distances[key] = cost
+    return distances
+
+
+def select_landmarks(graph: Mapping[Word, SerializedRefs], count: int) -> List[Word]:
+    """Words having the most references, which reach large parts of graph."""
+    return heapq.nlargest(count, graph, key=lambda word: graph[word].count("\t"))
+
+
+class Landmarks:
+    """Costs of paths from a few landmark words, used to bound the cost of a
+    path from any word `v` to a target `t`. By the triangle inequality, for
+    each landmark `L`: d(v, t) >= d(L, t) - d(L, v). If `L` reaches `v` but not
+    `t`, then `t` cannot be reached from `v` either."""
+
+    def __init__(
+        self,
+        graph: Mapping[Word, SerializedRefs],
+        words: Sequence[Word],
+        costs: Optional[Costs] = None,
+    ):
+        self.words = list(words)
+        self.distances = [landmark_distances(graph, word, costs) for word in words]
+
+    def heuristic(self, target: str) -> Heuristic:
+        """Admissible (and consistent) estimate of the cost to reach `target`,
+        a word in any language, from a word found in graph."""
+        bounds = []
+        for distances in self.distances:
+            to_target = min(
+                (
+                    cost
+                    for key, cost in distances.items()
+                    if split_key(key)[0] == target
+                ),
+                default=math.inf,
+            )
+            bounds.append((distances, to_target))
+
+        def estimate(key: Word) -> float:
+            lower_bound = 0.0
+            for distances, to_target in bounds:
+                from_landmark = distances.get(key)
+                if from_landmark is not None:
+                    lower_bound = max(lower_bound, to_target - from_landmark)
+            return lower_bound
+
+        return estimate
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Bounded pool of workers used to serve expensive requests."""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar
+import os
+import queue
+import threading
+
+A = TypeVar("A")
+T = TypeVar("T")
+
+# Marks the end of items produced by a streamed job
+_DONE = object()
+
+
+class Overloaded(Exception):
+    """Raised when a job cannot be completed in time, either because too many
+    jobs are already waiting or because it took too long."""
+
+
+class BoundedPool:
+    """Run jobs in `workers` threads. At most `max_pending` jobs can be queued
+    or running at any time, others are rejected immediately. Callers wait at
+    most `timeout` seconds for the result of their job."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout: float = 10.0,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._pending = threading.BoundedSemaphore(max_pending or 4 * self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def run(self, job: Callable[..., T], *args, **kwargs) -> T:
+        if not self._pending.acquire(blocking=False):
+            raise Overloaded("too many pending jobs")
+
+        try:
+            future = self._executor.submit(job, *args, **kwargs)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The job keeps its slot until it finishes, so that a burst of slow
+            # jobs cannot pile up in the background.
+            future.cancel()
+            raise Overloaded("job timed out") from None
+
+    def map(self, job: Callable[[A], T], items: Iterable[A]) -> List[T]:
+        """Run `job` on each of `items` concurrently, as a single job: all of
+        them hold one slot until the last one finishes, and callers wait at
+        most `timeout` seconds in total for their results."""
+        if not self._pending.acquire(blocking=False):
+            raise Overloaded("too many pending jobs")
+
+        futures = []
+        try:
+            for item in items:
+                futures.append(self._executor.submit(job, item))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            self._pending.release()
+            raise
+        if not futures:
+            self._pending.release()
+            return []
+
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def release(_) -> None:
+            with lock:
+                remaining[0] -= 1
+                if not remaining[0]:
+                    self._pending.release()
+
+        for future in futures:
+            future.add_done_callback(release)
+
+        _, not_done = wait(futures, timeout=self.timeout)
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            raise Overloaded("job timed out")
+        return [future.result() for future in futures]
+
+    def stream(self, job: Callable[..., Iterator[T]], *args, **kwargs) -> Iterator[T]:
+        """Run generator `job` in a worker, yielding its items as soon as they
+        are produced. The job holds its slot until it is exhausted or the
+        returned iterator is closed (e.g. client went away), which stops it.
+        Callers wait at most `timeout` seconds for each item."""
+        if not self._pending.acquire(blocking=False):
+            raise Overloaded("too many pending jobs")
+
+        items: queue.SimpleQueue = queue.SimpleQueue()
+        closed = threading.Event()
+
+        def produce() -> None:
+            try:
+                for item in job(*args, **kwargs):
+                    if closed.is_set():
+                        return
+                    items.put((item, None))
+            except Exception as error:
+                items.put((None, error))
+            else:
+                items.put((_DONE, None))
+
+        try:
+            future = self._executor.submit(produce)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return self._consume(items, closed)
+
+    def _consume(self, items: queue.SimpleQueue, closed: threading.Event) -> Iterator:
+        try:
+            while True:
+                try:
+                    item, error = items.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise Overloaded("job timed out") from None
+                if error is not None:
+                    raise error
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            closed.set()